@@ -0,0 +1,227 @@
+import math
+from collections import Counter
+from datetime import datetime, timedelta
+
+from forecast import Forecaster
+from schema import normalize_quality_value
+
+def _to_number(value):
+    """与 pd.to_numeric(errors='coerce') 一致：无法转换的值视为缺失"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+def parse_day(value):
+    """把 2025-11-01 / 2025.11.1 / ISO 时间字符串解析为 date，失败返回 None"""
+    if value is None:
+        return None
+    text = str(value).strip().replace('.', '-')[:10]
+    try:
+        return datetime.strptime(text, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+def _mean(total, count):
+    return total / count if count else float('nan')
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+def _month_start(day):
+    return day.replace(day=1)
+
+# 汇总粒度 -> (计算所在周期第一天的函数, 周期名称格式)
+GRANULARITIES = {
+    'day': (lambda day: day, lambda start: start.isoformat()),
+    'week': (_week_start, lambda start: '%d-W%02d' % start.isocalendar()[:2]),
+    'month': (_month_start, lambda start: start.strftime('%Y-%m')),
+}
+
+
+class _Totals:
+    """
+    一组记录的累加值。active_records 是运动时长大于 0 的记录条数（全部记录统计沿用的口径），
+    active_dates 是这些记录的不同日期，同一天有多条运动记录也只算一个运动日。
+    """
+
+    __slots__ = ('records', 'duration_sum', 'duration_count', 'active_records', 'active_dates',
+                 'sleep_sum', 'sleep_count', 'quality_sum', 'quality_count', 'sports')
+
+    def __init__(self):
+        self.records = 0
+        self.duration_sum = 0.0
+        self.duration_count = 0
+        self.active_records = 0
+        self.active_dates = set()
+        self.sleep_sum = 0.0
+        self.sleep_count = 0
+        self.quality_sum = 0.0
+        self.quality_count = 0
+        self.sports = Counter()
+
+    def add(self, duration, sleep, quality, sport, day=None):
+        self.records += 1
+        if duration is not None:
+            self.duration_sum += duration
+            self.duration_count += 1
+            if duration > 0:
+                self.active_records += 1
+                if day is not None:
+                    self.active_dates.add(day)
+        if sleep is not None:
+            self.sleep_sum += sleep
+            self.sleep_count += 1
+        if quality is not None:
+            self.quality_sum += quality
+            self.quality_count += 1
+        self.sports[sport] += 1
+
+    def merge(self, other):
+        self.records += other.records
+        self.duration_sum += other.duration_sum
+        self.duration_count += other.duration_count
+        self.active_records += other.active_records
+        self.active_dates |= other.active_dates
+        self.sleep_sum += other.sleep_sum
+        self.sleep_count += other.sleep_count
+        self.quality_sum += other.quality_sum
+        self.quality_count += other.quality_count
+        self.sports.update(other.sports)
+
+
+class RunningAggregates:
+    """
+    增量维护的汇总值，add_record 时 O(1) 更新，读取时不再遍历全部历史。
+    另按日 / ISO 周 / 月保存小计（键为周期第一天），
+    用于最近 7 天 / 28 天的滑动窗口统计和长期趋势图，日小计同时是预测模型的输入。
+    """
+
+    def __init__(self):
+        self.total = _Totals()
+        self.periods = {granularity: {} for granularity in GRANULARITIES}
+        self.daily = self.periods['day']
+        self.first_day = None
+        self.latest_day = None
+        self.forecaster = Forecaster(self.daily)
+        # pandas 只有在某条记录含有该字段时才会产生对应列
+        self.columns = Counter()
+        self._snapshot = None
+
+    @classmethod
+    def from_records(cls, records):
+        """启动或数据被外部修改时，从存储的全部记录重建"""
+        aggregates = cls()
+        for record in records:
+            aggregates.add(record)
+        return aggregates
+
+    def add(self, record):
+        """加入一条记录，返回它的日期（date，无法识别时为 None）"""
+        for column in ('运动时长', '运动项目', '睡眠时长', '睡眠质量'):
+            if column in record:
+                self.columns[column] += 1
+        values = (
+            _to_number(record.get('运动时长')),
+            _to_number(record.get('睡眠时长')),
+            normalize_quality_value(record.get('睡眠质量')),
+            record.get('运动项目'),
+        )
+        self.total.add(*values)
+        self._snapshot = None
+
+        day = parse_day(record.get('日期'))
+        if day is not None:
+            for granularity, (period_start, _) in GRANULARITIES.items():
+                start = period_start(day)
+                totals = self.periods[granularity].get(start)
+                if totals is None:
+                    totals = self.periods[granularity][start] = _Totals()
+                totals.add(*values, day)
+            if self.first_day is None or day < self.first_day:
+                self.first_day = day
+            if self.latest_day is None or day > self.latest_day:
+                self.latest_day = day
+        self.forecaster.observe(day)
+        return day
+
+    def snapshot(self):
+        """
+        全部记录的汇总值，口径与原来用 pandas 计算的一致；没有对应列时均值为 None。
+        均值由逐条累加的总和得出，与 pandas 的两两求和只在浮点数的最后几位可能不同。
+        读取是 O(1) 的，计算结果缓存到下一次 add()。
+        """
+        if self._snapshot is None:
+            self._snapshot = self._summarize()
+        return dict(self._snapshot)
+
+    def _summarize(self):
+        total = self.total
+        stats = {
+            "total_records": total.records,
+            "avg_duration": None,
+            "active_days": 0,
+            "sport_variety": 0,
+            "avg_sleep": None,
+            "avg_quality": None,
+        }
+        if not total.records:
+            return stats
+
+        if self.columns['运动时长']:
+            stats['avg_duration'] = _mean(total.duration_sum, total.duration_count)
+            stats['active_days'] = total.active_records
+            stats['sport_variety'] = len(total.sports) if self.columns['运动项目'] else 0
+        if self.columns['睡眠时长']:
+            stats['avg_sleep'] = _mean(total.sleep_sum, total.sleep_count)
+            stats['avg_quality'] = _mean(total.quality_sum, total.quality_count) if self.columns['睡眠质量'] else 0
+        return stats
+
+    def window(self, days, as_of=None):
+        """截至 as_of（默认最新记录日期）最近 days 天的统计，只遍历 days 个日小计"""
+        as_of = as_of or self.latest_day
+        window = _Totals()
+        if as_of is not None:
+            for offset in range(days):
+                totals = self.daily.get(as_of - timedelta(days=offset))
+                if totals is not None:
+                    window.merge(totals)
+        return {
+            "as_of": as_of.isoformat() if as_of else None,
+            "days": days,
+            "records": window.records,
+            "avg_duration": _mean(window.duration_sum, window.duration_count) if window.duration_count else 0,
+            "active_days": len(window.active_dates),
+            "sport_variety": len(window.sports),
+            "avg_sleep": _mean(window.sleep_sum, window.sleep_count) if window.sleep_count else 0,
+            "avg_quality": _mean(window.quality_sum, window.quality_count) if window.quality_count else 0,
+        }
+
+    def rollups(self, granularity='day', date_from=None, date_to=None):
+        """
+        按日 / 周 / 月汇总的趋势数据（按时间排序），date_from / date_to 为 date，
+        包含两端所在的整个周期。没有对应数据的均值为 None。
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"未知的汇总粒度: {granularity}")
+        period_start, period_name = GRANULARITIES[granularity]
+        first = period_start(date_from) if date_from else None
+        last = period_start(date_to) if date_to else None
+        result = []
+        for start in sorted(self.periods[granularity]):
+            if (first and start < first) or (last and start > last):
+                continue
+            totals = self.periods[granularity][start]
+            result.append({
+                "period": period_name(start),
+                "start": start.isoformat(),
+                "records": totals.records,
+                "total_duration": totals.duration_sum,
+                "avg_duration": totals.duration_sum / totals.duration_count if totals.duration_count else None,
+                "active_days": len(totals.active_dates),
+                "avg_sleep": totals.sleep_sum / totals.sleep_count if totals.sleep_count else None,
+                "avg_quality": totals.quality_sum / totals.quality_count if totals.quality_count else None,
+                "sports": {sport: count for sport, count in totals.sports.items() if sport},
+            })
+        return result
@@ -0,0 +1,186 @@
+"""
+按日期排序的滑动窗口分析：最近 7 天 / 28 天的平均运动时长、运动天数占比、
+运动项目数、睡眠均值，以及与上一周相比的变化。
+
+先把记录按自然日汇总，再在截至目标日期的一段连续日历上（没有记录的日子补 0，
+长度为最长窗口加一周，用于与上一周比较）对所有列一次性做 rolling 求和。
+日历长度固定，计算量只与记录数有关，不受记录跨越的日期范围（如误填的远期日期）影响。
+结果按数据版本缓存，数据不变时重复查询不再计算。
+这个模块不依赖 backend 里的其他模块，my_app.py 也可以用 backend.analytics 导入。
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+WINDOWS = (7, 28)
+
+# 各数据源的列名
+RECORD_COLUMNS = {'date': '日期', 'duration': '运动时长', 'sleep': '睡眠时长', 'quality': '睡眠质量', 'sport': '运动项目', 'notes': '心路历程'}
+CSV_COLUMNS = {'date': '日期', 'duration': '运动时长(分钟)', 'sleep': '睡眠时长(小时)', 'quality': '睡眠质量', 'sport': '运动项目', 'notes': '心路历程'}
+
+def _column(df, name, default=np.nan):
+    return df[name] if name in df.columns else pd.Series(default, index=df.index)
+
+def _to_days(series):
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        text = series.astype(str).str.strip().str.replace('.', '-', regex=False)
+        series = pd.to_datetime(text, errors='coerce', format='mixed')
+    return series.dt.normalize()
+
+_DAILY_COLUMNS = ['records', 'duration_sum', 'duration_count', 'active_days', 'sleep_sum', 'sleep_count',
+                  'quality_sum', 'quality_count', 'notes']
+
+def _daily_totals(df, columns):
+    """按自然日汇总，返回 (日小计, 每天各运动项目是否出现)，索引为有记录的日期"""
+    days = _to_days(_column(df, columns['date'], pd.NaT))
+    valid = days.notna().to_numpy()
+    if not valid.any():
+        return None, None
+    days = days[valid]
+    duration = pd.to_numeric(_column(df, columns['duration']), errors='coerce')[valid].astype('float64')
+    sleep = pd.to_numeric(_column(df, columns['sleep']), errors='coerce')[valid].astype('float64')
+    quality = pd.to_numeric(_column(df, columns['quality']), errors='coerce')[valid].astype('float64')
+    sports = _column(df, columns['sport'], '')[valid].astype(object).fillna('').astype(str).str.strip()
+    notes = _column(df, columns['notes'], '')[valid].astype(object).fillna('').astype(str).str.strip()
+
+    per_record = pd.DataFrame({
+        'records': 1,
+        'duration_sum': duration.fillna(0),
+        'duration_count': duration.notna(),
+        'active_days': duration > 0,
+        'sleep_sum': sleep.fillna(0),
+        'sleep_count': sleep.notna(),
+        'quality_sum': quality.fillna(0),
+        'quality_count': quality.notna(),
+        'notes': notes != '',
+    })
+    daily = per_record.groupby(days.to_numpy()).sum()
+    # 一天有多条运动记录也只算一个运动日
+    daily['active_days'] = daily['active_days'] > 0
+
+    has_sport = (sports != '').to_numpy()
+    sport_days = (
+        pd.Series(1, index=[days.to_numpy()[has_sport], sports.to_numpy()[has_sport]])
+        .groupby(level=[0, 1]).size().unstack(fill_value=0) > 0
+    ) if has_sport.any() else pd.DataFrame(index=daily.index)
+    return daily, sport_days
+
+class RollingAnalytics:
+    """
+    滑动窗口分析引擎。compute() 返回按日索引的窗口统计表，summary() 取某一天的结果。
+    version 相同（数据没变）时直接复用上次的计算结果。
+    """
+
+    def __init__(self, columns=RECORD_COLUMNS, windows=WINDOWS, max_cached=8):
+        self.columns = columns
+        self.windows = tuple(windows)
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def span(self):
+        """计算一天的结果需要的天数：最长窗口，再加上一周用于与上一周比较"""
+        return max(self.windows) + 7
+
+    def compute(self, df, version=None, end=None, first_day=None):
+        """
+        截至 end（默认最新记录日期）最近 span 天中每一天的窗口统计，返回 (最早记录日期, 统计表)。
+        没有可识别日期的数据且没有给出 end 时返回 (None, 空表)。
+        df 只是全部记录的一段时，first_day 给出全部记录中最早的日期。
+        """
+        key = (version, end)
+        if version is not None:
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return self._cache[key]
+        result = self._compute(df, end, first_day)
+        if version is not None:
+            with self._lock:
+                self._cache[key] = result
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+        return result
+
+    def _compute(self, df, end, first_day):
+        daily, sport_days = _daily_totals(df, self.columns)
+        if daily is None:
+            if end is None:
+                return None, pd.DataFrame()
+            daily = pd.DataFrame(0, index=pd.DatetimeIndex([]), columns=_DAILY_COLUMNS)
+            sport_days = pd.DataFrame(index=daily.index)
+        if first_day is not None:
+            first = pd.Timestamp(first_day).normalize()
+        else:
+            first = daily.index.min() if len(daily) else None
+        last = end if end is not None else daily.index.max()
+        calendar = pd.date_range(last - pd.Timedelta(days=self.span - 1), last, freq='D')
+        daily = daily.reindex(calendar, fill_value=0).astype('float64')
+        sport_days = sport_days.reindex(calendar, fill_value=False).astype('float64')
+
+        result = {}
+        for window in self.windows:
+            sums = daily.rolling(window, min_periods=1).sum()
+            suffix = f'_{window}d'
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result['records' + suffix] = sums['records']
+                result['avg_duration' + suffix] = sums['duration_sum'] / sums['duration_count']
+                result['active_days' + suffix] = sums['active_days']
+                result['active_ratio' + suffix] = sums['active_days'] / window
+                result['avg_sleep' + suffix] = sums['sleep_sum'] / sums['sleep_count']
+                result['avg_quality' + suffix] = sums['quality_sum'] / sums['quality_count']
+                result['notes' + suffix] = sums['notes']
+            result['sport_variety' + suffix] = (sport_days.rolling(window, min_periods=1).sum() > 0).sum(axis=1)
+        frame = pd.DataFrame(result, index=calendar)
+
+        # 与上一周（前 7 天窗口）相比
+        week = 7
+        previous = frame.shift(week)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frame['duration_change_wow'] = (frame[f'avg_duration_{week}d'] - previous[f'avg_duration_{week}d']) / previous[f'avg_duration_{week}d']
+            frame['sleep_change_wow'] = (frame[f'avg_sleep_{week}d'] - previous[f'avg_sleep_{week}d']) / previous[f'avg_sleep_{week}d']
+        frame['active_days_change_wow'] = frame[f'active_days_{week}d'] - previous[f'active_days_{week}d']
+        # 上一周早于最早记录时没有可比较的数据
+        no_history = calendar - pd.Timedelta(days=week) < first if first is not None else np.ones(len(calendar), dtype=bool)
+        frame.loc[no_history, 'active_days_change_wow'] = np.nan
+        return first, frame.replace([np.inf, -np.inf], np.nan)
+
+    def summary(self, df, as_of=None, version=None, first_day=None):
+        """
+        截至 as_of（日期或字符串，默认最新记录日期）的窗口统计，
+        没有数据或 as_of 早于最早记录时返回 None。缺失的均值为 None。
+        df 只需包含 as_of 之前 span 天内的记录；只传了这一段时，first_day 给出全部记录中最早的日期。
+        """
+        end = pd.Timestamp(as_of).normalize() if as_of is not None else None
+        first, frame = self.compute(df, version=version, end=end, first_day=first_day)
+        if frame.empty or first is None or frame.index[-1] < first:
+            return None
+        row = frame.iloc[-1]
+        end = frame.index[-1]
+
+        def value(name, digits=2):
+            number = row[name]
+            return None if pd.isna(number) else round(float(number), digits)
+
+        summary = {'as_of': end.strftime('%Y-%m-%d')}
+        for window in self.windows:
+            suffix = f'_{window}d'
+            summary[f'{window}d'] = {
+                'records': int(row['records' + suffix]),
+                'avg_duration': value('avg_duration' + suffix, 1),
+                'active_days': int(row['active_days' + suffix]),
+                'active_ratio': value('active_ratio' + suffix),
+                'sport_variety': int(row['sport_variety' + suffix]),
+                'avg_sleep': value('avg_sleep' + suffix, 1),
+                'avg_quality': value('avg_quality' + suffix, 1),
+                'notes': int(row['notes' + suffix]),
+            }
+        summary['week_over_week'] = {
+            'avg_duration': value('duration_change_wow'),
+            'avg_sleep': value('sleep_change_wow'),
+            'active_days': None if pd.isna(row['active_days_change_wow']) else int(row['active_days_change_wow']),
+        }
+        return summary
@@ -1,68 +1,373 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from models import FitnessData
-from health_analyzer import generate_per_run_ai_summary, get_health_tip
+from export import EXPORT_FORMATS, export_chunks, gzip_chunks
+from models import UserDataRegistry, validate_records
+from health_analyzer import generate_per_run_summaries, generate_per_run_summary, get_health_tip
+from metrics import metrics
+from response_cache import ResponseCache
+from summary_jobs import SummaryJobQueue, SummaryStore, create_summarizer
+from wearable import WorkoutStore, daily_record, parse_bound
+from functools import lru_cache
 import json
+import os
 
 app = Flask(__name__)
 CORS(app)
+metrics.init_app(app)
 
-fitness_data = FitnessData()
+user_data = UserDataRegistry()
+# 缓存键带上用户ID和该用户的数据版本，不同用户互不影响
+response_cache = ResponseCache(lambda: (g.user_id, g.fitness_data.get_version()))
 
-@app.route('/api/health/records', methods=['GET'])
+# 健康数据接口：/api/health/... 可用 X-User-Id 请求头指定用户，
+# 也可以用 /api/users/<user_id>/health/... 前缀；都不带时使用默认（单用户）分区
+health = Blueprint('health', __name__)
+
+MAX_PAGE_SIZE = 1000
+MAX_JOB_RECORDS = 1000
+MAX_JOB_WAIT = 30
+MAX_SEARCH_RESULTS = 100
+
+# AI 小结在后台线程池里生成，结果按内容哈希持久化缓存在各用户分区目录下，不同用户互不共享
+summary_jobs = SummaryJobQueue(create_summarizer())
+
+@lru_cache(maxsize=256)
+def _summary_store(partition_dir):
+    return SummaryStore(os.path.join(partition_dir, 'summary_cache.db'))
+
+@health.url_value_preprocessor
+def _pull_user_id(endpoint, values):
+    g.user_id = (values or {}).pop('user_id', None) or request.headers.get('X-User-Id')
+
+@health.before_request
+def _load_user_data():
+    try:
+        g.fitness_data = user_data.get(g.user_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+def _data_changed():
+    """本进程写入了当前用户的数据：立即删掉该用户的缓存响应，不让旧版本条目占着缓存容量"""
+    response_cache.invalidate(g.user_id)
+
+def _conditional(response):
+    """带上由数据版本得到的 ETag / Last-Modified，数据没变时返回 304"""
+    response.set_etag(g.fitness_data.get_etag())
+    last_modified = g.fitness_data.get_last_modified()
+    if last_modified:
+        response.last_modified = last_modified
+    return response.make_conditional(request)
+
+@health.route('/records', methods=['GET'])
 def get_records():
-    data = fitness_data.get_all_data()
-    return jsonify({"data": data, "count": len(data)})
+    """
+    查询参数（均可选）：from / to 日期范围，sport 运动项目，
+    limit + cursor 按 id 翻页，since=版本号或 created_at 只取之后新增的记录。
+    """
+    args = request.args
+    limit = args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+    try:
+        data, next_cursor = g.fitness_data.query_records(
+            date_from=args.get('from'),
+            date_to=args.get('to'),
+            sport=args.get('sport'),
+            since=args.get('since'),
+            cursor=args.get('cursor'),
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": f"查询参数错误: {e}"}), 400
+    return _conditional(jsonify({
+        "data": data,
+        "count": len(data),
+        "next_cursor": next_cursor,
+        "version": g.fitness_data.get_sync_version()
+    }))
 
-@app.route('/api/health/records', methods=['POST'])
+@health.route('/records', methods=['POST'])
 def add_record():
-    record = request.json
-    required_fields = ['日期', '运动项目', '运动时长', '睡眠时长']
-    for field in required_fields:
-        if field not in record:
-            return jsonify({"error": f"缺少必填字段: {field}"}), 400
+    valid, errors = validate_records([request.get_json(silent=True)])
+    if errors:
+        return jsonify({"error": errors[0]["error"]}), 400
+    record = valid[0]
     try:
-        saved_record = fitness_data.add_record(record)
+        saved_record = g.fitness_data.add_record(record)
+        _data_changed()
         return jsonify({"message": "记录添加成功", "data": saved_record})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/health/analysis', methods=['GET'])
+def _read_bulk_body():
+    """
+    读取批量导入的请求体：JSON 数组，或逐行解析的 NDJSON 流。返回 (记录列表, 解析错误)，
+    NDJSON 中无法解析的行在记录列表里占一个位置（None），并记为该位置的错误，其余行照常导入。
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        records = []
+        errors = []
+        for line_number, line in enumerate(request.stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                errors.append({"index": len(records), "error": f"第{line_number}行不是合法的 JSON"})
+                records.append(None)
+        return records, errors
+    records = request.get_json(silent=True)
+    if not isinstance(records, list):
+        raise ValueError("请求体必须是 JSON 数组或 NDJSON")
+    return records, []
+
+@health.route('/records/bulk', methods=['POST'])
+def add_records_bulk():
+    try:
+        records, parse_errors = _read_bulk_body()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    valid, errors = validate_records(records, parse_errors)
+    if not valid:
+        return jsonify({"error": "没有可导入的记录", "errors": errors}), 400
+    try:
+        saved = g.fitness_data.add_records(valid)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    _data_changed()
+    return jsonify({
+        "message": f"成功导入{len(saved)}条记录",
+        "saved": len(saved),
+        "first_id": saved[0]["id"],
+        "last_id": saved[-1]["id"],
+        "errors": errors
+    })
+
+@health.route('/analysis', methods=['GET'])
+@response_cache.cached
 def get_analysis():
-    analysis = fitness_data.get_recent_analysis()
+    """as_of 可指定分析截至的日期，默认最新记录日期"""
+    try:
+        analysis = g.fitness_data.get_recent_analysis(as_of=request.args.get('as_of'))
+    except ValueError as e:
+        return jsonify({"error": f"查询参数错误: {e}"}), 400
     return jsonify(analysis)
 
-@app.route('/api/health/analysis/per_run', methods=['GET'])
+@health.route('/analysis/per_run', methods=['GET'])
+@response_cache.cached
 def get_per_run_analysis():
-    data = fitness_data.get_all_data()
+    data = g.fitness_data.get_all_data()
     if not data:
         return jsonify({"error": "暂无数据"})
-    
-    per_run_summaries = []
-    for record in data:
-        summary = generate_per_run_ai_summary(record, data)
-        per_run_summaries.append({
-            "id": record.get("id"),
-            "日期": record.get("日期"),
-            "运动项目": record.get("运动项目"),
-            "summary": summary
-        })
-    return jsonify(per_run_summaries)
-
-@app.route('/api/health/tips', methods=['GET'])
+    return jsonify(generate_per_run_summaries(data))
+
+@health.route('/analysis/per_run/<int:record_id>', methods=['GET'])
+@response_cache.cached
+def get_single_run_analysis(record_id):
+    data = g.fitness_data.get_all_data()
+    record = next((r for r in data if r.get("id") == record_id), None)
+    if record is None:
+        return jsonify({"error": "记录不存在"}), 404
+    return jsonify(generate_per_run_summary(record, data))
+
+@health.route('/analysis/per_run/jobs', methods=['POST'])
+def submit_summary_job():
+    """
+    提交 AI 小结任务，请求体 {"ids": [记录ID, ...]}，不带 ids 时为全部记录。
+    立即返回任务ID，之后用 GET /analysis/per_run/jobs/<job_id> 查询进度和结果。
+    """
+    body = request.get_json(silent=True) or {}
+    ids = body.get('ids')
+    data = g.fitness_data.get_all_data()
+    if ids is None:
+        records = data
+    elif isinstance(ids, list):
+        wanted = set(ids)
+        records = [record for record in data if record.get('id') in wanted]
+    else:
+        return jsonify({"error": "ids 必须是记录ID数组"}), 400
+    if not records:
+        return jsonify({"error": "没有需要生成小结的记录"}), 400
+    if len(records) > MAX_JOB_RECORDS:
+        return jsonify({"error": f"一次最多提交{MAX_JOB_RECORDS}条记录"}), 400
+    store = _summary_store(user_data.partition_dir(g.user_id))
+    job_id = summary_jobs.submit(records, data, owner=g.user_id, store=store)
+    return jsonify(summary_jobs.status(job_id, owner=g.user_id, include_results=False, store=store)), 202
+
+@health.route('/analysis/per_run/jobs/<job_id>', methods=['GET'])
+def get_summary_job(job_id):
+    """任务进度和已完成的小结，wait=秒数 时等待任务完成（长轮询，最多30秒）"""
+    wait = min(max(request.args.get('wait', 0, type=float), 0), MAX_JOB_WAIT)
+    store = _summary_store(user_data.partition_dir(g.user_id))
+    status = summary_jobs.wait(job_id, owner=g.user_id, timeout=wait, store=store)
+    if status is None:
+        return jsonify({"error": "任务不存在"}), 404
+    return jsonify(status)
+
+def _workouts():
+    return WorkoutStore(os.path.join(user_data.partition_dir(g.user_id), 'workouts'))
+
+@health.route('/workouts', methods=['POST'])
+def upload_workout():
+    """
+    上传手表导出的一次运动（表单字段 file，或直接把文件作为请求体并带上 ?format=gpx/tcx/csv），
+    可选 sport 指定运动项目。新运动会自动生成一条每日记录。
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        content = upload.read()
+        filename = upload.filename or ''
+    else:
+        content = request.get_data()
+        filename = ''
+    fmt = (request.args.get('format') or os.path.splitext(filename)[1].lstrip('.')).lower()
+    sport = request.form.get('sport') or request.args.get('sport')
+    try:
+        meta, created = _workouts().ingest(content, fmt, sport=sport, source=filename or None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    record = None
+    if created:
+        record = g.fitness_data.add_record(daily_record(meta))
+        _data_changed()
+    return jsonify({"workout": meta, "created": created, "record": record}), 201 if created else 200
+
+@health.route('/workouts', methods=['GET'])
+def list_workouts():
+    """from / to 为 Unix 秒或日期（含 to 这一整天）"""
+    args = request.args
+    try:
+        workouts = _workouts().list(parse_bound(args.get('from')), parse_bound(args.get('to'), end=True))
+    except ValueError as e:
+        return jsonify({"error": f"查询参数错误: {e}"}), 400
+    return jsonify({"data": workouts, "count": len(workouts)})
+
+def _series_response(workout_id=None):
+    """series=heart_rate/speed/cadence/pace，width=像素宽度，from/to 为 Unix 秒或日期"""
+    args = request.args
+    try:
+        data = _workouts().series(
+            args.get('series', 'heart_rate'),
+            args.get('width', 800, type=int),
+            start=parse_bound(args.get('from')),
+            end=parse_bound(args.get('to'), end=True),
+            workout_id=workout_id
+        )
+    except KeyError:
+        return jsonify({"error": "运动不存在"}), 404
+    except ValueError as e:
+        return jsonify({"error": f"查询参数错误: {e}"}), 400
+    return jsonify(data)
+
+@health.route('/workouts/series', methods=['GET'])
+def get_workouts_series():
+    """时间范围内所有运动的降采样序列"""
+    return _series_response()
+
+@health.route('/workouts/<workout_id>/series', methods=['GET'])
+def get_workout_series(workout_id):
+    return _series_response(workout_id)
+
+@health.route('/tips', methods=['GET'])
 def get_tips():
     tip = get_health_tip()
     return jsonify({"tip": tip})
 
-@app.route('/api/health/stats', methods=['GET'])
+@health.route('/stats', methods=['GET'])
+@response_cache.cached
 def get_stats():
-    data = fitness_data.get_all_data()
-    analysis = fitness_data.get_recent_analysis()
+    analysis = g.fitness_data.get_recent_analysis()
     return jsonify({
-        "total_records": len(data),
-        "analysis": analysis
+        "total_records": g.fitness_data.count(),
+        "analysis": analysis,
+        "windows": {
+            "7d": g.fitness_data.get_window_stats(7),
+            "28d": g.fitness_data.get_window_stats(28)
+        }
     })
 
+@health.route('/rollups', methods=['GET'])
+@response_cache.cached
+def get_rollups():
+    """趋势汇总：granularity=day/week/month（默认 week），from / to 日期范围"""
+    args = request.args
+    granularity = args.get('granularity', 'week')
+    try:
+        data = g.fitness_data.get_rollups(granularity, args.get('from'), args.get('to'))
+    except ValueError as e:
+        return jsonify({"error": f"查询参数错误: {e}"}), 400
+    return jsonify({"granularity": granularity, "count": len(data), "data": data})
+
+@health.route('/search', methods=['GET'])
+def search_notes():
+    """
+    心路历程全文检索：q 关键词（必填），from / to 日期范围，sport 运动项目，limit 返回条数（默认 20）。
+    心路历程文件不计入数据版本，所以这里不使用响应缓存。
+    """
+    args = request.args
+    query = (args.get('q') or '').strip()
+    if not query:
+        return jsonify({"error": "缺少搜索关键词 q"}), 400
+    limit = max(1, min(args.get('limit', 20, type=int), MAX_SEARCH_RESULTS))
+    try:
+        result = g.fitness_data.search_notes(query, args.get('from'), args.get('to'), args.get('sport'), limit)
+    except ValueError as e:
+        return jsonify({"error": f"查询参数错误: {e}"}), 400
+    return jsonify({"query": query, **result})
+
+@health.route('/forecast', methods=['GET'])
+@response_cache.cached
+def get_forecast():
+    """下周运动时长和睡眠预测，as_of 可指定从哪一天往后预测"""
+    try:
+        forecast = g.fitness_data.get_forecast(request.args.get('as_of'))
+    except ValueError as e:
+        return jsonify({"error": f"查询参数错误: {e}"}), 400
+    if forecast is None:
+        return jsonify({"error": "暂无数据"})
+    return jsonify(forecast)
+
+@health.route('/export', methods=['GET'])
+def export_records():
+    """
+    流式导出记录：format=csv|ndjson|parquet（默认 csv），from / to 日期范围。
+    边读存储边发送，第一批记录读出后就开始下载，服务端内存与记录数无关；
+    请求头 Accept-Encoding 含 gzip 时 CSV / NDJSON 压缩传输。
+    """
+    args = request.args
+    fmt = args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"不支持的导出格式: {fmt}，可选 {'/'.join(EXPORT_FORMATS)}"}), 400
+    content_type, batch_size = EXPORT_FORMATS[fmt]
+    try:
+        batches = g.fitness_data.iter_export_batches(args.get('from'), args.get('to'), batch_size)
+        chunks = export_chunks(fmt, batches)
+    except ValueError as e:
+        return jsonify({"error": f"查询参数错误: {e}"}), 400
+    except ImportError as e:
+        return jsonify({"error": str(e)}), 501
+    headers = {'Content-Disposition': f'attachment; filename=fitness_records.{fmt}', 'Cache-Control': 'no-store'}
+    if fmt != 'parquet':
+        headers['Vary'] = 'Accept-Encoding'
+        if 'gzip' in request.accept_encodings:
+            chunks = gzip_chunks(chunks)
+            headers['Content-Encoding'] = 'gzip'
+    return Response(chunks, content_type=content_type, headers=headers)
+
+app.register_blueprint(health, url_prefix='/api/health')
+app.register_blueprint(health, url_prefix='/api/users/<user_id>/health', name='user_health')
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(response_cache.stats())
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus 文本格式的耗时指标"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
 
@@ -0,0 +1,122 @@
+"""
+流式导出：把逐批读取的记录编码成 CSV / NDJSON / Parquet 字节块，边读边发送，
+服务端内存只与每批的记录数有关，和记录总数无关。
+
+- CSV 用 csv 模块写（含逗号、引号、换行的心路历程会正确加引号），开头带 UTF-8 BOM 方便 Excel 打开，
+  列固定为 RECORD_SCHEMA 的字段；NDJSON 每行一条完整记录
+- Parquet 每批写成一个行组，写完立即把已生成的字节发出去
+- CSV / NDJSON 可以再经过 gzip_chunks 边压缩边发送（Parquet 本身已经压缩）
+"""
+import csv
+import io
+import json
+import zlib
+
+import pandas as pd
+
+from schema import RECORD_SCHEMA, coerce_frame
+
+# 格式 -> (Content-Type, 每批记录数)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 1000),
+    'ndjson': ('application/x-ndjson; charset=utf-8', 1000),
+    # 行组太小时压缩率差、读取也慢，所以每批多一些
+    'parquet': ('application/vnd.apache.parquet', 5000),
+}
+CSV_FIELDS = list(RECORD_SCHEMA)
+
+def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    buffer.write('\ufeff')
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # 没有任何记录时只有表头
+        yield buffer.getvalue().encode('utf-8')
+
+def ndjson_chunks(batches):
+    for batch in batches:
+        yield ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in batch).encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter 的输出目标：写入的字节先攒着，由 drain() 取走"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('id', pa.int64()),
+        ('日期', pa.timestamp('s')),
+        # 各批的运动项目不同，不用字典编码的 category，保证每个行组的 schema 一致
+        ('运动项目', pa.string()),
+        ('运动时长', pa.float32()),
+        ('睡眠时长', pa.float32()),
+        ('睡眠质量', pa.int8()),
+        ('心路历程', pa.string()),
+        ('created_at', pa.string()),
+    ])
+
+def parquet_chunks(batches):
+    """需要 pyarrow；没有安装时在调用时（开始发送之前）就抛出 ImportError"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _parquet_schema()
+
+    def generate():
+        sink = _ChunkSink()
+        with pq.ParquetWriter(sink, schema) as writer:
+            for batch in batches:
+                frame = coerce_frame(pd.DataFrame(batch, columns=CSV_FIELDS), RECORD_SCHEMA)
+                frame['运动项目'] = frame['运动项目'].astype('string')
+                writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+                yield sink.drain()
+        # 文件尾（元数据）在关闭时写入
+        yield sink.drain()
+
+    return generate()
+
+def export_chunks(fmt, batches):
+    """按格式编码，返回字节块的迭代器"""
+    if fmt == 'csv':
+        return csv_chunks(batches)
+    if fmt == 'ndjson':
+        return ndjson_chunks(batches)
+    if fmt == 'parquet':
+        return parquet_chunks(batches)
+    raise ValueError(f"不支持的导出格式: {fmt}")
+
+def gzip_chunks(chunks, level=6):
+    """逐块 gzip 压缩；每块之后同步刷新，客户端能立即解压出已发送的部分"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
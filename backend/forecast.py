@@ -0,0 +1,210 @@
+"""
+下周运动时长和睡眠时长的预测。
+
+用截至某天的滚动特征（最近 7 天运动总时长、最近 28 天平均每周运动时长、最近 7 天运动天数、
+最近 7 天 / 28 天平均睡眠）预测之后 7 天的运动总时长和平均睡眠时长。模型为岭回归，
+拟合的是相对最近 7 天实际值的变化量，系数全为 0 时就是「和上周一样」，样本少时向它收缩。
+
+只保存充分统计量 XᵀX 和 Xᵀy。某一天的目标窗口（之后 7 天）完全早于最新记录日期后，
+这一天作为一行样本加入统计量，之后不再变化；新记录只追加新的行，不从头重新拟合。
+最近 28 天都没有记录的日子不作为样本，所以长时间的空档（包括误填的远期日期）不会产生大量全 0 样本，
+计算量与有记录的天数有关，与记录跨越的日期范围无关。
+补录最新日期之前的记录会影响已加入的样本，此时按整个日历重算一次。
+系数在统计量变化后第一次预测时求解（4 元线性方程组），之后直接复用，
+因此一次预测只需读取最近 28 天的日小计，与历史长度无关。
+"""
+from datetime import timedelta
+
+import numpy as np
+
+HORIZON = 7
+SHORT_WINDOW = 7
+LONG_WINDOW = 28
+# 正则化强度，相当于在标准化后的特征上加入这么多个「变化量为 0」的样本
+RIDGE_ALPHA = 10.0
+# 样本少于这个数时用最近 7 天的实际值作为预测
+MIN_SAMPLES = 8
+
+TARGETS = ('duration', 'sleep')
+FEATURES = {
+    'duration': ('intercept', 'duration_7d', 'weekly_duration_28d', 'active_days_7d'),
+    'sleep': ('intercept', 'sleep_7d', 'sleep_28d', 'duration_7d_hours'),
+}
+
+
+def _calendar(daily, first, last):
+    """[first, last] 每天的 (运动时长, 是否运动, 睡眠合计, 睡眠条数)，没有记录的日子为 0"""
+    days = (last - first).days + 1
+    values = np.zeros((4, max(days, 0)))
+    for offset in range(days):
+        totals = daily.get(first + timedelta(days=offset))
+        if totals is not None:
+            values[:, offset] = (
+                totals.duration_sum, bool(totals.active_dates), totals.sleep_sum, totals.sleep_count
+            )
+    return values
+
+
+def _active_ranges(daily, first, last):
+    """[first, last] 中最近 28 天内有记录的日子，合并成若干连续区间 [(开始, 结束), ...]"""
+    reach = timedelta(days=LONG_WINDOW - 1)
+    ranges = []
+    for day in sorted(day for day in daily if first - reach <= day <= last):
+        start, end = max(day, first), min(day + reach, last)
+        if ranges and start <= ranges[-1][1] + timedelta(days=1):
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+def _window_sums(prefix, end, window):
+    """prefix 为带前导 0 的累加和，返回以 end（含）结尾、长度为 window 的窗口和"""
+    return prefix[..., end + 1] - prefix[..., np.maximum(end + 1 - window, 0)]
+
+
+def _features(daily, history_start, first, last):
+    """
+    第 first..last 天的特征矩阵 {目标: X}（行与日期一一对应），以及之后 7 天的目标值
+    相对最近 7 天实际值（X 的第二列）的变化量。
+    history_start 为最早记录日期，28 天平均每周时长只按有历史的天数计算。
+    """
+    start = first - timedelta(days=LONG_WINDOW - 1)
+    values = _calendar(daily, start, last + timedelta(days=HORIZON))
+    prefix = np.concatenate([np.zeros((4, 1)), np.cumsum(values, axis=1)], axis=1)
+    rows = np.arange(LONG_WINDOW - 1, LONG_WINDOW + (last - first).days)
+
+    duration_7d, active_7d, sleep_sum_7d, sleep_count_7d = _window_sums(prefix, rows, SHORT_WINDOW)
+    duration_28d, _, sleep_sum_28d, sleep_count_28d = _window_sums(prefix, rows, LONG_WINDOW)
+    history_days = np.minimum((first - history_start).days + rows - (LONG_WINDOW - 1) + 1, LONG_WINDOW)
+    next_duration, _, next_sleep_sum, next_sleep_count = _window_sums(prefix, rows + HORIZON, HORIZON)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sleep_7d = sleep_sum_7d / sleep_count_7d
+        sleep_28d = sleep_sum_28d / sleep_count_28d
+        next_sleep = next_sleep_sum / next_sleep_count
+    ones = np.ones(len(rows))
+    features = {
+        'duration': np.column_stack([ones, duration_7d, duration_28d / np.maximum(history_days, 1) * 7, active_7d]),
+        'sleep': np.column_stack([ones, sleep_7d, sleep_28d, duration_7d / 60]),
+    }
+    targets = {'duration': next_duration - duration_7d, 'sleep': next_sleep - sleep_7d}
+    return features, targets
+
+
+class Forecaster:
+    """
+    增量维护的预测模型，数据来自 RunningAggregates 的日小计（daily 为同一个 dict）。
+    observe() 在每条记录加入日小计后调用，样本的追加推迟到下一次 predict()。
+    """
+
+    def __init__(self, daily):
+        self.daily = daily
+        self.first_day = None
+        self.latest_day = None
+        # 已加入统计量的最后一天（目标窗口 <= latest_day - 1）
+        self.fitted_through = None
+        self.stale = False
+        self._reset()
+
+    def _reset(self):
+        self.xtx = {target: np.zeros((len(FEATURES[target]),) * 2) for target in TARGETS}
+        self.xty = {target: np.zeros(len(FEATURES[target])) for target in TARGETS}
+        self.samples = {target: 0 for target in TARGETS}
+        self._coefficients = {}
+
+    def observe(self, day):
+        """某一天的日小计发生了变化"""
+        if day is None:
+            return
+        if self.fitted_through is not None and day <= self.fitted_through + timedelta(days=HORIZON):
+            # 补录：落在已加入样本的特征或目标窗口里
+            self.stale = True
+        if self.first_day is None or day < self.first_day:
+            self.first_day = day
+        if self.latest_day is None or day > self.latest_day:
+            self.latest_day = day
+
+    def _sync(self):
+        """把目标窗口已经完整的新样本加入 XᵀX / Xᵀy"""
+        if self.latest_day is None:
+            return
+        if self.stale:
+            self._reset()
+            self.fitted_through = None
+            self.stale = False
+        # 第一行样本需要满一周的历史
+        first = self.first_day + timedelta(days=SHORT_WINDOW - 1)
+        if self.fitted_through is not None:
+            first = max(first, self.fitted_through + timedelta(days=1))
+        last = self.latest_day - timedelta(days=HORIZON + 1)
+        if last < first:
+            return
+        for start, end in _active_ranges(self.daily, first, last):
+            features, targets = _features(self.daily, self.first_day, start, end)
+            for target in TARGETS:
+                X, y = features[target], targets[target]
+                valid = np.isfinite(X).all(axis=1) & np.isfinite(y)
+                X, y = X[valid], y[valid]
+                self.xtx[target] += X.T @ X
+                self.xty[target] += X.T @ y
+                self.samples[target] += len(y)
+                self._coefficients.pop(target, None)
+        self.fitted_through = last
+
+    def coefficients(self, target):
+        """
+        岭回归系数，样本不足时返回 None。
+        各特征的方差可以直接从 XᵀX 得到，惩罚项按方差缩放，等价于先标准化特征（截距方差为 0，不参与正则化）。
+        """
+        self._sync()
+        samples = self.samples[target]
+        if samples < MIN_SAMPLES:
+            return None
+        if target not in self._coefficients:
+            xtx = self.xtx[target]
+            mean = xtx[0] / samples
+            variance = np.maximum(np.diag(xtx) / samples - mean ** 2, 0)
+            # 特征恒定时矩阵奇异，用最小二乘解
+            self._coefficients[target] = np.linalg.lstsq(
+                xtx + np.diag(RIDGE_ALPHA * variance), self.xty[target], rcond=None
+            )[0]
+        return self._coefficients[target]
+
+    def predict(self, as_of=None):
+        """
+        预测 as_of（date，默认最新记录日期）之后 7 天的运动总时长和平均睡眠时长。
+        as_of 早于最早记录时返回 None。
+        """
+        self._sync()
+        if self.latest_day is None:
+            return None
+        as_of = as_of or self.latest_day
+        if as_of < self.first_day:
+            return None
+        features, _ = _features(self.daily, self.first_day, as_of, as_of)
+        x = {target: features[target][0] for target in TARGETS}
+
+        forecast = {
+            "as_of": as_of.isoformat(),
+            "from": (as_of + timedelta(days=1)).isoformat(),
+            "to": (as_of + timedelta(days=HORIZON)).isoformat(),
+        }
+        # 样本不足或最近缺少睡眠数据时，用最近 7 天（睡眠没有则用 28 天）的实际值
+        sleep_recent = x['sleep'][1] if np.isfinite(x['sleep'][1]) else x['sleep'][2]
+        for target, fallback, upper in (('duration', x['duration'][1], None), ('sleep', sleep_recent, 24)):
+            coefficients = self.coefficients(target)
+            if coefficients is not None and np.isfinite(x[target]).all():
+                value, method = float(x[target][1] + x[target] @ coefficients), 'ridge'
+            else:
+                value, method = float(fallback), 'recent'
+            value = None if not np.isfinite(value) else round(float(np.clip(value, 0, upper)), 1)
+            forecast[target] = {
+                "predicted": value,
+                "recent_7d": None if not np.isfinite(x[target][1]) else round(float(x[target][1]), 1),
+                "method": method,
+                "samples": self.samples[target],
+            }
+        if forecast['duration']['predicted'] is not None:
+            forecast['duration']['predicted_daily'] = round(forecast['duration']['predicted'] / HORIZON, 1)
+        return forecast
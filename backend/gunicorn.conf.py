@@ -0,0 +1,10 @@
+# gunicorn 配置，均可用环境变量覆盖
+import multiprocessing
+import os
+
+bind = os.environ.get('FITNESS_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('FITNESS_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('FITNESS_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('FITNESS_TIMEOUT', 30))
+accesslog = '-'
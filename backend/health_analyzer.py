@@ -1,6 +1,9 @@
 import random
 import pandas as pd
 
+from metrics import metrics
+from schema import parse_dates
+
 HEALTH_TIPS = [
     "💡 记得运动前热身，运动后拉伸",
     "💧 保持充足水分摄入，运动时尤其重要",
@@ -9,31 +12,74 @@ HEALTH_TIPS = [
     "🚶 即使不运动，也多站起来活动"
 ]
 
+# 对比基线：同一运动项目在过去4周内的平均时长
+BASELINE_WINDOW = '28D'
+
 def get_health_tip():
     return random.choice(HEALTH_TIPS)
 
-def generate_per_run_ai_summary(record, all_data):
+def _run_frame(all_data):
+    """把记录列表一次性转换成计算基线所需的列"""
+    df = pd.DataFrame(all_data)
+    if df.empty:
+        return pd.DataFrame(columns=['sport', 'date', 'duration'])
+    return pd.DataFrame({
+        'sport': df['运动项目'].fillna('').astype(str) if '运动项目' in df.columns else '',
+        'date': parse_dates(df['日期']) if '日期' in df.columns else pd.NaT,
+        'duration': pd.to_numeric(df['运动时长'], errors='coerce') if '运动时长' in df.columns else float('nan'),
+    })
+
+def compute_run_baselines(all_data):
     """
-    生成单条运动记录的 AI 小结。
-    record: 单条记录
-    all_data: 所有记录，用于计算4周平均/统计
+    一次向量化计算所有记录的对比基线。
+    返回与 all_data 顺序一致的 Series：同项目、记录日期之前4周内的平均时长，
+    没有可比较的历史记录时为 NaN。
     """
-    df = pd.DataFrame(all_data)
-    
-    # 计算4周平均 pace
-    if '运动时长' in df.columns and '运动项目' in df.columns:
-        avg_duration = df['运动时长'].mean()
-    else:
-        avg_duration = 0
+    frame = _run_frame(all_data)
+    baselines = pd.Series(float('nan'), index=frame.index)
+    valid = frame.dropna(subset=['date'])
+    if valid.empty:
+        return baselines
 
-    # 简单占位逻辑，可换成 DeepSeek / OpenAI 调用
-    pace = record.get('运动时长', 0)
-    if pace > avg_duration:
-        trend = "比过去平均稍长，注意控制运动强度"
+    # 先按 项目+日期 汇总，再对每个项目做时间窗口滚动求和，closed='left' 排除当天的全部记录。
+    # 同一天有多条记录时，pandas 2.0 的 closed='left' 会把当天更早的行算进窗口，所以不能直接对原始行滚动
+    daily = valid.groupby(['sport', 'date'])['duration'].agg(['sum', 'count'])
+    rolled = (
+        daily.reset_index('sport')
+        .groupby('sport', sort=False)[['sum', 'count']]
+        .rolling(BASELINE_WINDOW, closed='left')
+        .sum()
+    )
+    means = (rolled['sum'] / rolled['count'].where(rolled['count'] > 0))
+    keys = pd.MultiIndex.from_frame(valid[['sport', 'date']])
+    baselines.loc[valid.index] = means.reindex(keys).to_numpy()
+    return baselines
+
+def compute_run_baseline(record, all_data):
+    """只计算单条记录的基线，用于按 id 查询"""
+    frame = _run_frame(all_data)
+    date = parse_dates(pd.Series([record.get('日期')])).iloc[0]
+    if pd.isna(date) or frame.empty:
+        return float('nan')
+    window_start = date - pd.Timedelta(BASELINE_WINDOW)
+    mask = (
+        (frame['sport'] == str(record.get('运动项目') or ''))
+        & (frame['date'] >= window_start)
+        & (frame['date'] < date)
+    )
+    return frame.loc[mask, 'duration'].mean()
+
+def build_run_summary(record, baseline):
+    """根据基线生成小结内容（本地规则，未配置大模型时 summary_jobs 也用它）"""
+    pace = pd.to_numeric(record.get('运动时长', 0), errors='coerce')
+    if pd.isna(baseline) or pd.isna(pace):
+        trend = "过去4周暂无同类运动记录可比较"
+    elif pace > baseline:
+        trend = "比过去4周平均稍长，注意控制运动强度"
     else:
-        trend = "比过去平均稍短，表现不错"
+        trend = "比过去4周平均稍短，表现不错"
 
-    summary = {
+    return {
         "observations": [
             f"您在{record.get('日期')}的{record.get('运动项目')}记录被保存。",
             f"运动时长: {record.get('运动时长')}分钟，{trend}",
@@ -44,4 +90,22 @@ def generate_per_run_ai_summary(record, all_data):
             "可适当调整运动强度，避免疲劳积累。"
         ]
     }
-    return summary
+
+def _summary_item(record, baseline):
+    return {
+        "id": record.get("id"),
+        "日期": record.get("日期"),
+        "运动项目": record.get("运动项目"),
+        "summary": build_run_summary(record, baseline)
+    }
+
+def generate_per_run_summaries(all_data):
+    """批量生成所有记录的小结，只构建一次 DataFrame"""
+    with metrics.timer('per_run_summaries'):
+        baselines = compute_run_baselines(all_data)
+        return [_summary_item(record, baseline) for record, baseline in zip(all_data, baselines)]
+
+def generate_per_run_summary(record, all_data):
+    """生成单条记录的小结（含 id/日期/项目）"""
+    with metrics.timer('per_run_summary'):
+        return _summary_item(record, compute_run_baseline(record, all_data))
@@ -0,0 +1,83 @@
+"""
+本地的 OpenAI 兼容桩服务，用于在不联网、不花钱的情况下调试小结任务队列：
+
+    python llm_stub.py --port 8001 --delay 0.2 --fail-rate 0.2
+    FITNESS_LLM_BASE_URL=http://127.0.0.1:8001/v1 python app.py
+
+只实现 POST /v1/chat/completions：把最后一条用户消息当作记录数组，
+为每条记录返回固定格式的小结。--fail-rate 按比例返回 503，用来验证重试。
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def _summaries(records):
+    summaries = []
+    for record in records:
+        baseline = record.get('过去4周同项目平均时长')
+        trend = "暂无同类记录可比较" if baseline is None else f"过去4周平均 {baseline} 分钟"
+        summaries.append({
+            "observations": [
+                f"{record.get('日期')} {record.get('运动项目')} {record.get('运动时长')} 分钟，{trend}",
+                f"睡眠 {record.get('睡眠时长')} 小时",
+            ],
+            "suggestions": ["（桩服务）保持规律运动"],
+        })
+    return summaries
+
+class StubHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    fail_rate = 0.0
+    requests = 0
+
+    def _reply(self, status, body):
+        content = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        type(self).requests += 1
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._reply(404, {"error": {"message": "not found"}})
+            return
+        time.sleep(self.delay)
+        if random.random() < self.fail_rate:
+            self._reply(503, {"error": {"message": "stub: simulated overload"}})
+            return
+        records = json.loads(body['messages'][-1]['content'])
+        content = json.dumps({"summaries": _summaries(records)}, ensure_ascii=False)
+        self._reply(200, {
+            "id": f"stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get('model', 'stub'),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port=8001, delay=0.0, fail_rate=0.0):
+    """创建桩服务，调用 serve_forever() 开始处理请求"""
+    StubHandler.delay = delay
+    StubHandler.fail_rate = fail_rate
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='OpenAI 兼容的本地桩服务')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--delay', type=float, default=0.0, help='每次请求的模拟延迟（秒）')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='返回 503 的比例')
+    args = parser.parse_args()
+    server = serve(args.port, args.delay, args.fail_rate)
+    print(f"桩服务已启动: http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
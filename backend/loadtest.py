@@ -0,0 +1,107 @@
+"""
+本地并发写入压测：验证并发写入不丢记录、ID 不重复，并报告吞吐量。
+
+    python loadtest.py                       # 多进程直接写同一个数据目录（模拟多个 worker）
+    python loadtest.py --storage log         # 指定存储后端
+    python loadtest.py --url http://127.0.0.1:5000/api   # 压测已启动的服务（如 gunicorn）
+"""
+import argparse
+import json
+import multiprocessing
+import shutil
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+def _make_record(client, index):
+    return {
+        '日期': f"2025-01-{index % 28 + 1:02d}",
+        '运动项目': f"压测{client}",
+        '运动时长': index % 60,
+        '睡眠时长': 7,
+        '睡眠质量': 4,
+    }
+
+def _local_client(client, count, kind, data_dir, start_event, done_queue):
+    from models import FitnessData, create_storage
+    fitness_data = FitnessData(create_storage(kind, data_dir))
+    start_event.wait()
+    for index in range(count):
+        fitness_data.add_record(_make_record(client, index))
+    done_queue.put(client)
+
+def run_local(clients, per_client, kind):
+    """clients 个进程同时写同一个临时数据目录"""
+    from models import FitnessData, create_storage
+    data_dir = tempfile.mkdtemp(prefix='fitness-loadtest-')
+    try:
+        create_storage(kind, data_dir)
+        start_event = multiprocessing.Event()
+        done_queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_local_client, args=(client, per_client, kind, data_dir, start_event, done_queue))
+            for client in range(clients)
+        ]
+        for process in processes:
+            process.start()
+        # 等子进程完成导入后再同时开始计时
+        time.sleep(1)
+        started = time.perf_counter()
+        start_event.set()
+        for _ in processes:
+            done_queue.get()
+        elapsed = time.perf_counter() - started
+        for process in processes:
+            process.join()
+        records = FitnessData(create_storage(kind, data_dir)).get_all_data()
+        return elapsed, [record['id'] for record in records]
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def _request(url, payload=None):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def run_http(base_url, clients, per_client):
+    """clients 个线程同时向已启动的服务发 POST"""
+    before = {record['id'] for record in _request(f"{base_url}/health/records")['data']}
+
+    def client_loop(client):
+        for index in range(per_client):
+            _request(f"{base_url}/health/records", _make_record(client, index))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client_loop, range(clients)))
+    elapsed = time.perf_counter() - started
+    records = _request(f"{base_url}/health/records")['data']
+    return elapsed, [record['id'] for record in records if record['id'] not in before]
+
+def main():
+    parser = argparse.ArgumentParser(description='FitnessData 并发写入压测')
+    parser.add_argument('--clients', default='1,4,16', help='并发客户端数量，逗号分隔')
+    parser.add_argument('--records', type=int, default=50, help='每个客户端写入的记录数')
+    parser.add_argument('--storage', default='json', help='本地模式使用的存储后端')
+    parser.add_argument('--url', help='压测已启动服务的 API 地址，如 http://127.0.0.1:5000/api')
+    args = parser.parse_args()
+
+    failed = False
+    for clients in [int(value) for value in args.clients.split(',')]:
+        if args.url:
+            elapsed, ids = run_http(args.url.rstrip('/'), clients, args.records)
+        else:
+            elapsed, ids = run_local(clients, args.records, args.storage)
+        expected = clients * args.records
+        lost = expected - len(ids)
+        duplicates = len(ids) - len(set(ids))
+        ok = lost == 0 and duplicates == 0
+        failed = failed or not ok
+        print(f"{clients:>3} 个客户端: 写入 {expected} 条, 丢失 {lost}, 重复ID {duplicates}, "
+              f"耗时 {elapsed:.2f}s, 吞吐 {expected / elapsed:.0f} 条/秒 {'✅' if ok else '❌'}")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
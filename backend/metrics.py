@@ -0,0 +1,152 @@
+"""
+进程内的耗时统计：按标签分组的直方图，输出 Prometheus 文本格式，不依赖 prometheus_client。
+gunicorn 多 worker 时每个 worker 各自统计，抓取到的是处理该请求的 worker 的数据。
+
+    with metrics.timer('json_parse'):
+        ...
+
+开启 Server-Timing 后，同一请求内的各段耗时会合并写入响应头，浏览器开发者工具里可以直接看到。
+"""
+import bisect
+import os
+import threading
+import time
+
+# 直方图分桶上限（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_METRIC = 'http_request_duration_seconds'
+OPERATION_METRIC = 'fitness_operation_seconds'
+
+METRIC_HELP = {
+    HTTP_METRIC: '接口响应耗时（按路由、方法、状态码）',
+    OPERATION_METRIC: '后端热点操作耗时（文件读取、JSON 解析、DataFrame 构建、分析等）',
+}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=''):
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+class _Timer:
+    """metrics.timer() 返回的上下文管理器，用类而不是生成器，进出开销更小"""
+    __slots__ = ('metrics', 'operation', 'started')
+
+    def __init__(self, metrics, operation):
+        self.metrics = metrics
+        self.operation = operation
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe_operation(self.operation, time.perf_counter() - self.started)
+        return False
+
+class Metrics:
+    """
+    直方图数据按 (指标名, 标签值) 存放：[各桶计数, 总耗时, 总次数]。
+    每次记录只做一次二分查找和几次加法，单条开销在微秒以内。
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._label_names = {
+            HTTP_METRIC: ('route', 'method', 'status'),
+            OPERATION_METRIC: ('operation',),
+        }
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def observe(self, name, seconds, labels=()):
+        index = bisect.bisect_left(self.buckets, seconds)
+        key = (name, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def observe_operation(self, operation, seconds):
+        self.observe(OPERATION_METRIC, seconds, (operation,))
+        spans = getattr(self._local, 'spans', None)
+        if spans is not None:
+            spans[operation] = spans.get(operation, 0.0) + seconds
+
+    def timer(self, operation):
+        """统计一段代码的耗时：with metrics.timer('frame_build'): ..."""
+        return _Timer(self, operation)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """Prometheus 文本格式（桶计数为累计值）"""
+        with self._lock:
+            snapshot = [(key, (list(series[0]), series[1], series[2])) for key, series in self._series.items()]
+        bounds = [repr(float(bound)) for bound in self.buckets] + ['+Inf']
+        lines = []
+        for name in self._label_names:
+            rows = sorted((labels, series) for (metric, labels), series in snapshot if metric == name)
+            lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            label_names = self._label_names[name]
+            for labels, (counts, total, count) in rows:
+                cumulative = 0
+                for bound, bucket_count in zip(bounds, counts):
+                    cumulative += bucket_count
+                    bucket_labels = _format_labels(label_names, labels, f'le="{bound}"')
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(label_names, labels)} {total}")
+                lines.append(f"{name}_count{_format_labels(label_names, labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app, server_timing=None):
+        """
+        注册请求计时钩子。server_timing 默认读取环境变量 FITNESS_SERVER_TIMING，
+        为真时在响应头里加上 Server-Timing（总耗时 + 请求内各操作耗时）。
+        """
+        from flask import g, request
+
+        if server_timing is None:
+            server_timing = os.environ.get('FITNESS_SERVER_TIMING', '') not in ('', '0', 'false')
+
+        @app.before_request
+        def _start_timer():
+            g.request_started = time.perf_counter()
+            if server_timing:
+                self._local.spans = {}
+
+        @app.after_request
+        def _record_timing(response):
+            started = g.pop('request_started', None)
+            if started is None:
+                return response
+            elapsed = time.perf_counter() - started
+            rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            labels = (rule, request.method, str(response.status_code))
+            if response.is_streamed:
+                # 流式响应（如导出）的正文在这之后才生成，等响应发送完、关闭时再记录总耗时
+                response.call_on_close(lambda: self.observe(HTTP_METRIC, time.perf_counter() - started, labels))
+            else:
+                self.observe(HTTP_METRIC, elapsed, labels)
+            if server_timing:
+                spans = self._local.spans or {}
+                self._local.spans = None
+                entries = [f"{operation};dur={seconds * 1000:.2f}" for operation, seconds in spans.items()]
+                entries.append(f"app;dur={elapsed * 1000:.2f}")
+                response.headers['Server-Timing'] = ', '.join(entries)
+            return response
+
+        return app
+
+metrics = Metrics()
@@ -1,89 +1,528 @@
-import json
+import hashlib
+import itertools
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+from aggregates import RunningAggregates, parse_day
+from analytics import RollingAnalytics
+from metrics import metrics
+from search import JOURNAL_FILE_NAME, SearchIndex, parse_journal
+from schema import INVALID_QUALITY_MESSAGE, RECORD_SCHEMA, coerce_frame, invalid_quality
+from storage import JsonFileStorage, AppendLogStorage, SQLiteStorage, ParquetStorage, migrate_json_array
+
+DATA_DIR = os.environ.get('FITNESS_DATA_DIR', 'data')
+REQUIRED_FIELDS = ['日期', '运动项目', '运动时长', '睡眠时长']
+NUMERIC_FIELDS = ['运动时长', '睡眠时长']
+USER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+# 全进程共用的版本号序列：分区被淘汰后重新创建的 FitnessData 也不会重复用到旧的版本号
+_VERSIONS = itertools.count(1)
+
+def create_storage(kind=None, data_dir=DATA_DIR):
+    """根据配置创建存储后端，kind 默认读取环境变量 FITNESS_STORAGE（json / log / sqlite / parquet）"""
+    kind = kind or os.environ.get('FITNESS_STORAGE', 'json')
+    json_file = os.path.join(data_dir, 'fitness_data.json')
+    if kind == 'json':
+        return JsonFileStorage(json_file)
+    if kind == 'log':
+        log_file = os.path.join(data_dir, 'fitness_data.log')
+        migrate_json_array(json_file, log_file)
+        return AppendLogStorage(log_file)
+    if kind == 'sqlite':
+        return SQLiteStorage(os.path.join(data_dir, 'fitness_data.db'), import_json=json_file)
+    if kind == 'parquet':
+        return ParquetStorage(os.path.join(data_dir, 'fitness_data.parquet'), import_json=json_file)
+    raise ValueError(f"未知的存储类型: {kind}")
 
 class FitnessData:
-    def __init__(self):
-        self.data_file = 'data/fitness_data.json'
-        self._ensure_data_file()
+    """
+    健康数据访问入口。读取结果缓存在内存中（记录列表、类型化 DataFrame、增量汇总值），
+    缓存带单调递增的 data_version：本进程 add_record 或数据文件的
+    修改时间/大小变化（其他进程写入）都会换一个新的版本号并使缓存失效。
+    版本号在整个进程内唯一，按版本号缓存的响应不会被同一用户重建的分区误用。
+    记录列表在第一次需要时才读取：存储后端能直接回答的查询（如 SQLite 的汇总和按日期范围读取）
+    不会因为数据变化而重新读取全部记录。
+    """
+
+    def __init__(self, storage=None, journal_file=None):
+        self.storage = storage if storage is not None else create_storage()
+        self.journal_file = journal_file
+        self.data_version = 0
+        self._lock = threading.RLock()
+        self._fingerprint = None
+        self._records = None
+        self._frame = None
+        self._aggregates = None
+        self._running = None
+        # 按日期分组的记录（日期 -> 记录列表），滑动窗口分析只取最近几十天的记录
+        self._by_day = None
+        self._max_id = 0
+        self._analytics = RollingAnalytics()
+        # 心路历程全文索引，第一次搜索时建立；_search_version 为索引对应的数据版本
+        self._search = SearchIndex()
+        self._search_version = None
+        self._journal_stat = None
     
-    def _ensure_data_file(self):
-        """确保数据文件存在"""
-        os.makedirs('data', exist_ok=True)
-        if not os.path.exists(self.data_file):
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump([], f)
+    def _invalidate(self):
+        self.data_version = next(_VERSIONS)
+        self._frame = None
+        self._aggregates = None
     
+    def _refresh(self):
+        """数据文件有变化时使缓存失效（版本号加一），记录等到 _load() 时再读取"""
+        fingerprint = self.storage.fingerprint()
+        if self._fingerprint is None or fingerprint != self._fingerprint:
+            self._records = None
+            self._running = None
+            self._fingerprint = fingerprint
+            self._invalidate()
+    
+    def _load(self):
+        """需要全部记录或增量汇总值的操作先调用它：数据有变化或还没读取时读取全部记录"""
+        self._refresh()
+        if self._records is None:
+            self._records = self.storage.load_all()
+            with metrics.timer('aggregates_build'):
+                self._running = RunningAggregates()
+                self._by_day = defaultdict(list)
+                for record in self._records:
+                    self._index_record(record)
+            self._max_id = max((record.get('id') or 0 for record in self._records), default=0)
+    
+    def _index_record(self, record):
+        day = self._running.add(record)
+        if day is not None:
+            self._by_day[day].append(record)
+
     def get_all_data(self):
-        """获取所有数据"""
-        with open(self.data_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """获取所有数据（返回的是缓存，调用方不要修改）"""
+        with self._lock:
+            self._load()
+            return self._records
+    
+    def get_dataframe(self):
+        """获取按 RECORD_SCHEMA 类型化的 DataFrame（睡眠质量换算为 1-5 分）"""
+        with self._lock:
+            self._load()
+            if self._frame is None:
+                with metrics.timer('frame_build'):
+                    self._frame = build_frame(self._records)
+            return self._frame
+    
+    def get_version(self):
+        """当前数据版本号，调用时会先检查数据文件是否被其他进程修改"""
+        with self._lock:
+            self._refresh()
+            return self.data_version
+    
+    def get_sync_version(self):
+        """
+        增量同步用的版本号：当前最大记录ID。记录只追加不修改，
+        客户端带上它请求 since=版本号 即可拿到之后新增的记录。
+        """
+        with self._lock:
+            self._load()
+            return self._max_id
+    
+    def get_etag(self):
+        """由数据文件指纹（修改时间+大小）计算的 ETag，多个 worker 得到的值一致"""
+        with self._lock:
+            self._refresh()
+            return hashlib.sha1(repr(self._fingerprint).encode()).hexdigest()[:16]
+    
+    def get_last_modified(self):
+        """数据文件最后修改时间，无法确定时为 None"""
+        with self._lock:
+            self._refresh()
+            mtime_ns = self._fingerprint[0] if self._fingerprint else None
+            return datetime.fromtimestamp(mtime_ns / 1e9, tz=timezone.utc) if mtime_ns else None
+    
+    def query_records(self, date_from=None, date_to=None, sport=None, since=None, cursor=None, limit=None):
+        """
+        按条件筛选记录，在类型化 DataFrame 上向量化完成，返回 (记录列表, 下一页游标)。
+        date_from/date_to: 日期范围（含两端）；sport: 运动项目；
+        since: 整数表示只返回 id 大于它的记录，否则按 created_at 比较；
+        cursor/limit: 按 id 翻页，下一页游标为本页最后一条的 id，没有下一页时为 None。
+        日期无法识别时抛出 ValueError。
+        """
+        first, last = _parse_bounds(date_from, date_to)
+        with self._lock:
+            frame = self.get_dataframe()
+            records = self._records
+            mask = np.ones(len(frame), dtype=bool)
+            
+            def column(name):
+                return frame[name] if name in frame.columns else pd.Series(pd.NA, index=frame.index)
+            
+            if first:
+                mask &= (column('日期') >= pd.Timestamp(first)).fillna(False).to_numpy(dtype=bool)
+            if last:
+                mask &= (column('日期') <= pd.Timestamp(last)).fillna(False).to_numpy(dtype=bool)
+            if sport:
+                mask &= (column('运动项目').astype(object) == sport).to_numpy(dtype=bool)
+            if since not in (None, ''):
+                if str(since).isdigit():
+                    mask &= (column('id') > int(since)).fillna(False).to_numpy(dtype=bool)
+                else:
+                    mask &= (column('created_at').astype(object) > str(since)).fillna(False).to_numpy(dtype=bool)
+            if cursor not in (None, ''):
+                mask &= (column('id') > int(cursor)).fillna(False).to_numpy(dtype=bool)
+            
+            positions = np.flatnonzero(mask)
+            next_cursor = None
+            if limit is not None and len(positions) > limit:
+                positions = positions[:limit]
+                next_cursor = records[positions[-1]].get('id')
+            return [records[position] for position in positions], next_cursor
+    
+    def count(self):
+        """记录总数"""
+        return self.get_aggregates()['total_records']
     
     def add_record(self, record):
         """添加新记录"""
-        data = self.get_all_data()
-        
-        # 为记录添加ID和时间戳
-        record['id'] = len(data) + 1
-        record['created_at'] = datetime.now().isoformat()
-        
-        data.append(record)
-        
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        return record
+        return self.add_records([record])[0]
     
-    def get_recent_analysis(self):
-        """健康分析 - 基于您原来的逻辑"""
-        data = self.get_all_data()
-        if not data:
-            return {"error": "暂无数据"}
-        
-        df = pd.DataFrame(data)
-        
-        # 运动分析
-        if '运动时长' in df.columns:
-            avg_duration = df['运动时长'].mean()
-            active_days = len(df[df['运动时长'] > 0])
-            sport_variety = len(df['运动项目'].unique()) if '运动项目' in df.columns else 0
+    def add_records(self, records):
+        """
+        批量添加记录：连续分配ID，整批只写一次存储。
+        整个 读取最新数据-分配ID-写入 过程持有存储的跨进程写锁，
+        多线程/多 worker 同时写入也不会丢记录或分配重复ID。
+        """
+        if not records:
+            return []
+        with self._lock, self.storage.lock:
+            self._refresh()
+            # 为记录添加ID和时间戳
+            first_id = self.storage.next_id()
+            created_at = datetime.now().isoformat()
+            for offset, record in enumerate(records):
+                record['id'] = first_id + offset
+                record['created_at'] = created_at
             
-            if avg_duration > 45:
-                sport_analysis = "🏆 运动量很充足！继续保持！"
-            elif avg_duration > 25:
-                sport_analysis = "👍 运动习惯很好！"
+            self.storage.append_many(records)
+            if self._records is not None:
+                # 已经读入的记录和汇总值增量更新；还没读取时等需要时再读
+                self._records.extend(records)
+                for record in records:
+                    self._index_record(record)
+                self._max_id = max(self._max_id, records[-1]['id'])
+            self._fingerprint = self.storage.fingerprint()
+            indexed = self._search_version == self.data_version
+            self._invalidate()
+            if indexed:
+                for record in records:
+                    self._search.add(('record', record['id']), record.get('心路历程'), record.get('日期'), record.get('运动项目'))
+                self._search_version = self.data_version
+            return records
+    
+    def get_aggregates(self):
+        """
+        汇总统计：存储后端支持时直接用它的聚合查询（如 SQLite），
+        否则读取增量维护的 RunningAggregates。没有对应列时均值为 None。
+        """
+        with self._lock:
+            self._refresh()
+            if hasattr(self.storage, 'aggregate_stats'):
+                if self._aggregates is None:
+                    self._aggregates = self.storage.aggregate_stats()
+                return self._aggregates
+            self._load()
+            return self._running.snapshot()
+    
+    def get_window_stats(self, days, as_of=None):
+        """
+        最近 days 天（截至 as_of，默认最新记录日期）的滑动窗口统计。
+        存储后端支持按日期范围读取时（如 SQLite）只汇总这几天的记录。
+        """
+        if hasattr(self.storage, 'read_range'):
+            as_of = as_of or self.storage.date_bounds()[1]
+            if as_of is None:
+                return RunningAggregates().window(days)
+            records = self.storage.read_range(as_of - timedelta(days=days - 1), as_of)
+            return RunningAggregates.from_records(records).window(days, as_of)
+        with self._lock:
+            self._load()
+            return self._running.window(days, as_of)
+    
+    def get_rollups(self, granularity='day', date_from=None, date_to=None):
+        """按日 / 周 / 月的趋势汇总（增量维护，不遍历记录），日期无法识别时抛出 ValueError"""
+        bounds = _parse_bounds(date_from, date_to)
+        with self._lock:
+            self._load()
+            return self._running.rollups(granularity, *bounds)
+    
+    def iter_export_batches(self, date_from=None, date_to=None, batch_size=1000):
+        """
+        流式导出用：直接从存储逐批读取记录（每批一个列表，最多 batch_size 条），
+        不经过内存缓存，内存占用与记录总数无关。date_from/date_to 含两端，
+        日期无法识别时立即抛出 ValueError（在开始读取之前）。
+        """
+        bounds = _parse_bounds(date_from, date_to)
+        batches = self.storage.iter_batches(batch_size)
+        if not any(bounds):
+            return batches
+        return _filter_batches(batches, *bounds, batch_size)
+
+    def get_forecast(self, as_of=None):
+        """预测 as_of（默认最新记录日期）之后 7 天的运动总时长和平均睡眠时长，没有数据时返回 None"""
+        day = parse_day(as_of) if as_of else None
+        if as_of and day is None:
+            raise ValueError(f"无法识别的日期: {as_of}")
+        with self._lock:
+            self._load()
+            with metrics.timer('forecast'):
+                return self._running.forecaster.predict(day)
+    
+    def search_notes(self, query, date_from=None, date_to=None, sport=None, limit=20):
+        """
+        在心路历程（记录里的和心路历程文件）中全文检索，返回 {'total', 'results'}。
+        索引在第一次搜索时建立，之后随 add_records 增量更新；
+        数据文件被其他进程修改后只重新索引内容有变化的记录。
+        """
+        with self._lock:
+            self._load()
+            if self._search_version != self.data_version:
+                with metrics.timer('search_index'):
+                    self._search.sync_source('record', {
+                        record.get('id'): (record.get('心路历程'), record.get('日期'), record.get('运动项目'))
+                        for record in self._records
+                    })
+                self._search_version = self.data_version
+            self._sync_journal()
+        with metrics.timer('search'):
+            return self._search.search(query, date_from, date_to, sport, limit)
+    
+    def _sync_journal(self):
+        """
+        心路历程文件的修改时间/大小变化时重新索引。没写年份的日期参考记录里的日期，
+        所以数据版本变化时也重新解析（内容没变的段落不会重新索引）。
+        """
+        try:
+            stat = os.stat(self.journal_file) if self.journal_file else None
+        except FileNotFoundError:
+            stat = None
+        key = (stat.st_mtime_ns, stat.st_size, self.data_version) if stat else None
+        if key == self._journal_stat:
+            return
+        entries = []
+        if stat:
+            with open(self.journal_file, encoding='utf-8') as f:
+                entries = parse_journal(f.read(), self._running.daily)
+        self._search.sync_source('journal', {
+            number: (text, day, None) for number, (day, text) in enumerate(entries, 1)
+        })
+        self._journal_stat = key
+    
+    def get_rolling_summary(self, as_of=None):
+        """
+        截至 as_of（默认最新记录日期）最近 7 天 / 28 天的滑动窗口分析，按数据版本缓存。
+        只读取窗口需要的那几十天的记录：SQLite 按日期范围查询，其他存储取内存里按日期分组的记录，
+        写入之后不必重建全部记录的 DataFrame。
+        """
+        span = self._analytics.span
+        with self._lock:
+            self._refresh()
+            if hasattr(self.storage, 'read_range'):
+                version = self.data_version
+                first, last = self.storage.date_bounds()
+                records = None
             else:
-                sport_analysis = "💪 建议增加运动频率"
-        else:
-            sport_analysis = "暂无运动数据"
-            avg_duration = 0
-            active_days = 0
-            sport_variety = 0
-        
-        # 睡眠分析
-        if '睡眠时长' in df.columns:
-            avg_sleep = df['睡眠时长'].mean()
-            avg_quality = df['睡眠质量'].mean() if '睡眠质量' in df.columns else 0
-            
-            if avg_sleep >= 7.5 and avg_quality >= 4:
-                sleep_analysis = "😴 睡眠质量非常理想！"
-            elif avg_sleep >= 7:
-                sleep_analysis = "😊 睡眠状况良好"
+                self._load()
+                version = self.data_version
+                first, last = self._running.first_day, self._running.latest_day
+                records = self._by_day
+            if first is None:
+                return None
+            end = pd.Timestamp(as_of).normalize().date() if as_of is not None else last
+            start = end - timedelta(days=span - 1)
+            if records is None:
+                records = self.storage.read_range(start, end)
             else:
-                sleep_analysis = "🌙 建议保证7小时以上睡眠"
+                records = [
+                    record for offset in range(span)
+                    for record in records.get(start + timedelta(days=offset), ())
+                ]
+        frame = build_frame(records)
+        with metrics.timer('rolling_analytics'):
+            return self._analytics.summary(frame, as_of=end, version=version, first_day=first)
+    
+    def get_recent_analysis(self, as_of=None):
+        """健康分析 - 基于您原来的逻辑，recent 为按日期计算的最近 7 天 / 28 天统计"""
+        stats = self.get_aggregates()
+        with metrics.timer('analysis'):
+            analysis = _analyze(stats)
+        if 'error' not in analysis:
+            analysis['recent'] = self.get_rolling_summary(as_of)
+        return analysis
+
+def _parse_bounds(date_from, date_to):
+    """日期范围参数转成 (date, date)，没给的一端为 None，无法识别时抛出 ValueError"""
+    bounds = []
+    for value in (date_from, date_to):
+        day = parse_day(value) if value else None
+        if value and day is None:
+            raise ValueError(f"无法识别的日期: {value}")
+        bounds.append(day)
+    return bounds
+
+def _filter_batches(batches, first, last, batch_size):
+    """按日期范围（含两端）过滤，过滤后重新凑满 batch_size 条一批；日期无法识别的记录不导出"""
+    pending = []
+    for batch in batches:
+        for record in batch:
+            day = parse_day(record.get('日期'))
+            if day is None or (first and day < first) or (last and day > last):
+                continue
+            pending.append(record)
+            if len(pending) >= batch_size:
+                yield pending
+                pending = []
+    if pending:
+        yield pending
+
+def _analyze(stats):
+    """get_recent_analysis 的判断逻辑，输入为 get_aggregates() 的汇总值"""
+    if not stats['total_records']:
+        return {"error": "暂无数据"}
+    
+    # 运动分析
+    if stats['avg_duration'] is not None:
+        avg_duration = stats['avg_duration']
+        active_days = stats['active_days']
+        sport_variety = stats['sport_variety']
+        
+        if avg_duration > 45:
+            sport_analysis = "🏆 运动量很充足！继续保持！"
+        elif avg_duration > 25:
+            sport_analysis = "👍 运动习惯很好！"
         else:
-            sleep_analysis = "暂无睡眠数据"
-            avg_sleep = 0
+            sport_analysis = "💪 建议增加运动频率"
+    else:
+        sport_analysis = "暂无运动数据"
+        avg_duration = 0
+        active_days = 0
+        sport_variety = 0
+    
+    # 睡眠分析
+    if stats['avg_sleep'] is not None:
+        avg_sleep = stats['avg_sleep']
+        avg_quality = stats['avg_quality'] or 0
         
-        return {
-            "sport_analysis": sport_analysis,
-            "sleep_analysis": sleep_analysis,
-            "stats": {
-                "avg_duration": round(avg_duration, 1),
-                "active_days": active_days,
-                "sport_variety": sport_variety,
-                "avg_sleep": round(avg_sleep, 1),
-                "total_records": len(data)
-            }
+        if avg_sleep >= 7.5 and avg_quality >= 4:
+            sleep_analysis = "😴 睡眠质量非常理想！"
+        elif avg_sleep >= 7:
+            sleep_analysis = "😊 睡眠状况良好"
+        else:
+            sleep_analysis = "🌙 建议保证7小时以上睡眠"
+    else:
+        sleep_analysis = "暂无睡眠数据"
+        avg_sleep = 0
+    
+    return {
+        "sport_analysis": sport_analysis,
+        "sleep_analysis": sleep_analysis,
+        "stats": {
+            "avg_duration": _round(avg_duration),
+            "active_days": active_days,
+            "sport_variety": sport_variety,
+            "avg_sleep": _round(avg_sleep),
+            "total_records": stats['total_records']
         }
+    }
+
+def _round(value):
+    """与原来对 numpy 均值调用 round() 相同的舍入（numpy 先乘 10 再取整，和 Python 的 round 偶尔差 0.1）"""
+    return float(np.round(value, 1)) if isinstance(value, float) else value
+
+class UserDataRegistry:
+    """
+    按用户分区的数据：每个用户一个目录 <data_dir>/users/<user_id>/，
+    有自己的数据文件、写锁、内存缓存和增量汇总值，读写只涉及该用户的记录。
+    user_id 为空时使用 data_dir 本身（兼容原来的单用户部署）。
+    最多保留 max_open 个分区的缓存，超出时按最近最少使用淘汰（数据仍在磁盘上）。
+    """
+    
+    def __init__(self, data_dir=DATA_DIR, kind=None, max_open=256):
+        self.data_dir = data_dir
+        self.kind = kind
+        self.max_open = max_open
+        self._partitions = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def partition_dir(self, user_id):
+        if not user_id:
+            return self.data_dir
+        if not USER_ID_PATTERN.match(user_id):
+            raise ValueError("用户ID只能包含字母、数字、下划线和短横线，最长64个字符")
+        return os.path.join(self.data_dir, 'users', user_id)
+    
+    def get(self, user_id=None):
+        """返回该用户的 FitnessData，首次访问时创建分区目录"""
+        user_id = user_id or None
+        with self._lock:
+            data = self._partitions.get(user_id)
+            if data is not None:
+                self._partitions.move_to_end(user_id)
+                return data
+        # 创建存储可能涉及迁移/导入，不在注册表的锁内进行
+        partition_dir = self.partition_dir(user_id)
+        data = FitnessData(create_storage(self.kind, partition_dir), os.path.join(partition_dir, JOURNAL_FILE_NAME))
+        with self._lock:
+            data = self._partitions.setdefault(user_id, data)
+            self._partitions.move_to_end(user_id)
+            while len(self._partitions) > self.max_open:
+                self._partitions.popitem(last=False)
+            return data
+    
+    def __len__(self):
+        return len(self._partitions)
+
+def validate_records(records, errors=()):
+    """
+    校验记录（单条添加和批量导入共用），返回 (合法记录, 错误列表)。
+    错误项为 {"index": 在原列表中的位置, "error": 原因}。
+    errors 为调用方已经发现的错误（如 NDJSON 中无法解析的行），这些位置不再校验。
+    """
+    errors = list(errors)
+    known = {error["index"] for error in errors}
+    for index, record in enumerate(records):
+        if index not in known and not isinstance(record, dict):
+            errors.append({"index": index, "error": "记录必须是 JSON 对象"})
+    bad = {error["index"] for error in errors}
+    candidates = [(index, record) for index, record in enumerate(records) if index not in bad]
+    if not candidates:
+        return [], errors
+    
+    df = pd.DataFrame([record for _, record in candidates], columns=REQUIRED_FIELDS + ['睡眠质量'])
+    positions = [index for index, _ in candidates]
+    missing = df.isna() | (df.astype(str).apply(lambda column: column.str.strip()) == '')
+    invalid_numbers = pd.DataFrame({
+        field: pd.to_numeric(df[field], errors='coerce').isna() & ~missing[field]
+        for field in NUMERIC_FIELDS
+    })
+    # 睡眠质量可以不填，填了就按 CSV 导入的规则校验（importer.REJECT_REASONS 的 invalid_quality）
+    bad_quality = invalid_quality(df['睡眠质量']) & ~missing['睡眠质量']
+    for row in missing.index[missing[REQUIRED_FIELDS].any(axis=1) | invalid_numbers.any(axis=1) | bad_quality]:
+        missing_fields = [field for field in REQUIRED_FIELDS if missing.at[row, field]]
+        if missing_fields:
+            message = f"缺少必填字段: {', '.join(missing_fields)}"
+        elif invalid_numbers.loc[row].any():
+            bad_fields = [field for field in NUMERIC_FIELDS if invalid_numbers.at[row, field]]
+            message = f"字段不是有效数字: {', '.join(bad_fields)}"
+        else:
+            message = INVALID_QUALITY_MESSAGE
+        errors.append({"index": positions[row], "error": message})
+    
+    bad = {error["index"] for error in errors}
+    valid = [record for index, record in enumerate(records) if index not in bad]
+    errors.sort(key=lambda error: error["index"])
+    return valid, errors
+
+def build_frame(records):
+    """由记录列表构建类型化 DataFrame"""
+    return coerce_frame(pd.DataFrame(records), RECORD_SCHEMA)
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, request
+
+class ResponseCache:
+    """
+    分析/统计接口的响应缓存。键为 (接口, 查询参数, 路径参数, 数据版本)，
+    数据一变版本号就变，旧条目不会再命中；本进程的写入还会用 invalidate() 立即删掉旧条目，
+    其他进程写入造成的旧条目之后按 LRU 被淘汰。
+    version_func 可以返回元组（如 (用户ID, 版本号)），把缓存按用户分开。
+    按 LRU 淘汰，条目数和总字节数都有上限。
+    """
+
+    def __init__(self, version_func, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.version_func = version_func
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _key(self):
+        return (
+            request.endpoint,
+            tuple(sorted(request.args.items(multi=True))),
+            tuple(sorted((request.view_args or {}).items())),
+            self.version_func(),
+        )
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, status, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (body, status, mimetype)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted_body, _, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted_body)
+                self.evictions += 1
+
+    def invalidate(self, scope):
+        """删除 version_func 返回的元组第一项为 scope（如用户ID）的全部条目，返回删除的条数"""
+        with self._lock:
+            stale = [key for key in self._entries if isinstance(key[3], tuple) and key[3][0] == scope]
+            for key in stale:
+                self._bytes -= len(self._entries.pop(key)[0])
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+    def cached(self, view):
+        """装饰只读视图函数：只缓存 200 响应"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = self._key()
+            entry = self.get(key)
+            if entry is not None:
+                body, status, mimetype = entry
+                return Response(body, status=status, mimetype=mimetype)
+            response = view(*args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200 and not response.is_streamed:
+                self.put(key, response.get_data(), response.status_code, response.mimetype)
+            return response
+        return wrapper
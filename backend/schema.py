@@ -0,0 +1,153 @@
+"""
+健康数据的列类型定义，以及可选的列式存储格式（Parquet / Arrow IPC）。
+这个模块不依赖 backend 里的其他模块，my_app.py 也可以用 backend.schema 导入。
+"""
+import os
+
+import pandas as pd
+
+# my_app.py / my_data.csv 使用的列
+CSV_SCHEMA = {
+    '日期': 'datetime64[s]',
+    '运动项目': 'category',
+    '运动时长(分钟)': 'float32',
+    '运动感受': 'Int8',
+    '睡眠时长(小时)': 'float32',
+    '睡眠质量': 'Int8',
+    '心路历程': 'string',
+}
+
+# backend FitnessData 使用的列
+RECORD_SCHEMA = {
+    'id': 'Int64',
+    '日期': 'datetime64[s]',
+    '运动项目': 'category',
+    '运动时长': 'float32',
+    '睡眠时长': 'float32',
+    '睡眠质量': 'Int8',
+    '心路历程': 'string',
+    'created_at': 'string',
+}
+
+# 睡眠质量统一为 1-5 分；超过 5 的值视为百分制（如 my_data.csv 里的 80、87）
+QUALITY_COLUMNS = ('睡眠质量',)
+QUALITY_MAX = 5
+PERCENT_SCALE = 100
+INVALID_QUALITY_MESSAGE = '睡眠质量不在1-5分或百分制范围内'
+
+def parse_dates(series):
+    """兼容 2025-11-01 与 2025.11.1 两种日期写法，无法解析的记为 NaT"""
+    text = series.astype(str).str.strip().str.replace('.', '-', regex=False)
+    return pd.to_datetime(text, errors='coerce', format='mixed')
+
+def normalize_quality(series):
+    """睡眠质量换算为 1-5 分（百分制按比例缩小），无法转换的值记为缺失"""
+    values = pd.to_numeric(series, errors='coerce')
+    percent = values > QUALITY_MAX
+    values = values.where(~percent, values / (PERCENT_SCALE / QUALITY_MAX))
+    return values.round().clip(lower=1, upper=QUALITY_MAX)
+
+def invalid_quality(series):
+    """睡眠质量不是数字或不在 1-100 之间（1-5 分或百分制）的位置，CSV 导入和接口写入共用"""
+    values = pd.to_numeric(series, errors='coerce')
+    return values.isna() | (values < 1) | (values > PERCENT_SCALE)
+
+def normalize_quality_value(value):
+    """单个值的 normalize_quality（逐条累加的汇总使用），无法转换时返回 None"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != number:
+        return None
+    if number > QUALITY_MAX:
+        number /= PERCENT_SCALE / QUALITY_MAX
+    return float(min(max(round(number), 1), QUALITY_MAX))
+
+def coerce_frame(df, schema):
+    """
+    按 schema 转换列类型：去掉列名和文本两端空白，日期统一解析，
+    数值列无法转换的值记为缺失。schema 之外的列原样保留。
+    """
+    df = df.rename(columns=lambda column: str(column).strip())
+    result = {}
+    for column in df.columns:
+        series = df[column]
+        dtype = schema.get(column)
+        if series.dtype == object or pd.api.types.is_string_dtype(series):
+            series = series.where(series.isna(), series.astype(str).str.strip())
+            series = series.replace('', None)
+        if dtype is None:
+            result[column] = series
+        elif dtype.startswith('datetime64'):
+            result[column] = parse_dates(series).astype(dtype)
+        elif column in QUALITY_COLUMNS:
+            result[column] = normalize_quality(series).astype(dtype)
+        elif dtype == 'string':
+            # 文本列的缺失值当作空字符串，和表单里不填写的效果一致
+            result[column] = series.astype(dtype).fillna('')
+        elif dtype == 'category':
+            result[column] = series.astype(dtype)
+        else:
+            numbers = pd.to_numeric(series, errors='coerce')
+            if dtype[0].isupper():
+                numbers = numbers.round()
+            result[column] = numbers.astype(dtype)
+    return pd.DataFrame(result, index=df.index)
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("读写 Parquet / Arrow 文件需要先安装 pyarrow：pip install pyarrow") from e
+
+def is_columnar(path):
+    return str(path).endswith(('.parquet', '.arrow', '.feather'))
+
+def write_columnar(df, path):
+    """写入 .parquet 或 .arrow（Arrow IPC），先写临时文件再原子替换"""
+    _require_pyarrow()
+    tmp_path = f"{path}.tmp"
+    if str(path).endswith('.parquet'):
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(tmp_path)
+    os.replace(tmp_path, path)
+
+def read_column_names(path):
+    """只读取文件元数据中的列名"""
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if str(path).endswith('.parquet'):
+        return pq.read_schema(path).names
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+def read_columnar(path, columns=None):
+    """
+    读取列式文件，columns 只读取需要的列（列投影）。
+    .arrow 文件使用内存映射，大文件不必整体读入内存。
+    """
+    _require_pyarrow()
+    if str(path).endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+    import pyarrow.feather as feather
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+def convert_csv(csv_path, out_path, schema=CSV_SCHEMA):
+    """把文本 CSV 一次性转换为带类型的列式文件"""
+    df = coerce_frame(pd.read_csv(csv_path), schema)
+    write_columnar(df, out_path)
+    return df
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) != 3:
+        print("用法: python backend/schema.py my_data.csv my_data.parquet")
+        sys.exit(1)
+    converted = convert_csv(sys.argv[1], sys.argv[2])
+    print(f"已转换 {len(converted)} 条记录 -> {sys.argv[2]}")
@@ -0,0 +1,299 @@
+"""
+心路历程的全文检索：字符 n-gram 分词 + 倒排索引，按 BM25 排序。
+
+- 中文按单字和相邻两字建索引，查询两个字以上时只用两字组合，英文和数字按整词
+- 每个词的倒排表是按文档编号递增的 array('I')（文档编号 + 词频），新增文档只在末尾追加；
+  删除和覆盖先打标记，删掉的文档超过一半时整体重建
+- 查询时用 numpy 对倒排表求交集、计算 BM25，日期和运动项目过滤也走索引
+  （运动项目有自己的倒排表，日期按文档编号存成一列），几万条笔记也只要几毫秒
+
+和 analytics.py 一样不依赖 backend 里的其他模块，my_app.py 可以用 backend.search 导入。
+"""
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+from datetime import date, datetime
+
+import numpy as np
+
+JOURNAL_FILE_NAME = '我的心路历程'
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 查询原文整体出现在笔记里时的加分倍数
+PHRASE_BOOST = 1.5
+SNIPPET_CHARS = 60
+
+# 中日韩统一表意文字（含扩展 A 和兼容区）
+_CJK = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_RUN_PATTERN = re.compile(f'[{_CJK}]+|[a-z0-9]+')
+_DATE_PATTERN = re.compile(r'(\d{4})[.\-/](\d{1,2})[.\-/](\d{1,2})')
+# 心路历程文件每段以「月.日：」或「年.月.日：」开头
+_JOURNAL_PATTERN = re.compile(r'^\s*(?:(\d{4})[.\-/])?(\d{1,2})[.\-/](\d{1,2})\s*[:：]\s*')
+
+def normalize(text):
+    """全角转半角、英文转小写"""
+    return unicodedata.normalize('NFKC', str(text)).lower()
+
+def tokenize(text, query=False):
+    """
+    分词：中文连续片段取单字和相邻两字，英文 / 数字取整词。
+    query=True 时两字以上的中文片段只取两字组合（更有区分度，倒排表也更短）。
+    """
+    tokens = []
+    for run in _RUN_PATTERN.findall(normalize(text)):
+        if run[0] < '\u3400':
+            tokens.append(run)
+            continue
+        bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+        if query and bigrams:
+            tokens.extend(bigrams)
+        else:
+            tokens.extend(run)
+            tokens.extend(bigrams)
+    return tokens
+
+def _missing(value):
+    """None / NaN / NaT / pd.NA"""
+    try:
+        return value is None or bool(value != value)
+    except TypeError:
+        return True
+
+def parse_date(value):
+    """date / datetime / Timestamp 或 2025-11-01 / 2025.11.1 之类的字符串，无法识别返回 None"""
+    if _missing(value):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    match = _DATE_PATTERN.search(str(value))
+    if not match:
+        return None
+    try:
+        return date(*map(int, match.groups()))
+    except ValueError:
+        return None
+
+def parse_journal(text, known_dates=()):
+    """
+    把心路历程文件拆成 [(日期, 内容), ...]。每段以「10.26：」这样的日期开头，
+    没有日期开头的行并入上一段。没写年份时优先用 known_dates（如记录里的日期）中月日相同的年份，
+    否则沿用上一段的年份（月份变小视为跨年），第一段默认今年。
+    """
+    years = {(day.month, day.day): day.year for day in sorted(known_dates)}
+    entries = []
+    year = None
+    for line in text.splitlines():
+        match = _JOURNAL_PATTERN.match(line)
+        if match is None:
+            if entries and line.strip():
+                entries[-1][1].append(line.strip())
+            continue
+        explicit_year, month, day = match.groups()
+        month, day = int(month), int(day)
+        if explicit_year:
+            year = int(explicit_year)
+        elif (month, day) in years:
+            year = years[(month, day)]
+        elif year is None:
+            year = date.today().year
+        elif entries and entries[-1][0] is not None and month < entries[-1][0].month:
+            year += 1
+        try:
+            entry_date = date(year, month, day)
+        except ValueError:
+            entry_date = None
+        entries.append((entry_date, [line[match.end():].strip()]))
+    return [(entry_date, '\n'.join(lines)) for entry_date, lines in entries]
+
+
+class SearchIndex:
+    """
+    笔记的倒排索引。文档用 (来源, ID) 作键，如 ('record', 12)、('journal', 3)。
+    add() 对内容没变的文档不做任何事，所以可以直接用全量数据调用 sync_source() 做增量更新。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._postings = {}
+        self._docs = []
+        self._keys = {}
+        self._alive = bytearray()
+        self._lengths = array('I')
+        self._dates = array('i')
+        self._total_length = 0
+        self._live = 0
+
+    def __len__(self):
+        return self._live
+
+    def keys(self, source):
+        with self._lock:
+            return [key[1] for key in self._keys if key[0] == source]
+
+    def add(self, key, text, day=None, sport=None):
+        """新增或覆盖一篇文档；text 为空时等同 remove()"""
+        text = '' if _missing(text) else str(text).strip()
+        day = parse_date(day)
+        sport = '' if _missing(sport) else str(sport).strip()
+        with self._lock:
+            doc_id = self._keys.get(key)
+            if doc_id is not None:
+                doc = self._docs[doc_id]
+                if (doc['text'], doc['date'], doc['sport']) == (text, day, sport):
+                    return
+                self._remove(doc_id)
+            if not text:
+                return
+
+            doc_id = len(self._docs)
+            counts = Counter(tokenize(text))
+            if sport:
+                # 运动项目也是一个「词」，只用于过滤，不参与打分
+                counts[('sport', sport)] = 0
+            postings = self._postings
+            for token, count in counts.items():
+                posting = postings.get(token)
+                if posting is None:
+                    posting = postings[token] = (array('I'), array('I'))
+                posting[0].append(doc_id)
+                posting[1].append(count)
+
+            length = sum(counts.values())
+            # normalized 为整句匹配用的规范化文本
+            self._docs.append({'key': key, 'text': text, 'normalized': normalize(text), 'date': day, 'sport': sport})
+            self._keys[key] = doc_id
+            self._alive.append(1)
+            self._lengths.append(length)
+            self._dates.append(day.toordinal() if day else 0)
+            self._total_length += length
+            self._live += 1
+
+    def remove(self, key):
+        with self._lock:
+            doc_id = self._keys.get(key)
+            if doc_id is not None:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        """只打删除标记，倒排表里的编号在查询时过滤；删掉的超过一半时重建"""
+        del self._keys[self._docs[doc_id]['key']]
+        self._alive[doc_id] = 0
+        self._total_length -= self._lengths[doc_id]
+        self._live -= 1
+        dead = len(self._docs) - self._live
+        if dead > 1000 and dead > self._live:
+            docs = [doc for doc_id, doc in enumerate(self._docs) if self._alive[doc_id]]
+            self._reset()
+            for doc in docs:
+                self.add(doc['key'], doc['text'], doc['date'], doc['sport'])
+
+    def sync_source(self, source, docs):
+        """
+        让某个来源的文档与 docs 一致：docs 为 {ID: (内容, 日期, 运动项目)}，
+        内容没变的跳过，不在 docs 里的删除。
+        """
+        with self._lock:
+            for doc_id in set(self.keys(source)) - set(docs):
+                self.remove((source, doc_id))
+            for doc_id, (text, day, sport) in docs.items():
+                self.add((source, doc_id), text, day, sport)
+
+    def search(self, query, date_from=None, date_to=None, sport=None, limit=20):
+        """
+        查询 query 中的所有词（与关系），按 BM25 得分从高到低返回 {'total': 命中数, 'results': [...]}；
+        date_from / date_to（含两端）和 sport 为可选过滤条件，日期无法识别时抛出 ValueError。
+        """
+        bounds = []
+        for value in (date_from, date_to):
+            day = parse_date(value) if value else None
+            if value and day is None:
+                raise ValueError(f"无法识别的日期: {value}")
+            bounds.append(day)
+        tokens = list(dict.fromkeys(tokenize(query, query=True)))
+        empty = {'total': 0, 'results': []}
+        if not tokens:
+            return empty
+
+        with self._lock:
+            if any(token not in self._postings for token in tokens):
+                return empty
+            alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+            # 倒排表从短到长求交集
+            postings = sorted(
+                ((np.array(ids, dtype=np.int64), np.array(frequencies, dtype=np.float64))
+                 for ids, frequencies in (self._postings[token] for token in tokens)),
+                key=lambda posting: len(posting[0])
+            )
+            candidates = postings[0][0][alive[postings[0][0]]]
+            if sport:
+                sport_ids = self._postings.get(('sport', str(sport).strip()))
+                if sport_ids is None:
+                    return empty
+                candidates = np.intersect1d(candidates, np.array(sport_ids[0], dtype=np.int64), assume_unique=True)
+            for ids, _ in postings[1:]:
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            all_dates = np.array(self._dates, dtype=np.int64)
+            if len(candidates) and any(bounds):
+                dates = all_dates[candidates]
+                keep = dates > 0
+                if bounds[0]:
+                    keep &= dates >= bounds[0].toordinal()
+                if bounds[1]:
+                    keep &= dates <= bounds[1].toordinal()
+                candidates = candidates[keep]
+            if not len(candidates):
+                return empty
+
+            lengths = np.array(self._lengths, dtype=np.float64)[candidates]
+            average_length = self._total_length / max(self._live, 1)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+            scores = np.zeros(len(candidates))
+            for ids, frequencies in postings:
+                document_frequency = int(np.count_nonzero(alive[ids]))
+                idf = math.log(1 + (self._live - document_frequency + 0.5) / (document_frequency + 0.5))
+                tf = frequencies[np.searchsorted(ids, candidates)]
+                scores += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            # 整句命中的加分最多 PHRASE_BOOST 倍，只需检查加分后可能进入前 limit 名的文档
+            shortlist = np.arange(len(candidates))
+            if len(candidates) > limit:
+                threshold = np.partition(scores, -limit)[-limit]
+                shortlist = np.flatnonzero(scores * PHRASE_BOOST >= threshold)
+            phrase = normalize(query).strip()
+            if tokens != [phrase]:
+                for position in shortlist:
+                    if phrase in self._docs[candidates[position]]['normalized']:
+                        scores[position] *= PHRASE_BOOST
+            # 得分相同的新日期在前
+            shortlist = shortlist[np.lexsort((-all_dates[candidates[shortlist]], -scores[shortlist]))]
+            results = []
+            for position in shortlist[:limit]:
+                doc = self._docs[candidates[position]]
+                results.append({
+                    'source': doc['key'][0],
+                    'id': doc['key'][1],
+                    'date': doc['date'].isoformat() if doc['date'] else None,
+                    'sport': doc['sport'] or None,
+                    'score': round(float(scores[position]), 3),
+                    'snippet': _snippet(doc['text'], phrase),
+                })
+            return {'total': len(candidates), 'results': results}
+
+
+def _snippet(text, phrase):
+    """截取命中位置附近的一段文字，找不到原文时从开头截取"""
+    if len(text) <= SNIPPET_CHARS:
+        return text
+    position = normalize(text).find(phrase)
+    start = max(0, min(position - SNIPPET_CHARS // 3, len(text) - SNIPPET_CHARS)) if position > 0 else 0
+    snippet = text[start:start + SNIPPET_CHARS]
+    return ('…' if start else '') + snippet + ('…' if start + SNIPPET_CHARS < len(text) else '')
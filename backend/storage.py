@@ -0,0 +1,696 @@
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from aggregates import parse_day
+from metrics import metrics
+from schema import RECORD_SCHEMA, coerce_frame, normalize_quality_value, read_column_names, read_columnar, write_columnar
+
+class FileLock:
+    """
+    跨进程的写锁（<数据文件>.lock 上的 flock），同时在本进程内按线程互斥，可重入。
+    多个 gunicorn worker 写同一份数据时，读-改-写必须在这把锁内完成。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            self._file = open(self.path, 'a+b')
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+
+# 新建数据文件的权限
+DEFAULT_FILE_MODE = 0o644
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """
+    先写同目录下的临时文件再 os.replace，读者永远看不到写了一半的文件。
+    mkstemp 建的临时文件权限是 0600，建好后改成原文件的权限（原文件不存在时为 DEFAULT_FILE_MODE），
+    替换后其他用户/进程照样能读
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = DEFAULT_FILE_MODE
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class JsonFileStorage:
+    """
+    原有存储方式：整个 JSON 数组存成一个文件，每次写入都原子地重写全文件。
+    写入时 next_id() 读到的数组（文件没有变化时）直接交给随后的 append_many()，每次写入只解析一次文件。
+    """
+
+    def __init__(self, data_file):
+        self.data_file = data_file
+        self.lock = FileLock(data_file + '.lock')
+        # next_id() 解析出的 (文件指纹, 记录数组)，由 append_many() 取走
+        self._loaded = None
+        self._ensure_data_file()
+
+    def _ensure_data_file(self):
+        """确保数据文件存在"""
+        os.makedirs(os.path.dirname(self.data_file) or '.', exist_ok=True)
+        with self.lock:
+            if not os.path.exists(self.data_file):
+                atomic_write_json(self.data_file, [])
+
+    def load_all(self):
+        with metrics.timer('storage_read'):
+            with open(self.data_file, 'rb') as f:
+                content = f.read()
+        with metrics.timer('json_parse'):
+            return json.loads(content)
+
+    def fingerprint(self):
+        """文件的修改时间和大小，用于判断缓存是否过期"""
+        return _stat_fingerprint(self.data_file)
+
+    def iter_batches(self, batch_size=1000):
+        """逐批读取记录（流式导出用），不把整个数组读入内存"""
+        return _batched(_iter_json_array(self.data_file), batch_size)
+
+    def next_id(self):
+        with self.lock:
+            data = self.load_all()
+            self._loaded = (self.fingerprint(), data)
+        return max((record.get('id') or 0 for record in data), default=0) + 1
+
+    def __len__(self):
+        return len(self.load_all())
+
+    def append(self, record):
+        self.append_many([record])
+        return record
+
+    def append_many(self, records):
+        with self.lock:
+            loaded, self._loaded = self._loaded, None
+            if loaded is not None and loaded[0] == self.fingerprint():
+                data = loaded[1]
+            else:
+                data = self.load_all()
+            data.extend(records)
+            atomic_write_json(self.data_file, data, ensure_ascii=False, indent=2)
+        return records
+
+
+class AppendLogStorage:
+    """
+    追加写日志存储：每条记录一行 JSON，写入只追加不重写。
+    内存中只保留 id -> 文件偏移 的索引，启动时回放日志重建索引；
+    被覆盖的旧行超过阈值后自动压缩。
+    """
+
+    def __init__(self, log_file, compact_min_dead=1000, compact_ratio=0.5):
+        self.log_file = log_file
+        self.compact_min_dead = compact_min_dead
+        self.compact_ratio = compact_ratio
+        self._index = {}      # id -> (offset, length)，按写入顺序排列
+        self._dead = 0        # 日志中已失效的行数
+        self._max_id = 0
+        self._size = 0        # 已回放到的文件大小
+        self._inode = None    # 压缩后文件被替换，inode 会变化
+        self.lock = FileLock(log_file + '.lock')
+        os.makedirs(os.path.dirname(self.log_file) or '.', exist_ok=True)
+        if not os.path.exists(self.log_file):
+            open(self.log_file, 'a', encoding='utf-8').close()
+        self._replay()
+
+    def _replay(self):
+        """顺序回放日志，重建索引"""
+        self._index = {}
+        self._dead = 0
+        self._max_id = 0
+        with open(self.log_file, 'rb') as f:
+            self._inode = os.fstat(f.fileno()).st_ino
+            self._size = self._replay_from(f, 0)
+
+    def _replay_from(self, f, offset):
+        """
+        从 offset 开始回放完整的行，返回已回放到的位置。
+        末尾没有换行的半行（其他进程正在写，或写入中途崩溃）留到下次，等它补全后再读。
+        """
+        f.seek(offset)
+        for line in f:
+            length = len(line)
+            if not line.endswith(b'\n'):
+                break
+            if line.strip():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 进程中途崩溃可能留下半行，直接跳过
+                    self._dead += 1
+                    offset += length
+                    continue
+                self._apply(entry, offset, length)
+            offset += length
+        return offset
+
+    def _sync(self):
+        """
+        其他进程追加过日志时只回放新增的部分；
+        压缩过（inode 变化）或文件变短时重新回放整个日志。
+        会修改索引和计数，调用前需持有 self.lock，同一段尾部不会被两个线程同时回放。
+        """
+        stat = os.stat(self.log_file)
+        if stat.st_ino != self._inode or stat.st_size < self._size:
+            self._replay()
+        elif stat.st_size != self._size:
+            with open(self.log_file, 'rb') as f:
+                if os.fstat(f.fileno()).st_ino != self._inode:
+                    self._replay()
+                else:
+                    self._size = self._replay_from(f, self._size)
+
+    def _apply(self, entry, offset, length):
+        record_id = entry.get('id')
+        if record_id in self._index:
+            del self._index[record_id]
+            self._dead += 1
+        self._index[record_id] = (offset, length)
+        if isinstance(record_id, int):
+            self._max_id = max(self._max_id, record_id)
+
+    def _write_lines(self, entries):
+        """追加若干行，返回每行的 (offset, length)；调用前需持有写锁并已 _sync"""
+        positions = []
+        with self.lock, open(self.log_file, 'a+b') as f:
+            offset = f.seek(0, os.SEEK_END)
+            if offset:
+                f.seek(offset - 1)
+                if f.read(1) != b'\n':
+                    # 上次写入中途崩溃留下了半行：先补上换行，新记录不会和它连成一行而在回放时被一起丢掉
+                    f.write(b'\n')
+                    offset += 1
+            for entry in entries:
+                line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+                f.write(line)
+                positions.append((offset, len(line)))
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._size = offset
+        return positions
+
+    def fingerprint(self):
+        return _stat_fingerprint(self.log_file)
+
+    def _open_synced(self):
+        """
+        在锁内追上其他进程的写入，返回 (打开的日志文件, 索引的副本, 已回放到的位置)。
+        之后的写入和压缩不会改动副本；压缩替换文件后，已打开的文件仍是副本对应的内容。
+        """
+        with self.lock:
+            self._sync()
+            return open(self.log_file, 'rb'), dict(self._index), self._size
+
+    def load_all(self):
+        """按索引顺序读取所有有效记录"""
+        f, index, _ = self._open_synced()
+        with metrics.timer('storage_read'):
+            lines = []
+            with f:
+                for offset, length in index.values():
+                    f.seek(offset)
+                    lines.append(f.read(length))
+        with metrics.timer('json_parse'):
+            return [json.loads(line) for line in lines]
+
+    def iter_batches(self, batch_size=1000):
+        """
+        顺序扫描日志逐批读取有效记录（流式导出用），顺序与 load_all 相同。
+        只读到开始时的文件末尾；压缩替换文件不影响已打开的文件，
+        但导出过程中被覆盖的记录可能新旧两行都读不到。
+        """
+        f, index, end = self._open_synced()
+        with f:
+            batch = []
+            offset = 0
+            for line in f:
+                if offset >= end:
+                    break
+                length = len(line)
+                if line.strip():
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        entry = {}
+                    # 只有索引指向这一行时才是有效记录
+                    if index.get(entry.get('id')) == (offset, length):
+                        batch.append(entry)
+                        if len(batch) >= batch_size:
+                            yield batch
+                            batch = []
+                offset += length
+            if batch:
+                yield batch
+
+    def next_id(self):
+        with self.lock:
+            self._sync()
+            return self._max_id + 1
+
+    def __len__(self):
+        with self.lock:
+            self._sync()
+            return len(self._index)
+
+    def append(self, record):
+        """新增或覆盖一条记录（同 id 的旧行变为失效行）"""
+        self.append_many([record])
+        return record
+
+    def append_many(self, records):
+        """一批记录一次写入、一次 fsync"""
+        with self.lock:
+            self._sync()
+            positions = self._write_lines(records)
+            for record, position in zip(records, positions):
+                self._apply(record, *position)
+            self._maybe_compact()
+        return records
+
+    def _maybe_compact(self):
+        if self._dead >= self.compact_min_dead and self._dead > len(self._index) * self.compact_ratio:
+            self.compact()
+
+    def compact(self):
+        """只保留有效记录重写日志，写临时文件后原子替换"""
+        tmp_file = self.log_file + '.compact'
+        with self.lock:
+            self._sync()
+            with open(self.log_file, 'rb') as src, open(tmp_file, 'wb') as dst:
+                for offset, length in self._index.values():
+                    src.seek(offset)
+                    dst.write(src.read(length))
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_file, self.log_file)
+            self._replay()
+
+
+class SQLiteStorage:
+    """
+    SQLite 存储：常用字段单独成列并为 日期/运动项目 建索引，
+    完整记录以 JSON 保存在 payload 列。WAL 模式下读写互不阻塞，
+    每个线程复用自己的连接。日期 列统一存成 YYYY-MM-DD（payload 里保留原始写法），
+    汇总和按日期范围的读取都在 SQL 里完成，不需要读出全部记录。
+    """
+
+    COLUMNS = ['日期', '运动项目', '运动时长', '睡眠时长', '睡眠质量']
+
+    def __init__(self, db_file, import_json=None):
+        self.db_file = db_file
+        self.lock = FileLock(db_file + '.lock')
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY,
+                日期 TEXT,
+                运动项目 TEXT,
+                运动时长 REAL,
+                睡眠时长 REAL,
+                睡眠质量 REAL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_records_date ON records (日期);
+            CREATE INDEX IF NOT EXISTS idx_records_sport ON records (运动项目);
+        """)
+        self._normalize_dates()
+        if import_json and os.path.exists(import_json) and len(self) == 0:
+            with open(import_json, 'r', encoding='utf-8') as f:
+                self.append_many(json.load(f))
+
+    def _normalize_dates(self):
+        """旧版本的 日期 列保存原始写法（如 2025.11.1），统一成 YYYY-MM-DD 才能按范围查询"""
+        conn = self._connect()
+        rows = conn.execute(f"SELECT id, 日期 FROM records WHERE 日期 NOT GLOB '{_ISO_GLOB}'").fetchall()
+        updates = [(_iso_day(value), record_id) for record_id, value in rows if _iso_day(value) != value]
+        if updates:
+            with self.lock, conn:
+                conn.executemany('UPDATE records SET 日期 = ? WHERE id = ?', updates)
+
+    def _connect(self):
+        """取当前线程的连接，没有则新建"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _row(self, record):
+        values = []
+        for column in self.COLUMNS:
+            value = record.get(column)
+            if column == '日期':
+                value = _iso_day(value)
+            elif column == '睡眠质量':
+                # 只用于分析的列，与 RunningAggregates 一样换算为 1-5 分；payload 保留原值
+                value = normalize_quality_value(value)
+            elif column != '运动项目':
+                value = _to_float(value)
+            values.append(value)
+        return (record.get('id'), *values, json.dumps(record, ensure_ascii=False))
+
+    def fingerprint(self):
+        # WAL 模式下提交先写入 -wal 文件，两个文件一起看
+        return _stat_fingerprint(self.db_file) + _stat_fingerprint(self.db_file + '-wal')
+
+    def load_all(self):
+        with metrics.timer('storage_read'):
+            rows = self._connect().execute('SELECT payload FROM records ORDER BY id').fetchall()
+        with metrics.timer('json_parse'):
+            return [json.loads(payload) for (payload,) in rows]
+
+    def iter_batches(self, batch_size=1000):
+        """用单独的连接逐批读取（流式导出用），整个读取过程看到的是同一个快照"""
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            cursor = conn.execute('SELECT payload FROM records ORDER BY id')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [json.loads(payload) for (payload,) in rows]
+        finally:
+            conn.close()
+
+    def date_bounds(self):
+        """最早和最晚的记录日期（date），没有可识别日期时为 (None, None)；按 日期 索引各取一行"""
+        conn = self._connect()
+        bounds = []
+        for order in ('ASC', 'DESC'):
+            row = conn.execute(
+                f"SELECT 日期 FROM records WHERE 日期 GLOB '{_ISO_GLOB}' ORDER BY 日期 {order} LIMIT 1"
+            ).fetchone()
+            bounds.append(parse_day(row[0]) if row else None)
+        return tuple(bounds)
+
+    def read_range(self, date_from, date_to):
+        """日期在 [date_from, date_to]（date，含两端）内的记录，按 id 排序"""
+        with metrics.timer('storage_read'):
+            rows = self._connect().execute(
+                'SELECT payload FROM records WHERE 日期 BETWEEN ? AND ? ORDER BY id',
+                (date_from.isoformat(), date_to.isoformat())
+            ).fetchall()
+        with metrics.timer('json_parse'):
+            return [json.loads(payload) for (payload,) in rows]
+
+    def get(self, record_id):
+        row = self._connect().execute('SELECT payload FROM records WHERE id = ?', (record_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def next_id(self):
+        (max_id,) = self._connect().execute('SELECT COALESCE(MAX(id), 0) FROM records').fetchone()
+        return max_id + 1
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def append(self, record):
+        self.append_many([record])
+        return record
+
+    def append_many(self, records):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [self._row(record) for record in records]
+            )
+        return records
+
+    def aggregate_stats(self):
+        """
+        在 SQL 中完成 get_recent_analysis 所需的汇总，结果与 RunningAggregates.snapshot() 相同：
+        字段出现在任意一条记录里（值可以是 null）才算有这一列，用 payload 的 json_type 判断；
+        运动项目的取值个数里 null 和缺少这个字段算同一个取值。
+        """
+        row = self._connect().execute("""
+            SELECT COUNT(*),
+                   MAX(json_type(payload, '$."运动时长"') IS NOT NULL), AVG(运动时长), SUM(运动时长 > 0),
+                   MAX(json_type(payload, '$."运动项目"') IS NOT NULL),
+                   COUNT(DISTINCT 运动项目) + MAX(运动项目 IS NULL),
+                   MAX(json_type(payload, '$."睡眠时长"') IS NOT NULL), AVG(睡眠时长),
+                   MAX(json_type(payload, '$."睡眠质量"') IS NOT NULL), AVG(睡眠质量)
+            FROM records
+        """).fetchone()
+        (total, has_duration, avg_duration, active_days, has_sport, sport_variety,
+         has_sleep, avg_sleep, has_quality, avg_quality) = row
+        stats = {
+            "total_records": total,
+            "avg_duration": None,
+            "active_days": 0,
+            "sport_variety": 0,
+            "avg_sleep": None,
+            "avg_quality": None,
+        }
+        if has_duration:
+            stats['avg_duration'] = avg_duration if avg_duration is not None else float('nan')
+            stats['active_days'] = active_days or 0
+            if has_sport:
+                stats['sport_variety'] = sport_variety
+        if has_sleep:
+            stats['avg_sleep'] = avg_sleep if avg_sleep is not None else float('nan')
+            stats['avg_quality'] = (avg_quality if avg_quality is not None else float('nan')) if has_quality else 0
+        return stats
+
+
+PAYLOAD_COLUMN = 'payload'
+
+
+class ParquetStorage:
+    """
+    列式存储（Parquet / Arrow IPC，由文件后缀决定）：按 RECORD_SCHEMA 保存带类型的列，
+    分配ID等只需要个别列时按列读取。完整记录另以 JSON 保存在 payload 列（与 SQLiteStorage 相同），
+    读回的记录和写入的一字不差，类型化的列只用于分析。
+    写入需要重写整个文件，适合读多写少的场景。
+    """
+
+    def __init__(self, path, import_json=None):
+        self.path = path
+        self.lock = FileLock(path + '.lock')
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self.lock:
+            if not os.path.exists(self.path):
+                records = []
+                if import_json and os.path.exists(import_json):
+                    with open(import_json, 'r', encoding='utf-8') as f:
+                        records = json.load(f)
+                self._write(records)
+
+    def _write(self, records):
+        frame = pd.DataFrame(records)
+        frame = coerce_frame(frame[[column for column in RECORD_SCHEMA if column in frame.columns]], RECORD_SCHEMA)
+        frame[PAYLOAD_COLUMN] = [json.dumps(record, ensure_ascii=False) for record in records]
+        write_columnar(frame, self.path)
+
+    def _has_payload(self):
+        # 旧版本写的文件没有 payload 列，只能从类型化的列还原记录
+        return PAYLOAD_COLUMN in read_column_names(self.path)
+
+    def fingerprint(self):
+        return _stat_fingerprint(self.path)
+
+    def load_all(self):
+        if self._has_payload():
+            with metrics.timer('storage_read'):
+                payloads = read_columnar(self.path, columns=[PAYLOAD_COLUMN])[PAYLOAD_COLUMN]
+            with metrics.timer('json_parse'):
+                return [json.loads(payload) for payload in payloads]
+        with metrics.timer('storage_read'):
+            frame = read_columnar(self.path)
+        with metrics.timer('frame_to_records'):
+            return self._to_records(frame)
+
+    def iter_batches(self, batch_size=1000):
+        """按 batch_size 行逐批读取（流式导出用），.arrow 文件使用内存映射"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        has_payload = self._has_payload()
+        if self.path.endswith('.parquet'):
+            columns = [PAYLOAD_COLUMN] if has_payload else None
+            batches = pq.ParquetFile(self.path).iter_batches(batch_size=batch_size, columns=columns)
+        else:
+            reader = pa.ipc.open_file(pa.memory_map(self.path))
+            batches = (
+                batch.slice(start, batch_size)
+                for batch in map(reader.get_batch, range(reader.num_record_batches))
+                for start in range(0, batch.num_rows, batch_size)
+            )
+        for batch in batches:
+            if has_payload:
+                yield [json.loads(payload) for payload in batch.column(PAYLOAD_COLUMN).to_pylist()]
+            else:
+                yield self._to_records(batch.to_pandas())
+
+    def _to_records(self, frame):
+        if '日期' in frame.columns:
+            frame['日期'] = frame['日期'].dt.strftime('%Y-%m-%d')
+        for column in frame.columns[frame.dtypes == 'float32']:
+            # float32 转回 Python float 时按最短表示取值，避免 7.3 变成 7.300000190734863
+            frame[column] = frame[column].astype(str).astype('float64')
+        frame = frame.astype(object).where(frame.notna(), None)
+        return [
+            {key: value for key, value in record.items() if value is not None}
+            for record in frame.to_dict('records')
+        ]
+
+    def next_id(self):
+        if 'id' not in read_column_names(self.path):
+            return 1
+        ids = read_columnar(self.path, columns=['id'])['id']
+        return 1 if ids.isna().all() else int(ids.max()) + 1
+
+    def __len__(self):
+        import pyarrow.parquet as pq
+        if self.path.endswith('.parquet'):
+            return pq.ParquetFile(self.path).metadata.num_rows
+        return len(read_columnar(self.path, columns=read_column_names(self.path)[:1]))
+
+    def append(self, record):
+        self.append_many([record])
+        return record
+
+    def append_many(self, records):
+        with self.lock:
+            self._write(self.load_all() + list(records))
+        return records
+
+
+def _stat_fingerprint(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (None, None)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+_JSON_SEPARATOR = re.compile(r'[\s,]*')
+
+def _iter_json_array(path, chunk_size=1 << 20):
+    """逐个解析 JSON 数组文件中的元素，内存中只保留一个读取块和正在解析的元素"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} 不是 JSON 数组")
+        position = 1
+        eof = False
+        while True:
+            position = _JSON_SEPARATOR.match(buffer, position).end()
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                if position == len(buffer):
+                    raise json.JSONDecodeError('需要更多数据', buffer, position)
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # 元素被读取块截断：丢掉已解析的部分，再读一块
+                if eof:
+                    raise
+                more = f.read(chunk_size)
+                eof = not more
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+            yield item
+
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_ISO_GLOB = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+
+def _iso_day(value):
+    """可识别的日期转成 YYYY-MM-DD，否则原样返回"""
+    day = parse_day(value)
+    return day.isoformat() if day else value
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def migrate_json_array(json_file, log_file):
+    """
+    一次性把旧的 JSON 数组文件迁移为追加日志。
+    日志已存在或 JSON 文件不存在时不做任何事；迁移后原文件改名为 .migrated 备份。
+    """
+    os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+    with FileLock(log_file + '.lock'):
+        if os.path.exists(log_file) or not os.path.exists(json_file):
+            return False
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        tmp_file = log_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for record in data:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(tmp_file, log_file)
+        os.replace(json_file, json_file + '.migrated')
+    return True
@@ -0,0 +1,405 @@
+"""
+每条运动记录的 AI 小结：后台任务队列 + 持久化结果缓存。
+
+- 提交任务后立即返回任务ID，小结在线程池里按批生成（每批一次模型请求），失败按指数退避重试
+- 结果以「记录内容 + 过去4周基线 + 模型」的哈希为键存进 SQLite，内容没变的记录不会重复生成
+- 任务状态和未完成的批次也存在同一个数据库里，gunicorn 多 worker 时轮询落到哪个 worker 都能查到；
+  worker 重启或被回收后，它没做完的批次由之后查询这个任务的 worker 接手
+
+配置了 FITNESS_LLM_API_KEY 或 FITNESS_LLM_BASE_URL 时调用 OpenAI 兼容接口
+（OpenAI / DeepSeek，本地调试可以用 llm_stub.py），否则使用 health_analyzer 的本地规则。
+"""
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from health_analyzer import build_run_summary, compute_run_baselines
+from metrics import metrics
+
+# 提示词或输出格式变化时加一，旧缓存自动失效
+PROMPT_VERSION = 1
+SUMMARY_FIELDS = ('日期', '运动项目', '运动时长', '睡眠时长', '睡眠质量', '心路历程')
+DEFAULT_MODEL = 'deepseek-chat'
+JOB_RETENTION = timedelta(days=1)
+# 批次的心跳超过这么久没有更新，视为所在 worker 已经退出，由其他 worker 接手。
+# 要大于一个批次最长的执行时间（模型请求超时 60 秒，连同重试约 4 分钟）
+BATCH_LEASE = timedelta(minutes=5)
+# 一个批次最多被接手这么多次，仍没完成（如每次都让 worker 崩溃）就记为失败
+MAX_BATCH_CLAIMS = 3
+
+SYSTEM_PROMPT = (
+    "你是一名运动健康教练。用户会发来一个 JSON 数组，每一项是一次运动记录，"
+    "其中「过去4周同项目平均时长」为 null 表示没有可比较的历史。"
+    "请为每条记录写一段小结，按相同顺序返回 JSON："
+    '{"summaries": [{"observations": ["..."], "suggestions": ["..."]}]}，'
+    "observations 2-3 条，suggestions 1-2 条，使用简体中文。"
+)
+
+def _baseline_value(baseline):
+    if baseline is None or (isinstance(baseline, float) and math.isnan(baseline)):
+        return None
+    return round(float(baseline), 1)
+
+def summary_key(record, baseline, model):
+    """小结缓存的键：只取影响小结内容的字段，id / created_at 不参与"""
+    payload = {field: record.get(field) for field in SUMMARY_FIELDS}
+    payload['baseline'] = _baseline_value(baseline)
+    payload['model'] = model
+    payload['prompt'] = PROMPT_VERSION
+    text = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class LocalSummarizer:
+    """不调用模型，用 health_analyzer 的本地规则生成小结"""
+
+    model = 'local'
+
+    def summarize(self, items):
+        return [build_run_summary(record, baseline) for record, baseline in items]
+
+
+class LLMSummarizer:
+    """OpenAI 兼容的对话接口，一次请求总结一批记录"""
+
+    def __init__(self, base_url=None, api_key=None, model=DEFAULT_MODEL, timeout=60):
+        from openai import OpenAI
+        # 重试由任务队列负责，客户端自身不再重试
+        self.client = OpenAI(base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0)
+        self.model = model
+
+    def summarize(self, items):
+        payload = [
+            {**{field: record.get(field) for field in SUMMARY_FIELDS}, '过去4周同项目平均时长': _baseline_value(baseline)}
+            for record, baseline in items
+        ]
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": json.dumps(payload, ensure_ascii=False, default=str)},
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.3,
+        )
+        summaries = json.loads(response.choices[0].message.content).get('summaries')
+        if not isinstance(summaries, list) or len(summaries) != len(items):
+            raise ValueError("模型返回的小结数量与记录数不一致")
+        return [
+            {
+                "observations": [str(line) for line in summary.get('observations', [])],
+                "suggestions": [str(line) for line in summary.get('suggestions', [])],
+            }
+            for summary in summaries
+        ]
+
+
+def create_summarizer():
+    """按环境变量选择小结生成方式"""
+    base_url = os.environ.get('FITNESS_LLM_BASE_URL')
+    api_key = os.environ.get('FITNESS_LLM_API_KEY')
+    if not (base_url or api_key):
+        return LocalSummarizer()
+    return LLMSummarizer(
+        base_url=base_url,
+        # 本地 stub 不校验密钥，但 openai 客户端要求非空
+        api_key=api_key or 'not-needed',
+        model=os.environ.get('FITNESS_LLM_MODEL', DEFAULT_MODEL),
+    )
+
+
+class SummaryStore:
+    """小结缓存和任务状态（SQLite，WAL 模式，每个线程一个连接）"""
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_file) or '.', exist_ok=True)
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                model TEXT,
+                created_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                owner TEXT,
+                created_at TEXT NOT NULL,
+                items TEXT NOT NULL,
+                errors TEXT NOT NULL DEFAULT '{}'
+            );
+            CREATE TABLE IF NOT EXISTS batches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                items TEXT NOT NULL,
+                worker TEXT NOT NULL,
+                heartbeat TEXT NOT NULL,
+                claims INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE INDEX IF NOT EXISTS idx_batches_job ON batches (job_id);
+            CREATE INDEX IF NOT EXISTS idx_batches_worker ON batches (worker);
+        """)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get_summaries(self, keys):
+        """批量查询缓存，返回 {键: 小结}"""
+        keys = list(set(keys))
+        found = {}
+        conn = self._connect()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, summary FROM summaries WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update((key, json.loads(summary)) for key, summary in rows)
+        return found
+
+    def put_summaries(self, summaries, model):
+        created_at = datetime.now().isoformat()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)',
+                [(key, json.dumps(summary, ensure_ascii=False), model, created_at) for key, summary in summaries.items()]
+            )
+
+    def create_job(self, owner, items, batches=(), worker=''):
+        """
+        items 为 [(记录ID, 缓存键), ...]，batches 为待生成的批次（由 worker 负责），与任务在同一个事务里写入，
+        返回 (任务ID, [(批次ID, 批次), ...])。顺便清理过期任务。
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.now()
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM jobs WHERE created_at < ?', ((now - JOB_RETENTION).isoformat(),))
+            conn.execute('DELETE FROM batches WHERE job_id NOT IN (SELECT id FROM jobs)')
+            conn.execute(
+                'INSERT INTO jobs (id, owner, created_at, items) VALUES (?, ?, ?, ?)',
+                (job_id, owner, now.isoformat(), json.dumps(items))
+            )
+            batch_ids = [
+                conn.execute(
+                    'INSERT INTO batches (job_id, items, worker, heartbeat) VALUES (?, ?, ?, ?)',
+                    (job_id, json.dumps(batch, ensure_ascii=False, default=str), worker, now.isoformat())
+                ).lastrowid
+                for batch in batches
+            ]
+        return job_id, list(zip(batch_ids, batches))
+
+    def claim_stale_batches(self, job_id, worker, lease=BATCH_LEASE, max_claims=MAX_BATCH_CLAIMS):
+        """
+        把任务中心跳超过 lease 没有更新的批次转给 worker，返回 (接手的 [(批次ID, 批次), ...], 放弃的批次)。
+        worker 自己的批次还在它的线程池里，不会再被它重复接手。
+        已经被接手 max_claims 次的批次不再接手，从表里删除后作为放弃的批次返回，由调用方记为失败。
+        """
+        now = datetime.now()
+        stale_before = (now - lease).isoformat()
+        conn = self._connect()
+        if conn.execute(
+            'SELECT 1 FROM batches WHERE job_id = ? AND heartbeat < ? AND worker != ? LIMIT 1',
+            (job_id, stale_before, worker)
+        ).fetchone() is None:
+            return [], []
+        with conn:
+            # 写事务互斥：同时查询的其他 worker 在这之后已看不到过期的心跳，同一批次只会被一个 worker 接手
+            rows = conn.execute(
+                'SELECT id, items, claims FROM batches WHERE job_id = ? AND heartbeat < ? AND worker != ?',
+                (job_id, stale_before, worker)
+            ).fetchall()
+            claimed = [(batch_id, json.loads(items)) for batch_id, items, claims in rows if claims < max_claims]
+            abandoned = [json.loads(items) for _, items, claims in rows if claims >= max_claims]
+            conn.executemany(
+                'UPDATE batches SET worker = ?, heartbeat = ?, claims = claims + 1 WHERE id = ?',
+                [(worker, now.isoformat(), batch_id) for batch_id, _ in claimed]
+            )
+            conn.executemany(
+                'DELETE FROM batches WHERE id = ?', [(batch_id,) for batch_id, _, claims in rows if claims >= max_claims]
+            )
+        return claimed, abandoned
+
+    def heartbeat(self, worker, batch_id=None):
+        """更新 worker 全部批次的心跳；给出 batch_id 时返回这个批次是否仍归 worker 负责"""
+        conn = self._connect()
+        with conn:
+            conn.execute('UPDATE batches SET heartbeat = ? WHERE worker = ?', (datetime.now().isoformat(), worker))
+            if batch_id is None:
+                return True
+            return conn.execute(
+                'SELECT 1 FROM batches WHERE id = ? AND worker = ?', (batch_id, worker)
+            ).fetchone() is not None
+
+    def finish_batch(self, batch_id):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM batches WHERE id = ?', (batch_id,))
+
+    def add_errors(self, job_id, errors):
+        conn = self._connect()
+        with conn:
+            (current,) = conn.execute('SELECT errors FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            merged = {**json.loads(current), **{str(record_id): error for record_id, error in errors.items()}}
+            conn.execute('UPDATE jobs SET errors = ? WHERE id = ?', (json.dumps(merged, ensure_ascii=False), job_id))
+
+    def get_job(self, job_id):
+        row = self._connect().execute(
+            'SELECT owner, created_at, items, errors FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        owner, created_at, items, errors = row
+        return {"owner": owner, "created_at": created_at, "items": json.loads(items), "errors": json.loads(errors)}
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+
+
+class SummaryJobQueue:
+    """
+    小结任务队列：submit() 先查缓存，未命中的记录按 batch_size 分批交给线程池，
+    最多 max_workers 个批次同时请求模型；失败的批次重试 max_retries 次（间隔 retry_delay 秒起指数增长），
+    仍失败则把错误记在任务上。
+    待生成的批次也写进 store 并定期更新心跳；查询进度时发现心跳超过 lease 的批次（所在 worker 已退出），
+    就由当前 worker 接手继续生成。
+    各方法的 store 参数指定缓存和任务所在的 SummaryStore（如每个用户分区一个），默认用构造时给出的 store。
+    """
+
+    def __init__(self, summarizer, store=None, max_workers=4, batch_size=8, max_retries=3, retry_delay=1.0,
+                 lease=BATCH_LEASE):
+        self.summarizer = summarizer
+        self.store = store
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.worker_id = uuid.uuid4().hex
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary')
+
+    def submit(self, records, all_data, owner=None, store=None):
+        """为 records（all_data 中的记录）创建小结任务，返回任务ID"""
+        store = self.store if store is None else store
+        wanted = {id(record) for record in records}
+        baselines = compute_run_baselines(all_data)
+        model = self.summarizer.model
+        items = [
+            (record, baseline, summary_key(record, baseline, model))
+            for record, baseline in zip(all_data, baselines)
+            if id(record) in wanted
+        ]
+
+        cached = store.get_summaries([key for _, _, key in items])
+        pending = {}
+        for record, baseline, key in items:
+            if key not in cached:
+                # 同一任务里内容相同的记录只生成一次，失败时这些记录都记上错误
+                pending.setdefault(key, (record, baseline, key, []))[3].append(record.get('id'))
+        pending = list(pending.values())
+        job_id, batches = store.create_job(
+            owner,
+            [(record.get('id'), key) for record, _, key in items],
+            [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)],
+            self.worker_id
+        )
+        for batch_id, batch in batches:
+            self._executor.submit(self._run_batch, store, job_id, batch_id, batch)
+        return job_id
+
+    def _resume(self, store, job_id):
+        """接手任务中所在 worker 已退出的批次；被接手过太多次的批次记为失败，这时返回 True"""
+        claimed, abandoned = store.claim_stale_batches(job_id, self.worker_id, self.lease)
+        for batch in abandoned:
+            self._fail(store, job_id, batch, "生成小结的进程多次中断，已放弃")
+        for batch_id, batch in claimed:
+            self._executor.submit(self._run_batch, store, job_id, batch_id, batch)
+        return bool(abandoned)
+
+    def _run_batch(self, store, job_id, batch_id, batch):
+        """
+        batch 为 [(记录, 基线, 缓存键, 同键的记录ID列表), ...]；线程池里的异常没人接收，失败都记到任务上。
+        排队期间批次已被其他 worker 接手时跳过。
+        """
+        if not store.heartbeat(self.worker_id, batch_id):
+            return
+        try:
+            self._generate(store, job_id, batch)
+        finally:
+            store.finish_batch(batch_id)
+            store.heartbeat(self.worker_id)
+
+    def _generate(self, store, job_id, batch):
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                store.heartbeat(self.worker_id)
+            try:
+                with metrics.timer('ai_summary_batch'):
+                    summaries = self.summarizer.summarize([(record, baseline) for record, baseline, _, _ in batch])
+                break
+            except Exception as e:
+                error = f"生成小结失败: {e}"
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        else:
+            self._fail(store, job_id, batch, error)
+            return
+        try:
+            store.put_summaries({key: summary for (_, _, key, _), summary in zip(batch, summaries)}, self.summarizer.model)
+        except Exception as e:
+            self._fail(store, job_id, batch, f"保存小结失败: {e}")
+
+    def _fail(self, store, job_id, batch, error):
+        store.add_errors(job_id, {record_id: error for _, _, _, record_ids in batch for record_id in record_ids})
+
+    def status(self, job_id, owner=None, include_results=True, store=None):
+        """任务进度和已完成的小结；任务不存在或不属于 owner 时返回 None"""
+        store = self.store if store is None else store
+        job = store.get_job(job_id)
+        if job is None or job['owner'] != owner:
+            return None
+        summaries = store.get_summaries([key for _, key in job['items']])
+        errors = job['errors']
+        results = [
+            {"id": record_id, "summary": summaries[key]}
+            for record_id, key in job['items'] if key in summaries
+        ]
+        failed = sum(1 for record_id, key in job['items'] if key not in summaries and str(record_id) in errors)
+        total = len(job['items'])
+        done = len(results) + failed == total
+        if not done and self._resume(store, job_id):
+            return self.status(job_id, owner, include_results, store)
+        status = {
+            "job_id": job_id,
+            "status": "done" if done else "running",
+            "total": total,
+            "completed": len(results),
+            "failed": failed,
+            "created_at": job['created_at'],
+            "errors": errors,
+        }
+        if include_results:
+            status["results"] = results
+        return status
+
+    def wait(self, job_id, owner=None, timeout=0, poll_interval=0.2, store=None):
+        """长轮询：等到任务完成或超时后返回 status()"""
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.status(job_id, owner, store=store)
+            if status is None or status['status'] == 'done' or time.monotonic() >= deadline:
+                return status
+            time.sleep(poll_interval)
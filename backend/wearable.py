@@ -0,0 +1,423 @@
+"""
+手表 / 码表导出的逐秒运动数据（GPX / TCX / CSV）：解析、紧凑存储和降采样。
+
+每次运动一个目录 <data_dir>/<workout_id>/：
+    t.npy           相对开始时间的秒数（uint32）
+    heart_rate.npy  心率，bpm（float16，缺失为 NaN）
+    speed.npy       速度，米/秒（float16）
+    cadence.npy     步频 / 踏频（float16）
+    meta.json       项目、开始时间、时长、采样点数等
+每个采样点 10 字节，一年每天 1 小时的 1Hz 数据约 13MB。读取时用内存映射，不整体载入。
+所有运动的 meta 另外汇总在 index.json，按时间范围查询时不必逐个目录读取。
+
+画图时按像素宽度把时间轴分成若干桶，每桶返回 min / max / mean，
+点数只与宽度有关，和原始采样点数无关。另外为每个序列维护按分钟汇总的
+overview/<序列>.npy（按时间排序），桶宽不小于一分钟的查询（如整年的趋势）
+只读这一个小文件，不必打开每次运动的数组。
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from storage import FileLock, atomic_write_json
+
+CHANNELS = ('heart_rate', 'speed', 'cadence')
+# 接口可查询的序列，pace（分钟/公里）由速度换算
+SERIES = CHANNELS + ('pace',)
+MAX_WIDTH = 5000
+OVERVIEW_STEP = 60
+OVERVIEW_DTYPE = np.dtype([('t', '<i8'), ('min', '<f4'), ('max', '<f4'), ('sum', '<f8'), ('count', '<u4')])
+# 低于这个速度（米/秒）视为停止，不计算配速
+MIN_PACE_SPEED = 0.3
+
+# 导出文件里的运动类型 -> 运动项目
+SPORT_NAMES = {
+    'running': '跑步', 'run': '跑步', 'trail_running': '跑步',
+    'biking': '骑行', 'cycling': '骑行', 'ride': '骑行', 'road_biking': '骑行',
+    'swimming': '游泳', 'swim': '游泳', 'lap_swimming': '游泳',
+    'walking': '步行', 'walk': '步行',
+    'hiking': '徒步', 'hike': '徒步',
+}
+
+# CSV 列名（小写）-> 通道
+CSV_COLUMNS = {
+    'time': 'time', 'timestamp': 'time', 'datetime': 'time', '时间': 'time',
+    'heart_rate': 'heart_rate', 'heartrate': 'heart_rate', 'hr': 'heart_rate', '心率': 'heart_rate',
+    'speed': 'speed', '速度': 'speed',
+    'pace': 'pace', '配速': 'pace',
+    'cadence': 'cadence', 'cad': 'cadence', '步频': 'cadence', '踏频': 'cadence',
+}
+
+def _local(tag):
+    """去掉 XML 命名空间"""
+    return tag.rsplit('}', 1)[-1].lower()
+
+def _number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _haversine(lat, lon):
+    """相邻两点间的距离（米），第一个点为 NaN"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    dlat, dlon = np.diff(lat), np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return np.concatenate([[np.nan], 2 * 6371000 * np.arcsin(np.sqrt(a))])
+
+def _epoch_seconds(times):
+    """带时区（UTC）的时间列转成 Unix 秒"""
+    return times.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy().astype('datetime64[s]').astype(np.int64)
+
+def _speed_from_distance(times, step_distance):
+    seconds = np.diff(_epoch_seconds(times), prepend=np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed = step_distance / seconds
+    return np.where(seconds > 0, speed, np.nan)
+
+def parse_gpx(content):
+    """GPX：trkpt 的经纬度和时间，心率 / 步频来自 Garmin TrackPointExtension，速度由相邻点距离计算"""
+    sport = None
+    points = []
+    point = None
+    for event, elem in ET.iterparse(io.BytesIO(content), events=('start', 'end')):
+        tag = _local(elem.tag)
+        if event == 'start':
+            if tag == 'trkpt':
+                point = {'lat': _number(elem.get('lat')), 'lon': _number(elem.get('lon'))}
+            continue
+        if point is None:
+            if tag == 'type' and sport is None:
+                sport = (elem.text or '').strip()
+        elif tag == 'time':
+            point['time'] = elem.text
+        elif tag in ('hr', 'heartrate'):
+            point['heart_rate'] = _number(elem.text)
+        elif tag in ('cad', 'cadence'):
+            point['cadence'] = _number(elem.text)
+        elif tag == 'trkpt':
+            points.append(point)
+            point = None
+            elem.clear()
+    frame = pd.DataFrame(points, columns=['time', 'lat', 'lon', 'heart_rate', 'cadence'])
+    frame['time'] = pd.to_datetime(frame['time'], utc=True, errors='coerce')
+    frame = frame.dropna(subset=['time']).sort_values('time', kind='stable')
+    frame['speed'] = _speed_from_distance(frame['time'], _haversine(frame['lat'].to_numpy(), frame['lon'].to_numpy()))
+    return frame, sport
+
+def parse_tcx(content):
+    """TCX：Trackpoint 的时间、心率、步频、累计距离（速度优先取扩展字段 Speed）"""
+    sport = None
+    points = []
+    point = None
+    for event, elem in ET.iterparse(io.BytesIO(content), events=('start', 'end')):
+        tag = _local(elem.tag)
+        if event == 'start':
+            if tag == 'activity' and sport is None:
+                sport = elem.get('Sport')
+            elif tag == 'trackpoint':
+                point = {}
+            continue
+        if point is None:
+            continue
+        if tag == 'time':
+            point['time'] = elem.text
+        elif tag == 'value':
+            point['heart_rate'] = _number(elem.text)
+        elif tag in ('cadence', 'runcadence'):
+            point['cadence'] = _number(elem.text)
+        elif tag == 'distancemeters':
+            point['distance'] = _number(elem.text)
+        elif tag == 'speed':
+            point['speed'] = _number(elem.text)
+        elif tag == 'trackpoint':
+            points.append(point)
+            point = None
+            elem.clear()
+    frame = pd.DataFrame(points, columns=['time', 'heart_rate', 'cadence', 'distance', 'speed'])
+    frame['time'] = pd.to_datetime(frame['time'], utc=True, errors='coerce')
+    frame = frame.dropna(subset=['time']).sort_values('time', kind='stable')
+    derived = _speed_from_distance(frame['time'], np.diff(frame['distance'].to_numpy(dtype=float), prepend=np.nan))
+    frame['speed'] = frame['speed'].astype(float).fillna(pd.Series(derived, index=frame.index))
+    return frame, sport
+
+def parse_csv(content):
+    """
+    CSV：需要时间列（time / timestamp / 时间，ISO 时间或秒级时间戳），
+    可选 heart_rate / speed（米/秒）/ pace（分钟/公里）/ cadence，可选 sport 列。
+    """
+    raw = pd.read_csv(io.BytesIO(content))
+    columns = {column: CSV_COLUMNS.get(str(column).strip().lower()) for column in raw.columns}
+    frame = raw.rename(columns={column: name for column, name in columns.items() if name})
+    if 'time' not in frame.columns:
+        raise ValueError("CSV 缺少时间列（time / timestamp / 时间）")
+    if pd.api.types.is_numeric_dtype(frame['time']):
+        frame['time'] = pd.to_datetime(frame['time'], unit='s', utc=True)
+    else:
+        frame['time'] = pd.to_datetime(frame['time'], utc=True, errors='coerce', format='mixed')
+    if 'speed' not in frame.columns and 'pace' in frame.columns:
+        pace = pd.to_numeric(frame['pace'], errors='coerce')
+        frame['speed'] = 1000 / (pace * 60)
+    for channel in CHANNELS:
+        frame[channel] = pd.to_numeric(frame[channel], errors='coerce') if channel in frame.columns else np.nan
+    sport_column = next((column for column in raw.columns if str(column).strip().lower() in ('sport', '运动项目')), None)
+    sport = str(raw[sport_column].dropna().iloc[0]) if sport_column and raw[sport_column].notna().any() else None
+    frame = frame.dropna(subset=['time']).sort_values('time', kind='stable')
+    return frame[['time', *CHANNELS]], sport
+
+PARSERS = {'gpx': parse_gpx, 'tcx': parse_tcx, 'csv': parse_csv}
+
+def sport_name(value, default='其他'):
+    """导出文件的运动类型转成运动项目名称，已经是中文名称的原样返回"""
+    if not value:
+        return default
+    key = str(value).strip().lower().replace(' ', '_')
+    return SPORT_NAMES.get(key, str(value).strip() if not key.isascii() else default)
+
+
+def _reduce(buckets, minimum, maximum, total, count):
+    """按已排序的桶序号合并统计量，返回 (桶序号, min, max, 求和, 个数)"""
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+    return (
+        buckets[starts],
+        np.fmin.reduceat(minimum, starts),
+        np.fmax.reduceat(maximum, starts),
+        np.add.reduceat(total, starts),
+        np.add.reduceat(count, starts),
+    )
+
+def _sample_stats(buckets, values):
+    """原始采样点（按时间排序）按桶汇总，NaN 不参与"""
+    finite = ~np.isnan(values)
+    return _reduce(buckets, values, values, np.where(finite, values, 0.0), finite.astype(np.int64))
+
+def _series_values(arrays, series):
+    if series == 'pace':
+        speed = arrays['speed'].astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(speed > MIN_PACE_SPEED, 1000 / (speed * 60), np.nan)
+    return arrays[series].astype(np.float64)
+
+
+class WorkoutStore:
+    """某个用户的逐秒运动数据，目录结构见模块说明"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.index_file = os.path.join(data_dir, 'index.json')
+        self.lock = FileLock(self.index_file + '.lock')
+
+    def _read_index(self):
+        if not os.path.exists(self.index_file):
+            return []
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def list(self, start=None, end=None):
+        """按开始时间排序的运动列表，只取开始时间在 [start, end)（Unix 秒，见 parse_bound）内的运动"""
+        workouts = self._read_index()
+        if start is not None:
+            workouts = [workout for workout in workouts if workout['start_ts'] >= start]
+        if end is not None:
+            workouts = [workout for workout in workouts if workout['start_ts'] < end]
+        return workouts
+
+    def get(self, workout_id):
+        return next((workout for workout in self._read_index() if workout['id'] == workout_id), None)
+
+    def ingest(self, content, fmt, sport=None, source=None):
+        """
+        解析并保存一次运动，返回 (meta, 是否新增)。
+        workout_id 由文件内容哈希得到，同一文件重复上传不会重复保存。
+        """
+        if fmt not in PARSERS:
+            raise ValueError(f"不支持的文件格式: {fmt}（支持 gpx / tcx / csv）")
+        workout_id = hashlib.sha1(content).hexdigest()[:16]
+        existing = self.get(workout_id)
+        if existing is not None:
+            return existing, False
+
+        try:
+            frame, file_sport = PARSERS[fmt](content)
+        except ET.ParseError as e:
+            raise ValueError(f"文件无法解析: {e}")
+        # 同一秒有多个采样点时保留最后一个
+        seconds = _epoch_seconds(frame['time'])
+        keep = np.concatenate([seconds[1:] != seconds[:-1], [True]]) if len(seconds) else seconds.astype(bool)
+        frame, seconds = frame[keep], seconds[keep]
+        if len(frame) < 2:
+            raise ValueError("文件中没有足够的带时间的采样点")
+
+        start = int(seconds[0])
+        started_at = datetime.fromtimestamp(start, tz=timezone.utc)
+        meta = {
+            'id': workout_id,
+            'sport': sport_name(sport or file_sport),
+            'start': started_at.isoformat(),
+            'start_ts': start,
+            # 日期按服务器本地时区计算，和手动记录的日期一致
+            'date': started_at.astimezone().strftime('%Y-%m-%d'),
+            'duration': int(seconds[-1] - start),
+            'samples': len(frame),
+            'channels': [channel for channel in CHANNELS if frame[channel].notna().any()],
+            'source': source or fmt,
+        }
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.data_dir, prefix='.tmp-')
+        try:
+            np.save(os.path.join(tmp_dir, 't.npy'), (seconds - start).astype(np.uint32))
+            for channel in CHANNELS:
+                np.save(os.path.join(tmp_dir, f'{channel}.npy'), frame[channel].to_numpy(dtype=np.float64).astype(np.float16))
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            with self.lock:
+                if self.get(workout_id) is not None:
+                    return self.get(workout_id), False
+                workout_dir = os.path.join(self.data_dir, workout_id)
+                if os.path.exists(workout_dir):
+                    # 上次保存到一半失败（目录已就位但没有写进 index），os.replace 不能覆盖非空目录
+                    shutil.rmtree(workout_dir)
+                os.replace(tmp_dir, workout_dir)
+                self._update_overview(
+                    seconds, {channel: frame[channel].to_numpy(dtype=np.float64) for channel in CHANNELS}
+                )
+                index = self._read_index()
+                index.append(meta)
+                index.sort(key=lambda workout: workout['start_ts'])
+                atomic_write_json(self.index_file, index, ensure_ascii=False)
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+        return meta, True
+
+    def arrays(self, workout_id, names=('t',) + CHANNELS):
+        """以内存映射方式打开一次运动的指定通道数组"""
+        directory = os.path.join(self.data_dir, workout_id)
+        return {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in names}
+
+    def _overview_file(self, series):
+        return os.path.join(self.data_dir, 'overview', f'{series}.npy')
+
+    def _read_overview(self, series):
+        path = self._overview_file(series)
+        return np.load(path) if os.path.exists(path) else np.zeros(0, dtype=OVERVIEW_DTYPE)
+
+    def _update_overview(self, t, arrays):
+        """把一次运动按分钟汇总后并入各序列的 overview（调用方持有写锁）"""
+        os.makedirs(os.path.join(self.data_dir, 'overview'), exist_ok=True)
+        minutes = t // OVERVIEW_STEP * OVERVIEW_STEP
+        for series in SERIES:
+            buckets, minimum, maximum, total, count = _sample_stats(minutes, _series_values(arrays, series))
+            rows = np.zeros(len(buckets), dtype=OVERVIEW_DTYPE)
+            rows['t'], rows['min'], rows['max'], rows['sum'], rows['count'] = buckets, minimum, maximum, total, count
+            merged = np.concatenate([self._read_overview(series), rows[count > 0]])
+            merged = merged[np.argsort(merged['t'], kind='stable')]
+            path = self._overview_file(series)
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, merged)
+            os.replace(path + '.tmp', path)
+
+    def series(self, series, width, start=None, end=None, workout_id=None):
+        """
+        降采样后的序列：[start, end)（Unix 秒）平均分成 width 个桶，每桶给出 min / max / mean。
+        指定 workout_id 时只取这一次运动，时间范围默认为整次运动；
+        否则取时间范围内的所有运动，范围默认为全部数据；桶宽不小于一分钟时使用按分钟的汇总，
+        桶边界精确到分钟。没有数据的桶不返回。
+        """
+        if series not in SERIES:
+            raise ValueError(f"未知的数据序列: {series}（可选 {' / '.join(SERIES)}）")
+        width = max(1, min(int(width), MAX_WIDTH))
+        if workout_id is not None:
+            workout = self.get(workout_id)
+            if workout is None:
+                raise KeyError(workout_id)
+            workouts = [workout]
+        else:
+            workouts = self.list()
+        if start is None:
+            start = min((workout['start_ts'] for workout in workouts), default=0)
+        if end is None:
+            end = max((workout['start_ts'] + workout['duration'] + 1 for workout in workouts), default=start + 1)
+        workouts = [
+            workout for workout in workouts
+            if workout['start_ts'] < end and workout['start_ts'] + workout['duration'] >= start
+        ]
+        step = max((end - start) / width, 1.0)
+        width = int(np.ceil((end - start) / step))
+
+        mins = np.full(width, np.nan)
+        maxs = np.full(width, np.nan)
+        sums = np.zeros(width)
+        counts = np.zeros(width, dtype=np.int64)
+        if workout_id is None and step >= OVERVIEW_STEP:
+            overview = self._read_overview(series)
+            lo, hi = np.searchsorted(overview['t'], [start - OVERVIEW_STEP + 1, end])
+            overview = overview[lo:hi]
+            buckets = np.clip((overview['t'] - start) // step, 0, width - 1).astype(np.int64)
+            parts = [
+                _reduce(buckets, overview['min'].astype(np.float64), overview['max'].astype(np.float64),
+                        overview['sum'], overview['count'].astype(np.int64))
+            ] if len(overview) else []
+        else:
+            parts = []
+            names = ('t', 'speed') if series == 'pace' else ('t', series)
+            for workout in workouts:
+                arrays = self.arrays(workout['id'], names)
+                buckets = ((arrays['t'].astype(np.int64) + workout['start_ts'] - start) // step).astype(np.int64)
+                inside = (buckets >= 0) & (buckets < width)
+                if inside.any():
+                    parts.append(_sample_stats(buckets[inside], _series_values(arrays, series)[inside]))
+        for buckets, bucket_min, bucket_max, bucket_sum, bucket_count in parts:
+            mins[buckets] = np.fmin(mins[buckets], bucket_min)
+            maxs[buckets] = np.fmax(maxs[buckets], bucket_max)
+            sums[buckets] += bucket_sum
+            counts[buckets] += bucket_count
+
+        filled = counts > 0
+        return {
+            'series': series,
+            'start': start,
+            'step': step,
+            't': (start + np.flatnonzero(filled) * step).round(3).tolist(),
+            'min': mins[filled].round(2).tolist(),
+            'max': maxs[filled].round(2).tolist(),
+            'mean': (sums[filled] / counts[filled]).round(2).tolist(),
+        }
+
+
+def parse_bound(value, end=False):
+    """
+    时间范围参数：Unix 秒，或日期 / 时间（不带时区时按服务器本地时区）。
+    end=True 且只给了日期时取当天结束，即包含这一整天。
+    """
+    if value in (None, ''):
+        return None
+    text = str(value).strip()
+    if text.lstrip('-').isdigit():
+        return int(text)
+    timestamp = pd.Timestamp(text)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize(datetime.now().astimezone().tzinfo)
+    if end and len(text) <= 10:
+        timestamp += pd.Timedelta(days=1)
+    return int(timestamp.timestamp())
+
+def daily_record(meta):
+    """由一次运动生成 FitnessData 的每日记录，运动文件里没有睡眠数据，睡眠时长为 None（缺失）"""
+    return {
+        '日期': meta['date'],
+        '运动项目': meta['sport'],
+        '运动时长': round(meta['duration'] / 60, 1),
+        '睡眠时长': None,
+        'workout_id': meta['id'],
+        '心路历程': '',
+    }
@@ -0,0 +1,12 @@
+"""
+生产环境入口（在 backend 目录下运行）：
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+worker / 线程数量见 gunicorn.conf.py。多个 worker 共享同一份数据文件，
+写入由存储层的文件锁串行化，读取走各 worker 自己的内存缓存。
+"""
+from app import app
+
+if __name__ == '__main__':
+    app.run(port=5000, threaded=True)
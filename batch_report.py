@@ -0,0 +1,295 @@
+"""
+离线批量生成健康报告：输入目录里每个用户一个 CSV（my_app 格式）或 JSON（backend 格式）文件，
+文件名（不含扩展名）作为用户ID，为每个用户输出一份 Markdown 或 JSON 报告。
+同一个用户ID 有多个输入文件（如 alice.csv 和 alice.json）时这些文件都记为失败，不生成报告。
+
+    python batch_report.py exports/ --out reports/ --format md --workers 8
+
+- 多进程并行：文件按 --chunk-size 个一组分发给子进程，减少进程间通信的次数
+- 输出目录里的 manifest.json 记录每个输入文件的 SHA-256 和生成参数，
+  文件内容和参数都没变、报告也还在时跳过（--force 全部重新生成）
+- 每个文件的读取 / 分析 / 写出耗时记在 manifest 里，结束时打印汇总、吞吐量和最慢的几个文件
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from backend.analytics import CSV_COLUMNS, RECORD_COLUMNS
+from backend.schema import CSV_SCHEMA, coerce_frame
+from health_report import compute_rollups, get_local_health_analysis, get_recent_summary
+
+INPUT_SUFFIXES = ('.csv', '.json')
+MANIFEST_FILE = 'manifest.json'
+# 报告内容或格式变化时加一，已有的报告全部重新生成
+REPORT_VERSION = 1
+WEEKS_IN_REPORT = 4
+
+# backend 的字段名 -> my_app 的列名
+_JSON_TO_CSV = {RECORD_COLUMNS[key]: CSV_COLUMNS[key] for key in RECORD_COLUMNS}
+
+def load_user_data(content, suffix):
+    """把一个用户的文件内容读成与 my_app 相同列名、按 CSV_SCHEMA 转换好类型的 DataFrame"""
+    if suffix == '.csv':
+        frame = pd.read_csv(io.BytesIO(content))
+    else:
+        records = json.loads(content)
+        if isinstance(records, dict):
+            # 也接受 GET /api/health/records 的返回格式
+            records = records.get('data', [])
+        frame = pd.DataFrame(records).rename(columns=_JSON_TO_CSV)
+    return coerce_frame(frame, CSV_SCHEMA)
+
+def _number(value, digits=1):
+    return None if pd.isna(value) else round(float(value), digits)
+
+def build_report(user, data, as_of=None, version=None):
+    """一个用户的报告内容（dict），Markdown 和 JSON 两种输出都由它生成"""
+    dates = data['日期'].dropna()
+    analysis = get_local_health_analysis(data, as_of=as_of, version=version)
+    # 与上面的分析共用同一次窗口计算（按 version 缓存）
+    summary = get_recent_summary(data, as_of=as_of, version=version) if len(data) >= 3 else None
+    # 周汇总只统计截至 as_of 的记录
+    recent = data[data['日期'] <= pd.Timestamp(as_of)] if as_of is not None else data
+    weekly = compute_rollups(recent, 'week').tail(WEEKS_IN_REPORT) if recent['日期'].notna().any() else pd.DataFrame()
+    return {
+        'user': user,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'as_of': summary['as_of'] if summary else None,
+        'records': len(data),
+        'first_date': dates.min().strftime('%Y-%m-%d') if len(dates) else None,
+        'last_date': dates.max().strftime('%Y-%m-%d') if len(dates) else None,
+        'summary': summary,
+        'analysis': analysis.strip(),
+        'weekly': [
+            {
+                'week': start.strftime('%Y-%m-%d'),
+                'records': int(row['记录数']),
+                'total_duration': _number(row['总运动时长']),
+                'active_days': int(row['运动天数']),
+                'avg_sleep': _number(row['平均睡眠']),
+                'avg_quality': _number(row['平均睡眠质量']),
+            }
+            for start, row in weekly.iterrows()
+        ],
+    }
+
+def render_markdown(report):
+    lines = [f"# 健康报告：{report['user']}", ""]
+    if report['records']:
+        lines.append(f"共 {report['records']} 条记录（{report['first_date']} ~ {report['last_date']}）"
+                     + (f"，分析截至 {report['as_of']}" if report['as_of'] else ""))
+        lines.append("")
+    lines.append(report['analysis'])
+    if report['weekly']:
+        lines += [
+            "",
+            f"## 最近 {len(report['weekly'])} 周",
+            "",
+            "| 周（周一） | 记录数 | 总运动时长(分钟) | 运动天数 | 平均睡眠(小时) | 平均睡眠质量 |",
+            "| --- | --- | --- | --- | --- | --- |",
+        ]
+        for week in report['weekly']:
+            cells = [week['week'], week['records'], week['total_duration'], week['active_days'], week['avg_sleep'], week['avg_quality']]
+            lines.append("| " + " | ".join('-' if cell is None else str(cell) for cell in cells) + " |")
+    return "\n".join(lines) + "\n"
+
+def _write_atomic(path, text):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def report_path(out_dir, user, fmt):
+    return os.path.join(out_dir, f"{user}.{'md' if fmt == 'md' else 'json'}")
+
+def process_file(path, out_dir, options, known_hash=None):
+    """
+    处理一个输入文件，返回写进 manifest 的条目。
+    内容哈希与 known_hash 相同且报告已存在时跳过；出错时记录错误而不是抛出，不影响其他文件。
+    """
+    name = os.path.basename(path)
+    user, suffix = os.path.splitext(name)
+    timings = {}
+    entry = {'file': name, 'user': user, 'options': options}
+    started = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        timings['read'] = time.perf_counter() - started
+        entry['sha256'] = digest
+        output = report_path(out_dir, user, options['format'])
+        if digest == known_hash and os.path.exists(output):
+            entry['status'] = 'skipped'
+            return entry
+
+        step = time.perf_counter()
+        data = load_user_data(content, suffix.lower())
+        timings['load'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        report = build_report(user, data, as_of=options['as_of'], version=digest)
+        timings['analysis'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        if options['format'] == 'md':
+            text = render_markdown(report)
+        else:
+            text = json.dumps(report, ensure_ascii=False, indent=2)
+        _write_atomic(output, text)
+        timings['write'] = time.perf_counter() - step
+        entry.update(status='generated', report=os.path.basename(output), records=report['records'])
+    except Exception as e:
+        entry.update(status='failed', error=f"{type(e).__name__}: {e}")
+    finally:
+        timings['total'] = time.perf_counter() - started
+        entry['seconds'] = {phase: round(seconds, 4) for phase, seconds in timings.items()}
+    return entry
+
+def process_chunk(tasks, out_dir, options):
+    """子进程入口：依次处理一组 (路径, 已知哈希)"""
+    return [process_file(path, out_dir, options, known_hash) for path, known_hash in tasks]
+
+def find_inputs(input_dir):
+    return sorted(
+        entry.path for entry in os.scandir(input_dir)
+        if entry.is_file() and os.path.splitext(entry.name)[1].lower() in INPUT_SUFFIXES
+    )
+
+def find_duplicate_users(paths):
+    """
+    用户ID（不区分大小写，报告写在大小写不敏感的文件系统上也不会互相覆盖）对应多个输入文件时，
+    返回 {文件路径: 错误信息}
+    """
+    by_user = {}
+    for path in paths:
+        user = os.path.splitext(os.path.basename(path))[0]
+        by_user.setdefault(user.casefold(), []).append(path)
+    errors = {}
+    for group in by_user.values():
+        if len(group) > 1:
+            names = '、'.join(os.path.basename(path) for path in group)
+            for path in group:
+                errors[path] = f"用户ID重复：{names} 对应同一份报告，请只保留一个文件"
+    return errors
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get('version') != REPORT_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+def run_batch(input_dir, out_dir, fmt='md', as_of=None, workers=None, chunk_size=None, force=False, progress=None):
+    """
+    为 input_dir 里的每个用户文件生成报告，返回 manifest 的 files 部分（{文件名: 条目}）。
+    workers=1 时在当前进程里运行，便于调试；progress(完成数, 总数) 在每组完成后调用。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = find_inputs(input_dir)
+    options = {'format': fmt, 'as_of': as_of}
+    previous = {} if force else load_manifest(out_dir)
+    files = {}
+    for path, error in find_duplicate_users(paths).items():
+        name = os.path.basename(path)
+        files[name] = {'file': name, 'user': os.path.splitext(name)[0], 'options': options, 'status': 'failed', 'error': error}
+    tasks = []
+    for path in paths:
+        if os.path.basename(path) in files:
+            continue
+        known = previous.get(os.path.basename(path))
+        # 生成参数变了也要重新生成
+        known_hash = known.get('sha256') if known and known.get('options') == options and known.get('status') != 'failed' else None
+        tasks.append((path, known_hash))
+
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # 每个进程大约分到 4 组，既能摊薄通信开销，又能在文件大小不均时平衡负载
+        chunk_size = max(1, min(64, len(tasks) // (workers * 4)))
+    chunks = [tasks[start:start + chunk_size] for start in range(0, len(tasks), chunk_size)]
+
+    done = 0
+    if workers == 1:
+        for chunk in chunks:
+            for entry in process_chunk(chunk, out_dir, options):
+                files[entry['file']] = entry
+            done += len(chunk)
+            if progress:
+                progress(done, len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_chunk, chunk, out_dir, options) for chunk in chunks]
+            for future in as_completed(futures):
+                entries = future.result()
+                for entry in entries:
+                    files[entry['file']] = entry
+                done += len(entries)
+                if progress:
+                    progress(done, len(tasks))
+
+    # 跳过的文件沿用上次的耗时和报告信息
+    for name, entry in files.items():
+        if entry['status'] == 'skipped' and name in previous:
+            files[name] = {**previous[name], 'status': 'skipped'}
+    manifest = {'version': REPORT_VERSION, 'updated_at': datetime.now().isoformat(timespec='seconds'),
+                'files': dict(sorted(files.items()))}
+    _write_atomic(os.path.join(out_dir, MANIFEST_FILE), json.dumps(manifest, ensure_ascii=False, indent=1))
+    return manifest['files']
+
+def main():
+    parser = argparse.ArgumentParser(description='为目录中每个用户的数据文件批量生成健康报告')
+    parser.add_argument('input_dir', help='输入目录：每个用户一个 .csv（my_app 格式）或 .json（backend 格式）文件')
+    parser.add_argument('--out', required=True, help='报告输出目录（同时保存 manifest.json）')
+    parser.add_argument('--format', choices=('md', 'json'), default='md', help='报告格式')
+    parser.add_argument('--as-of', help='报告截至日期（默认各用户最新记录日期）')
+    parser.add_argument('--workers', type=int, help='进程数（默认 CPU 核数，1 表示不开子进程）')
+    parser.add_argument('--chunk-size', type=int, help='每次分发给子进程的文件数（默认自动）')
+    parser.add_argument('--force', action='store_true', help='忽略 manifest，全部重新生成')
+    parser.add_argument('--slowest', type=int, default=5, help='结束时列出最慢的几个文件')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+
+    def on_progress(done, total):
+        print(f"\r已处理 {done}/{total}", end='', file=sys.stderr, flush=True)
+
+    files = run_batch(args.input_dir, args.out, fmt=args.format, as_of=args.as_of, workers=args.workers,
+                      chunk_size=args.chunk_size, force=args.force, progress=on_progress)
+    elapsed = time.perf_counter() - started
+    print(file=sys.stderr)
+
+    entries = list(files.values())
+    counts = {status: sum(entry['status'] == status for entry in entries) for status in ('generated', 'skipped', 'failed')}
+    print(f"共 {len(entries)} 个文件：生成 {counts['generated']}，跳过 {counts['skipped']}，失败 {counts['failed']}，"
+          f"耗时 {elapsed:.2f} 秒（{len(entries) / elapsed:.1f} 个/秒）")
+    for entry in entries:
+        if entry['status'] == 'failed':
+            print(f"  失败 {entry['file']}: {entry['error']}")
+    generated = sorted((entry for entry in entries if entry['status'] == 'generated'),
+                       key=lambda entry: entry['seconds']['total'], reverse=True)
+    if generated and args.slowest:
+        print("最慢的文件：")
+        for entry in generated[:args.slowest]:
+            phases = '，'.join(f"{phase} {seconds * 1000:.1f}ms" for phase, seconds in entry['seconds'].items() if phase != 'total')
+            print(f"  {entry['file']}: {entry['seconds']['total'] * 1000:.1f}ms（{phases}）")
+    if counts['failed']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
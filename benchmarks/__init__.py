@@ -0,0 +1,7 @@
+"""
+性能基准测试：合成数据生成器 + 各热点路径的可重复基准。
+
+    python -m benchmarks.generate --records 100000 --out /tmp/bench      # 只生成数据
+    python -m benchmarks.run --sizes 1000,100000 --out results.json       # 运行基准
+    python -m benchmarks.compare old.json new.json                        # 对比两次结果
+"""
@@ -0,0 +1,32 @@
+"""对比两次基准结果（按中位数），超过阈值的变慢项标记出来"""
+import argparse
+import json
+import sys
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    return report, {(item['size'], item['name']): item for item in report['results']}
+
+def main():
+    parser = argparse.ArgumentParser(description='对比两次基准结果')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=1.2, help='变慢超过该倍数视为回归')
+    args = parser.parse_args()
+
+    base_report, base = load(args.baseline)
+    current_report, current = load(args.current)
+    print(f"{base_report['meta'].get('commit')} -> {current_report['meta'].get('commit')}")
+    regressions = 0
+    for key in sorted(set(base) & set(current)):
+        before = base[key]['median']
+        after = current[key]['median']
+        ratio = after / before if before else float('inf')
+        flag = '⚠️' if ratio > args.threshold else ''
+        regressions += ratio > args.threshold
+        print(f"{key[0]:>8} {key[1]:<45} {before * 1000:10.2f} -> {after * 1000:10.2f} ms  x{ratio:5.2f} {flag}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
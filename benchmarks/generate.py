@@ -0,0 +1,103 @@
+"""合成多年健康数据，同时输出 my_app.py 使用的 CSV 和 backend 使用的 JSON"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SPORTS = {'跑步': 0.4, '游泳': 0.15, '篮球': 0.15, '骑行': 0.15, '力量训练': 0.15}
+DEFAULT_START = '2000-01-01'
+NOTE_CHARS = list('今天跑步感觉很好睡眠质量不错继续坚持配速心率恢复疲劳状态天气小雨开心')
+# pandas 纳秒时间戳能表示的最后一天（2262-04-11），生成的日期不能超过它
+LAST_DAY = np.datetime64(pd.Timestamp.max.normalize().date(), 'D')
+
+def dataset_dates(count, start=DEFAULT_START):
+    """
+    每天一条记录的日期。超出 start 到 LAST_DAY 的范围后从 start 重新循环，
+    所以 100 万条这样的规模会有同一天的多条记录（my_app.py 按日期覆盖，CSV 那边只保留每天最后一条）。
+    """
+    first = np.datetime64(start, 'D')
+    span = int((LAST_DAY - first).astype(int))
+    return first + np.arange(count) % span
+
+def generate_frame(records=None, years=1, sports=None, notes_length=20, rest_ratio=0.2, start=DEFAULT_START, seed=0):
+    """
+    生成每天一条的记录（日期见 dataset_dates）。records 给定时优先于 years。
+    sports: {运动项目: 权重}；notes_length: 心路历程的平均字数；rest_ratio: 不运动的天数比例。
+    """
+    rng = np.random.default_rng(seed)
+    count = records if records is not None else int(years * 365)
+    sports = sports or DEFAULT_SPORTS
+    names = list(sports)
+    weights = np.array([sports[name] for name in names], dtype=float)
+
+    dates = dataset_dates(count, start)
+    duration = rng.gamma(4.0, 9.0, count).round()
+    duration[rng.random(count) < rest_ratio] = 0
+    sleep = rng.normal(7.2, 0.8, count).clip(4, 10).round(1)
+    quality = rng.integers(1, 6, count)
+
+    if notes_length:
+        lengths = rng.poisson(notes_length, count)
+        pool = rng.choice(NOTE_CHARS, size=int(lengths.sum()))
+        bounds = np.concatenate([[0], np.cumsum(lengths)])
+        notes = [''.join(pool[bounds[i]:bounds[i + 1]]) for i in range(count)]
+    else:
+        notes = [''] * count
+
+    return pd.DataFrame({
+        '日期': np.datetime_as_string(dates, unit='D'),
+        '运动项目': rng.choice(names, size=count, p=weights / weights.sum()),
+        '运动时长': duration,
+        '睡眠时长': sleep,
+        '睡眠质量': quality,
+        '心路历程': notes,
+    })
+
+def to_csv_frame(frame):
+    """转换为 my_app.py 的列名"""
+    return frame.rename(columns={'运动时长': '运动时长(分钟)', '睡眠时长': '睡眠时长(小时)'})
+
+def to_json_records(frame):
+    """转换为 backend FitnessData 的记录格式（带 id 和 created_at）"""
+    records = frame.to_dict('records')
+    for index, record in enumerate(records, start=1):
+        record['id'] = index
+        record['created_at'] = f"{record['日期']}T21:00:00"
+    return records
+
+def write_dataset(out_dir, **options):
+    """写出 my_data.csv 和 data/fitness_data.json，返回两个路径"""
+    frame = generate_frame(**options)
+    os.makedirs(os.path.join(out_dir, 'data'), exist_ok=True)
+    csv_path = os.path.join(out_dir, 'my_data.csv')
+    json_path = os.path.join(out_dir, 'data', 'fitness_data.json')
+    to_csv_frame(frame).to_csv(csv_path, index=False)
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(to_json_records(frame), f, ensure_ascii=False)
+    return csv_path, json_path
+
+def parse_sports(text):
+    """'跑步:0.5,游泳:0.5' -> {'跑步': 0.5, '游泳': 0.5}"""
+    sports = {}
+    for item in text.split(','):
+        name, _, weight = item.partition(':')
+        sports[name.strip()] = float(weight or 1)
+    return sports
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成健康数据')
+    parser.add_argument('--out', required=True, help='输出目录')
+    parser.add_argument('--records', type=int, help='记录条数（优先于 --years）')
+    parser.add_argument('--years', type=float, default=1, help='生成多少年的每日记录')
+    parser.add_argument('--sports', type=parse_sports, help="运动项目及权重，如 '跑步:0.5,游泳:0.5'")
+    parser.add_argument('--notes-length', type=int, default=20, help='心路历程平均字数')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    paths = write_dataset(args.out, records=args.records, years=args.years, sports=args.sports,
+                          notes_length=args.notes_length, seed=args.seed)
+    print('\n'.join(paths))
+
+if __name__ == '__main__':
+    main()
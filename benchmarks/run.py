@@ -0,0 +1,184 @@
+"""
+运行基准测试并把结果写成 JSON，便于不同提交之间对比。
+
+每个数据规模在独立子进程里运行（干净的模块状态和临时数据目录），
+结果按 {size, name, runs, min, median, mean}（秒）记录。
+写入类的基准在数据集的副本上进行，新记录的日期取自数据集最后 28 天，
+读取类基准测的始终是生成的那份数据。
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, 'backend')
+
+def measure(func, repeat=5, budget=10.0, setup=None):
+    """重复执行 func，累计耗时超过 budget 秒后提前停止（至少执行一次）"""
+    timings = []
+    spent = 0.0
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+        spent += elapsed
+        if spent > budget:
+            break
+    return {
+        "runs": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+    }
+
+def _new_csv_record(day):
+    return {'日期': day, '运动项目': '跑步', '运动时长(分钟)': 30.0, '睡眠时长(小时)': 7.5, '睡眠质量': 4, '心路历程': '基准测试'}
+
+def _new_json_record(day):
+    return {'日期': day, '运动项目': '跑步', '运动时长': 30, '睡眠时长': 7.5, '睡眠质量': 4, '心路历程': '基准测试'}
+
+def _scratch_copy(path, directory):
+    """把数据文件复制到 directory 下（同名），返回副本路径"""
+    os.makedirs(directory, exist_ok=True)
+    return shutil.copy(path, directory)
+
+def run_size(size, storage, repeat, budget, notes_length):
+    """在当前进程里跑一个数据规模的全部基准"""
+    import numpy as np
+
+    from benchmarks.generate import dataset_dates, write_dataset
+
+    work_dir = tempfile.mkdtemp(prefix=f'fitness-bench-{size}-')
+    csv_path, json_path = write_dataset(work_dir, records=size, notes_length=notes_length)
+    recent_days = np.datetime_as_string(dataset_dates(size)[-28:], unit='D').tolist()
+    os.environ['FITNESS_DATA_DIR'] = os.path.join(work_dir, 'data')
+    os.environ['FITNESS_STORAGE'] = storage
+    sys.path.insert(0, BACKEND)
+    os.chdir(work_dir)
+
+    results = []
+
+    def bench(name, func, **kwargs):
+        result = measure(func, repeat=kwargs.pop('repeat', repeat), budget=budget, **kwargs)
+        result.update(size=size, name=name)
+        results.append(result)
+        print(f"  {name:<45} median {result['median'] * 1000:10.2f} ms  ({result['runs']} 次)", file=sys.stderr)
+
+    # my_app.py 的数据路径（load_data 和表单保存都是 RecordStore 的薄封装）
+    from backend.schema import CSV_SCHEMA
+    from health_report import get_local_health_analysis
+    from record_store import RecordStore
+
+    bench('my_app.load_data', lambda: RecordStore(csv_path, schema=CSV_SCHEMA).to_frame())
+    store = RecordStore(csv_path, schema=CSV_SCHEMA)
+    frame = store.to_frame()
+    bench('my_app.get_local_health_analysis', lambda: get_local_health_analysis(frame))
+    scratch_store = RecordStore(_scratch_copy(csv_path, os.path.join(work_dir, 'scratch')), schema=CSV_SCHEMA)
+    days = itertools.cycle(recent_days)
+    bench('my_app.upsert', lambda: scratch_store.upsert(_new_csv_record(next(days))))
+
+    # backend FitnessData
+    from models import FitnessData, create_storage
+    bench('FitnessData open + get_all_data (cold)', lambda: FitnessData().get_all_data(), repeat=min(repeat, 3))
+    fitness_data = FitnessData()
+    fitness_data.get_all_data()
+    bench('FitnessData.get_all_data (warm)', fitness_data.get_all_data)
+    bench('FitnessData.get_recent_analysis', fitness_data.get_recent_analysis)
+    scratch_data = FitnessData(create_storage(storage, os.path.dirname(_scratch_copy(json_path, os.path.join(work_dir, 'scratch', 'data')))))
+    scratch_data.get_all_data()
+    json_days = itertools.cycle(recent_days)
+    bench('FitnessData.add_record', lambda: scratch_data.add_record(_new_json_record(next(json_days))))
+
+    # Flask 接口（测试客户端，不经过网络）
+    import app as app_module
+    client = app_module.app.test_client()
+    client.get('/api/health/tips')
+
+    endpoints = [
+        '/api/health/records',
+        '/api/health/records?limit=100',
+        '/api/health/analysis',
+        '/api/health/stats',
+        '/api/health/analysis/per_run',
+        '/api/health/analysis/per_run/1',
+        '/api/health/tips',
+    ]
+    for url in endpoints:
+        def get(url=url):
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+        # 第一次请求可能需要加载数据/填充缓存，单独记录
+        bench(f'GET {url} (first)', get, repeat=1)
+        bench(f'GET {url}', get)
+    # 写入发往单独的用户分区，分区数据是生成数据的副本
+    _scratch_copy(json_path, app_module.user_data.partition_dir('bench-writes'))
+    headers = {'X-User-Id': 'bench-writes'}
+    post_days = itertools.cycle(recent_days)
+    bench('POST /api/health/records', lambda: client.post(
+        '/api/health/records', json=_new_json_record(next(post_days)), headers=headers))
+    bench('POST /api/health/records/bulk (100)', lambda: client.post(
+        '/api/health/records/bulk', json=[_new_json_record(next(post_days)) for _ in range(100)], headers=headers))
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='运行性能基准测试')
+    parser.add_argument('--sizes', default='1000,100000', help='数据规模（记录条数），逗号分隔，如 1000,100000,1000000')
+    parser.add_argument('--storage', default='json', help='backend 存储后端（json / log / sqlite / parquet）')
+    parser.add_argument('--repeat', type=int, default=5, help='每项最多重复次数')
+    parser.add_argument('--budget', type=float, default=10.0, help='每项累计耗时上限（秒）')
+    parser.add_argument('--notes-length', type=int, default=20)
+    parser.add_argument('--out', default='benchmark_results.json', help='结果 JSON 路径')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        results = run_size(args.child, args.storage, args.repeat, args.budget, args.notes_length)
+        json.dump(results, sys.stdout)
+        return
+
+    import pandas as pd
+
+    results = []
+    for size in [int(value) for value in args.sizes.split(',')]:
+        print(f"数据规模 {size}:", file=sys.stderr)
+        output = subprocess.check_output(
+            [sys.executable, '-m', 'benchmarks.run', '--child', str(size), '--storage', args.storage,
+             '--repeat', str(args.repeat), '--budget', str(args.budget), '--notes-length', str(args.notes_length)],
+            cwd=ROOT, env={**os.environ, 'PYTHONPATH': ROOT}, text=True
+        )
+        results.extend(json.loads(output))
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "storage": args.storage,
+        },
+        "results": results,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.out}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# importer.py - 分块流式导入 CSV（手表导出的多年数据也能在有限内存内完成）
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from backend.schema import INVALID_QUALITY_MESSAGE, invalid_quality, normalize_quality
+from record_store import DATE_COLUMN, normalize_dates
+
+REQUIRED_COLUMNS = ['日期', '运动项目', '运动时长(分钟)', '睡眠时长(小时)', '睡眠质量']
+DEFAULT_CHUNKSIZE = 50_000
+PREVIEW_ROWS = 200
+
+# 拒绝原因：每行只记录第一个不满足的规则
+REJECT_REASONS = {
+    'invalid_date': '日期无法识别',
+    'missing_sport': '运动项目为空',
+    'invalid_duration': '运动时长不是有效数字',
+    'negative_duration': '运动时长为负数',
+    'invalid_sleep': '睡眠时长不是有效数字或为负数',
+    'invalid_quality': INVALID_QUALITY_MESSAGE,
+}
+
+
+class ImportResult:
+    """一次导入的统计结果"""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.inserted = 0
+        self.replaced = 0
+        self.skipped = 0
+        self.rejected = Counter()
+
+    @property
+    def rejected_rows(self):
+        return sum(self.rejected.values())
+
+    def summary(self):
+        text = f"共读取 {self.total_rows} 行：新增 {self.inserted}，覆盖 {self.replaced}，跳过 {self.skipped}，拒绝 {self.rejected_rows}"
+        if self.rejected:
+            details = '，'.join(f"{REJECT_REASONS[reason]} {count} 行" for reason, count in self.rejected.items())
+            text += f"（{details}）"
+        return text
+
+
+def preview_csv(source, rows=PREVIEW_ROWS):
+    """只读取前几行用于预览，不加载整个文件"""
+    frame = pd.read_csv(source, nrows=rows)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return frame
+
+
+def validate_chunk(chunk):
+    """
+    向量化校验并转换一块数据，返回 (合法行, 各拒绝原因计数)。
+    睡眠质量超过5分的按百分制换算（backend.schema.normalize_quality）。
+    """
+    chunk = chunk.rename(columns=lambda column: str(column).strip())
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"缺少必填列: {', '.join(missing)}")
+
+    dates = normalize_dates(chunk[DATE_COLUMN])
+    sports = chunk['运动项目'].astype('string').str.strip()
+    duration = pd.to_numeric(chunk['运动时长(分钟)'], errors='coerce')
+    sleep = pd.to_numeric(chunk['睡眠时长(小时)'], errors='coerce')
+    quality = normalize_quality(chunk['睡眠质量'])
+
+    checks = [
+        ('invalid_date', dates.isna()),
+        ('missing_sport', sports.isna() | (sports == '')),
+        ('invalid_duration', duration.isna()),
+        ('negative_duration', duration < 0),
+        ('invalid_sleep', sleep.isna() | (sleep < 0)),
+        ('invalid_quality', invalid_quality(chunk['睡眠质量'])),
+    ]
+    masks = [mask.fillna(True).to_numpy(dtype=bool) for _, mask in checks]
+    reasons = np.select(masks, [reason for reason, _ in checks], default='')
+    valid = reasons == ''
+
+    rejected = Counter(reasons[~valid].tolist())
+    cleaned = chunk.loc[valid].copy()
+    cleaned[DATE_COLUMN] = dates[valid]
+    cleaned['运动项目'] = sports[valid].astype(object)
+    cleaned['运动时长(分钟)'] = duration[valid]
+    cleaned['睡眠时长(小时)'] = sleep[valid]
+    cleaned['睡眠质量'] = quality[valid]
+    return cleaned, rejected
+
+
+def import_csv(source, store, policy='replace', chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    """
+    分块读取 source（路径或文件对象），逐块校验后按日期合并进 store。
+    每块合并后立即追加写入文件，未落盘的数据不超过一块；全部完成后压缩一次，
+    去掉被覆盖的旧行。progress(已处理比例或None, ImportResult) 每块调用一次。
+    """
+    result = ImportResult()
+    total_size = getattr(source, 'size', None)
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        result.total_rows += len(chunk)
+        cleaned, rejected = validate_chunk(chunk)
+        result.rejected.update(rejected)
+        # 同一块内的重复日期先去重，与合并进 store 时一样：replace 以后出现的为准并计为覆盖，keep 保留先出现的并计为跳过
+        deduplicated = cleaned.drop_duplicates(subset=DATE_COLUMN, keep='last' if policy == 'replace' else 'first')
+        duplicates = len(cleaned) - len(deduplicated)
+        inserted, replaced, skipped = store.merge(deduplicated, policy=policy, normalized=True)
+        result.inserted += inserted
+        result.replaced += replaced + (duplicates if policy == 'replace' else 0)
+        result.skipped += skipped + (duplicates if policy != 'replace' else 0)
+        if progress:
+            fraction = min(source.tell() / total_size, 1.0) if total_size and hasattr(source, 'tell') else None
+            progress(fraction, result)
+    store.compact()
+    return result
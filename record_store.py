@@ -0,0 +1,229 @@
+# record_store.py - 按日期索引的记录存储（my_app.py 使用）
+import csv
+import math
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from backend.schema import coerce_frame, is_columnar, read_columnar, write_columnar
+
+DATE_COLUMN = '日期'
+DEFAULT_COLUMNS = ['日期', '运动项目', '运动时长(分钟)', '睡眠时长(小时)', '睡眠质量', '心路历程']
+
+def normalize_dates(series):
+    """2025.10.26 / 2025-10-26 / 2025/10/26 统一成 2025-10-26，无法识别或不存在的日期记为 NaN"""
+    text = (
+        series.astype(str).str.strip()
+        .str.replace(r'[T\s].*$', '', regex=True)
+        .str.replace(r'[./]', '-', regex=True)
+    )
+    dates = pd.to_datetime(text, format='%Y-%m-%d', errors='coerce')
+    return dates.dt.strftime('%Y-%m-%d').astype(object).where(dates.notna(), np.nan)
+
+def _date_keys(values):
+    """记录的日期键：normalize_dates 的结果，无法识别的日期保留原文"""
+    values = pd.Series(values, dtype=object)
+    return normalize_dates(values).fillna(values.astype(str).str.strip()).tolist()
+
+def normalize_date(value):
+    """单个日期的 normalize_dates，无法识别的原样返回"""
+    return _date_keys([value])[0]
+
+def _frame_date_keys(data):
+    if DATE_COLUMN not in data.columns:
+        return [''] * len(data)
+    return _date_keys(data[DATE_COLUMN])
+
+class RecordStore:
+    """
+    以规范化日期为键保存记录，同一天的记录直接覆盖（upsert）。
+    保存时只在 CSV 末尾追加一行，重复日期的旧行在读取时被后写入的覆盖；
+    追加次数达到 compact_every 后，用临时文件+重命名原子地重写一次文件。
+    path 以 .parquet / .arrow 结尾时使用列式文件，每次保存都原子地整体重写。
+    给定 schema 时 to_frame() 返回按 schema 转换好类型的数据。
+    """
+
+    def __init__(self, path, compact_every=200, schema=None):
+        self.path = path
+        self.compact_every = compact_every
+        self.schema = schema
+        self.columnar = is_columnar(path)
+        self.version = 0
+        self._lock = threading.RLock()
+        self._rows = {}
+        self._columns = list(DEFAULT_COLUMNS)
+        self._appended = 0
+        self._stat = None
+        self._frame = None
+        self._load()
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self):
+        """读取全部记录，同一日期以最后出现的一行为准；文件无法解析时直接抛出异常"""
+        self._rows = {}
+        self._columns = list(DEFAULT_COLUMNS)
+        self._appended = 0
+        if os.path.exists(self.path):
+            data = read_columnar(self.path) if self.columnar else pd.read_csv(self.path)
+            data.columns = [str(column).strip() for column in data.columns]
+            self._columns = list(data.columns)
+            if DATE_COLUMN not in self._columns:
+                self._columns.insert(0, DATE_COLUMN)
+            for key, row in zip(_frame_date_keys(data), data.to_dict('records')):
+                if key in self._rows:
+                    # 文件里有被覆盖的旧行，下次压缩时清理
+                    del self._rows[key]
+                    self._appended += 1
+                self._rows[key] = row
+        self._stat = self._file_stat()
+        self._touch()
+
+    def _touch(self):
+        self.version += 1
+        self._frame = None
+
+    def _sync(self):
+        """文件被外部修改（大小或修改时间变化）时重新读取"""
+        if self._file_stat() != self._stat:
+            self._load()
+
+    def to_frame(self):
+        """以 DataFrame 形式返回全部记录（按版本缓存，调用方不要修改）"""
+        with self._lock:
+            self._sync()
+            if self._frame is None:
+                frame = pd.DataFrame(list(self._rows.values()), columns=self._columns)
+                self._frame = coerce_frame(frame, self.schema) if self.schema else frame
+            return self._frame
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._rows)
+
+    def upsert(self, record):
+        """
+        按日期新增或覆盖一条记录，返回 True 表示覆盖了已有日期。
+        新记录的日期写成规范化格式。
+        """
+        with self._lock:
+            self._sync()
+            key = normalize_date(record.get(DATE_COLUMN, ''))
+            row = dict(record)
+            row[DATE_COLUMN] = key
+            replaced = self._rows.pop(key, None) is not None
+            self._rows[key] = row
+
+            new_columns = [column for column in row if column not in self._columns]
+            if new_columns or self.columnar or not os.path.exists(self.path):
+                self._columns.extend(new_columns)
+                self.compact()
+            else:
+                self._append_rows([row])
+                if replaced:
+                    self._appended += 1
+                if self._appended >= self.compact_every:
+                    self.compact()
+            self._touch()
+            return replaced
+
+    def merge(self, data, policy='replace', write=True, normalized=False):
+        """
+        按日期把一批记录合并进来，返回 (新增数, 覆盖数, 跳过数)。
+        policy='replace' 时导入的数据覆盖同日期的已有记录，'keep' 时保留已有记录。
+        与 upsert 一样只把合并进来的行追加到文件末尾（有新列或列式文件时整体重写），
+        write=False 只更新内存；normalized=True 表示日期列已经是规范化格式（如 normalize_dates 的结果）。
+        """
+        if policy not in ('replace', 'keep'):
+            raise ValueError(f"未知的冲突处理方式: {policy}")
+        inserted = replaced = skipped = 0
+        merged = []
+        with self._lock:
+            self._sync()
+            new_columns = [column for column in data.columns if column not in self._columns]
+            self._columns.extend(new_columns)
+            keys = data[DATE_COLUMN].tolist() if normalized else _frame_date_keys(data)
+            for key, row in zip(keys, data.to_dict('records')):
+                if key in self._rows:
+                    if policy == 'keep':
+                        skipped += 1
+                        continue
+                    del self._rows[key]
+                    replaced += 1
+                else:
+                    inserted += 1
+                row[DATE_COLUMN] = key
+                self._rows[key] = row
+                merged.append(row)
+            if write and (new_columns or self.columnar or not os.path.exists(self.path)):
+                self.compact()
+            elif write and merged:
+                self._append_rows(merged)
+                self._appended += replaced
+                if self._appended >= self.compact_every:
+                    self.compact()
+            self._touch()
+        return inserted, replaced, skipped
+
+    def clear(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._load()
+
+    def _append_rows(self, rows):
+        needs_newline = False
+        if os.path.getsize(self.path) > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            if needs_newline:
+                f.write('\r\n')
+            writer = csv.writer(f)
+            for row in rows:
+                writer.writerow([_cell(row.get(column)) for column in self._columns])
+        self._stat = self._file_stat()
+
+    def compact(self):
+        """只写入当前有效记录：先写临时文件，再原子替换原文件"""
+        with self._lock:
+            if self.columnar:
+                frame = pd.DataFrame(list(self._rows.values()), columns=self._columns)
+                write_columnar(coerce_frame(frame, self.schema or {}), self.path)
+                self._appended = 0
+                self._stat = self._file_stat()
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(self._columns)
+                    for row in self._rows.values():
+                        writer.writerow([_cell(row.get(column)) for column in self._columns])
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._appended = 0
+            self._stat = self._file_stat()
+
+
+def _cell(value):
+    """缺失值写成空单元格，和 to_csv 的行为一致"""
+    if value is None or value is pd.NaT or value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    return value
@@ -0,0 +1,14 @@
+"""
+在仓库根目录运行：python -m pytest -q
+
+backend 里的模块互相用平铺的方式导入（from storage import ...），所以把 backend 目录加进 sys.path；
+导入 app 会在数据目录下建文件，这里先把 FITNESS_DATA_DIR 指到临时目录。
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('FITNESS_DATA_DIR', tempfile.mkdtemp(prefix='fitness-test-'))
@@ -0,0 +1,83 @@
+import random
+
+import pandas as pd
+import pytest
+
+from aggregates import RunningAggregates
+from models import FitnessData, create_storage
+
+def _baseline_stats(data):
+    """改为增量汇总之前 get_recent_analysis 用 pandas 计算的汇总值（运动项目的 None 和缺少字段算同一个取值）"""
+    df = pd.DataFrame(data)
+    stats = {"total_records": len(data), "avg_duration": None, "active_days": 0, "sport_variety": 0,
+             "avg_sleep": None, "avg_quality": None}
+    if '运动时长' in df.columns:
+        stats['avg_duration'] = df['运动时长'].mean()
+        stats['active_days'] = len(df[df['运动时长'] > 0])
+        stats['sport_variety'] = df['运动项目'].fillna('').nunique() if '运动项目' in df.columns else 0
+    if '睡眠时长' in df.columns:
+        stats['avg_sleep'] = df['睡眠时长'].mean()
+        stats['avg_quality'] = df['睡眠质量'].mean() if '睡眠质量' in df.columns else 0
+    return stats
+
+def _random_records(rng):
+    records = []
+    for _ in range(rng.choice([rng.randint(1, 4), rng.randint(1, 300)])):
+        record = {'日期': '2025-01-%02d' % rng.randint(1, 28)}
+        if rng.random() < 0.9:
+            record['运动时长'] = rng.choice([None, 0, rng.randint(0, 120), round(rng.uniform(0, 120), rng.choice([1, 2]))])
+        if rng.random() < 0.9:
+            record['睡眠时长'] = rng.choice([None, round(rng.uniform(4, 10), rng.choice([1, 2])), rng.choice([6.05, 7.25, 7.35])])
+        if rng.random() < 0.8:
+            record['睡眠质量'] = rng.randint(1, 5)
+        if rng.random() < 0.8:
+            record['运动项目'] = rng.choice([None, '跑步', '游泳', '骑行'])
+        records.append(record)
+    return records
+
+def _same(left, right):
+    if isinstance(left, dict):
+        return left.keys() == right.keys() and all(_same(left[key], right[key]) for key in left)
+    if isinstance(left, float) and isinstance(right, float):
+        # 逐条累加与 pandas 的两两求和只在最后几位可能不同
+        return left == pytest.approx(right, nan_ok=True)
+    return left == right
+
+def test_snapshot_matches_pandas_baseline():
+    rng = random.Random(20251101)
+    for _ in range(500):
+        records = _random_records(rng)
+        snapshot = RunningAggregates.from_records(records).snapshot()
+        assert _same(snapshot, _baseline_stats(records)), records
+
+@pytest.mark.parametrize('sports, expected', [
+    (['跑步', None], 2),
+    (['跑步', ...], 2),
+    (['跑步', None, ...], 2),
+    ([None, None], 1),
+    ([None, ...], 1),
+    ([..., ...], 0),
+])
+def test_sport_variety_none_and_missing(sports, expected):
+    # ... 表示记录里没有 运动项目 字段
+    records = [{'运动时长': 30} if sport is ... else {'运动时长': 30, '运动项目': sport} for sport in sports]
+    assert RunningAggregates.from_records(records).snapshot()['sport_variety'] == expected
+
+def test_incremental_add_matches_rebuild():
+    rng = random.Random(7)
+    records = _random_records(rng)
+    aggregates = RunningAggregates.from_records(records[:10])
+    aggregates.snapshot()
+    for record in records[10:]:
+        aggregates.add(record)
+    assert _same(aggregates.snapshot(), RunningAggregates.from_records(records).snapshot())
+
+@pytest.mark.parametrize('kind', ['json', 'log', 'sqlite', 'parquet'])
+def test_window_active_days_counts_distinct_dates(tmp_path, kind):
+    data = FitnessData(create_storage(kind, str(tmp_path)))
+    data.add_records([{'日期': '2025-11-03', '运动项目': '跑步', '运动时长': 30, '睡眠时长': 7, '睡眠质量': 4} for _ in range(3)])
+    window = data.get_window_stats(7)
+    assert (window['records'], window['active_days']) == (3, 1)
+    assert window['active_days'] == data.get_recent_analysis()['recent']['7d']['active_days']
+    # 全部记录的 active_days 保持原来按记录条数计算的口径
+    assert data.get_aggregates()['active_days'] == 3
@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+from aggregates import RunningAggregates
+from analytics import RollingAnalytics
+from models import FitnessData
+from storage import JsonFileStorage
+
+def _frame(days, start=date(2025, 1, 1)):
+    return pd.DataFrame([
+        {'日期': (start + timedelta(days=offset)).isoformat(), '运动时长': 30 + offset, '睡眠时长': 7.5,
+         '睡眠质量': 4, '运动项目': '跑步', '心路历程': ''}
+        for offset in range(days)
+    ])
+
+def test_summary_windows():
+    summary = RollingAnalytics().summary(_frame(40))
+    assert summary['as_of'] == '2025-02-09'
+    assert summary['7d']['records'] == 7
+    assert summary['7d']['avg_duration'] == 66.0
+    assert summary['28d']['records'] == 28
+    assert summary['week_over_week']['active_days'] == 0
+    assert RollingAnalytics().summary(_frame(40), as_of='2024-12-31') is None
+
+def test_first_day_has_no_week_over_week():
+    summary = RollingAnalytics().summary(_frame(1))
+    assert summary['week_over_week']['active_days'] is None
+
+def test_far_future_date_does_not_grow_calendar():
+    df = pd.concat([_frame(40), pd.DataFrame([{'日期': '9000-01-01', '运动时长': 30}])], ignore_index=True)
+    analytics = RollingAnalytics()
+    _, frame = analytics.compute(df)
+    assert len(frame) == analytics.span
+    assert analytics.summary(df, as_of='2025-02-09') == RollingAnalytics().summary(_frame(40))
+
+def test_forecast_ignores_long_gaps():
+    records = _frame(60).to_dict('records') + [{'日期': '9000-01-01', '运动时长': 30, '睡眠时长': 7}]
+    forecaster = RunningAggregates.from_records(records).forecaster
+    forecast = forecaster.predict(date(2025, 3, 1))
+    assert forecast['duration']['method'] == 'ridge'
+    # 只有最近 28 天内有记录的日子才是样本，几千年的空档不计入
+    assert forecaster.samples['duration'] < 60 + 28
+
+def test_rolling_summary_reads_only_trailing_days(tmp_path, monkeypatch):
+    data = FitnessData(JsonFileStorage(str(tmp_path / 'data.json')))
+    data.add_records(_frame(60).to_dict('records'))
+    full = data.get_dataframe()
+    # 写入之后不应重建全部记录的 DataFrame
+    monkeypatch.setattr(data, 'get_dataframe', lambda: (_ for _ in ()).throw(AssertionError('full rebuild')))
+    data.add_records([{'日期': '2025-03-05', '运动时长': 90, '睡眠时长': 6, '睡眠质量': 3, '运动项目': '游泳'}])
+    full = pd.concat([full, pd.DataFrame([data.get_all_data()[-1]])], ignore_index=True)
+    for as_of in (None, '2025-01-01', '2025-01-20', '2025-03-01', '2025-03-05', '2025-04-30'):
+        assert data.get_rolling_summary(as_of) == RollingAnalytics().summary(full, as_of=as_of)
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import app as app_module
+from models import UserDataRegistry
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, 'user_data', UserDataRegistry(str(tmp_path), max_open=1))
+    return app_module.app.test_client()
+
+def _record(day='2025-11-01'):
+    return {'日期': day, '运动项目': '跑步', '运动时长': 30, '睡眠时长': 7}
+
+def test_cached_stats_fresh_after_partition_eviction(client):
+    headers = {'X-User-Id': 'evicted-user'}
+    client.post('/api/health/records', json=_record(), headers=headers)
+    assert client.get('/api/health/stats', headers=headers).get_json()['total_records'] == 1
+
+    for _ in range(2):
+        # 访问另一个用户让分区被淘汰，重新创建的分区不能沿用旧版本号命中缓存
+        client.get('/api/health/stats', headers={'X-User-Id': 'other-user'})
+        client.post('/api/health/records', json=_record(), headers=headers)
+    assert client.get('/api/health/stats', headers=headers).get_json()['total_records'] == 3
+
+def test_post_drops_cached_responses(client):
+    headers = {'X-User-Id': 'cache-user'}
+    cache = app_module.response_cache
+    cache.clear()
+    client.post('/api/health/records', json=_record(), headers=headers)
+    for path in ('/api/health/stats', '/api/health/analysis', '/api/health/rollups'):
+        client.get(path, headers=headers)
+    client.get('/api/health/stats', headers={'X-User-Id': 'other-cache-user'})
+    assert cache.stats()['entries'] == 4
+    # 写入只删掉该用户的条目，其他用户的缓存不受影响
+    client.post('/api/health/records/bulk', json=[_record('2025-11-02')], headers=headers)
+    assert cache.stats()['entries'] == 1
+    assert client.get('/api/health/stats', headers=headers).get_json()['total_records'] == 2
+
+def test_bulk_ndjson_reports_malformed_line_and_imports_rest(client):
+    body = '\n'.join([json.dumps(_record(), ensure_ascii=False), '{"日期": "2025-11-02", ', '',
+                      json.dumps(_record('2025-11-03'), ensure_ascii=False)])
+    response = client.post('/api/health/records/bulk', data=body.encode(), content_type='application/x-ndjson',
+                           headers={'X-User-Id': 'ndjson-user'})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['saved'] == 2
+    assert result['errors'] == [{'index': 1, 'error': '第2行不是合法的 JSON'}]
+
+def test_single_post_uses_bulk_validation(client):
+    headers = {'X-User-Id': 'single-user'}
+    response = client.post('/api/health/records', json={**_record(), '运动时长': 'abc'}, headers=headers)
+    assert response.status_code == 400
+    assert '运动时长' in response.get_json()['error']
+    assert client.post('/api/health/records', data='oops', headers=headers).status_code == 400
+    assert client.post('/api/health/records', json=_record(), headers=headers).status_code == 200
+
+def test_records_rejects_unparseable_range(client):
+    headers = {'X-User-Id': 'range-user'}
+    client.post('/api/health/records', json=_record('2025.11.2'), headers=headers)
+    assert client.get('/api/health/records?from=garbage', headers=headers).status_code == 400
+    assert client.get('/api/health/records?to=2025-13-01', headers=headers).status_code == 400
+    data = client.get('/api/health/records?from=2025-11-02&to=2025.11.2', headers=headers).get_json()['data']
+    assert [record['日期'] for record in data] == ['2025.11.2']
+
+def test_summary_cache_kept_in_user_partition(client, tmp_path):
+    headers = {'X-User-Id': 'summary-user'}
+    client.post('/api/health/records', json=_record(), headers=headers)
+    job = client.post('/api/health/analysis/per_run/jobs', json={}, headers=headers).get_json()
+    status = client.get(f"/api/health/analysis/per_run/jobs/{job['job_id']}?wait=5", headers=headers).get_json()
+    assert status['status'] == 'done' and status['completed'] == 1
+    assert (tmp_path / 'users' / 'summary-user' / 'summary_cache.db').exists()
+    assert not (tmp_path / 'summary_cache.db').exists()
+    # 其他用户的分区里没有这个任务
+    assert client.get(f"/api/health/analysis/per_run/jobs/{job['job_id']}", headers={'X-User-Id': 'other-user'}).status_code == 404
+
+def test_workouts_list_parses_range(client):
+    headers = {'X-User-Id': 'workout-user'}
+    csv = b'time,heart_rate\n2025-11-01T12:00:00Z,120\n2025-11-01T12:30:00Z,150\n'
+    meta = client.post('/api/health/workouts?format=csv', data=csv, headers=headers).get_json()['workout']
+    day = meta['date']
+    assert client.get(f'/api/health/workouts?from={day}&to={day}', headers=headers).get_json()['count'] == 1
+    assert client.get(f"/api/health/workouts?from={meta['start_ts'] + 1}", headers=headers).get_json()['count'] == 0
+    assert client.get('/api/health/workouts?from=garbage', headers=headers).status_code == 400
+    assert client.get('/api/health/workouts?to=2025-13-01', headers=headers).status_code == 400
@@ -0,0 +1,65 @@
+import json
+import os
+
+from batch_report import run_batch
+
+CSV = '日期,运动项目,运动时长(分钟),睡眠时长(小时),睡眠质量\n2025-11-01,跑步,30,7.5,4\n2025-11-02,游泳,45,8,5\n'
+
+def test_duplicate_user_files_fail_without_overwriting(tmp_path):
+    inputs = tmp_path / 'in'
+    inputs.mkdir()
+    (inputs / 'alice.csv').write_text(CSV, encoding='utf-8')
+    (inputs / 'Alice.json').write_text(json.dumps([{'日期': '2025-11-01', '运动时长': 20}]), encoding='utf-8')
+    (inputs / 'bob.csv').write_text(CSV, encoding='utf-8')
+
+    files = run_batch(str(inputs), str(tmp_path / 'out'), workers=1)
+    assert files['bob.csv']['status'] == 'generated'
+    assert files['alice.csv']['status'] == files['Alice.json']['status'] == 'failed'
+    assert 'alice.csv' in files['Alice.json']['error']
+    assert sorted(os.listdir(tmp_path / 'out')) == ['bob.md', 'manifest.json']
+
+def _inputs(tmp_path, count=1):
+    inputs = tmp_path / 'in'
+    inputs.mkdir()
+    for index in range(count):
+        (inputs / f'user{index}.csv').write_text(CSV, encoding='utf-8')
+    return inputs
+
+def test_unchanged_file_skipped_and_changed_file_regenerated(tmp_path):
+    inputs = _inputs(tmp_path)
+    out = str(tmp_path / 'out')
+    first = run_batch(str(inputs), out, workers=1)['user0.csv']
+    assert first['status'] == 'generated'
+
+    again = run_batch(str(inputs), out, workers=1)['user0.csv']
+    assert again['status'] == 'skipped'
+    assert again['sha256'] == first['sha256']
+
+    (inputs / 'user0.csv').write_text(CSV + '2025-11-03,骑行,60,7,3\n', encoding='utf-8')
+    changed = run_batch(str(inputs), out, workers=1)['user0.csv']
+    assert (changed['status'], changed['records']) == ('generated', 3)
+    assert changed['sha256'] != first['sha256']
+    assert '2025-11-03' in (tmp_path / 'out' / 'user0.md').read_text(encoding='utf-8')
+
+def test_json_input_and_json_report(tmp_path):
+    inputs = tmp_path / 'in'
+    inputs.mkdir()
+    records = [{'日期': '2025-11-0%d' % day, '运动项目': '跑步', '运动时长': 30, '睡眠时长': 7.5, '睡眠质量': 4} for day in (1, 2, 3)]
+    (inputs / 'carol.json').write_text(json.dumps({'data': records}, ensure_ascii=False), encoding='utf-8')
+
+    entry = run_batch(str(inputs), str(tmp_path / 'out'), fmt='json', workers=1)['carol.json']
+    assert (entry['status'], entry['report']) == ('generated', 'carol.json')
+    report = json.loads((tmp_path / 'out' / 'carol.json').read_text(encoding='utf-8'))
+    assert (report['user'], report['records']) == ('carol', 3)
+    assert (report['first_date'], report['last_date']) == ('2025-11-01', '2025-11-03')
+    # 2025-11-03 是周一，三条记录分在两周
+    assert [week['total_duration'] for week in report['weekly']] == [60, 30]
+
+def test_process_pool_generates_every_report(tmp_path):
+    inputs = _inputs(tmp_path, count=5)
+    progress = []
+    files = run_batch(str(inputs), str(tmp_path / 'out'), workers=2, chunk_size=2,
+                      progress=lambda done, total: progress.append((done, total)))
+    assert [entry['status'] for entry in files.values()] == ['generated'] * 5
+    assert progress[-1] == (5, 5)
+    assert sorted(os.listdir(tmp_path / 'out')) == ['manifest.json'] + [f'user{index}.md' for index in range(5)]
@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from benchmarks.generate import dataset_dates, generate_frame
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_generated_dates_stay_in_pandas_range():
+    dates = dataset_dates(1_000_000)
+    assert str(dates.min()) == '2000-01-01'
+    assert pd.Timestamp(dates.max()) <= pd.Timestamp.max
+    frame = generate_frame(records=100, notes_length=0)
+    assert pd.to_datetime(frame['日期']).notna().all()
+
+def _run_module(module, *args):
+    return subprocess.run([sys.executable, '-m', module, *args], cwd=ROOT, env={**os.environ, 'PYTHONPATH': ROOT},
+                          capture_output=True, text=True)
+
+def test_run_and_compare_on_tiny_dataset(tmp_path):
+    out = str(tmp_path / 'new.json')
+    finished = _run_module('benchmarks.run', '--sizes', '30', '--repeat', '1', '--budget', '0.1',
+                           '--notes-length', '2', '--out', out)
+    assert finished.returncode == 0, finished.stderr
+    with open(out, encoding='utf-8') as f:
+        report = json.load(f)
+    assert {'commit', 'python', 'pandas', 'storage'} <= report['meta'].keys()
+    results = report['results']
+    assert {'my_app.load_data', 'FitnessData.add_record', 'GET /api/health/analysis'} <= {item['name'] for item in results}
+    assert all(item.keys() == {'size', 'name', 'runs', 'min', 'median', 'mean'} and item['size'] == 30 for item in results)
+
+    assert _run_module('benchmarks.compare', out, out).returncode == 0
+    slower = str(tmp_path / 'slower.json')
+    with open(slower, 'w', encoding='utf-8') as f:
+        json.dump({**report, 'results': [{**item, 'median': item['median'] * 2 + 1} for item in results]}, f)
+    compared = _run_module('benchmarks.compare', out, slower)
+    assert compared.returncode == 1
+    assert '⚠️' in compared.stdout
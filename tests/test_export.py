@@ -0,0 +1,67 @@
+import gzip
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import app as app_module
+from models import UserDataRegistry
+
+NOTES = ['普通的一天', '有逗号, 和 "引号"', '第一行\n第二行', '']
+
+@pytest.fixture(params=['json', 'log', 'sqlite'])
+def client(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, 'user_data', UserDataRegistry(str(tmp_path), kind=request.param))
+    client = app_module.app.test_client()
+    records = [
+        {'日期': f'2025-11-{day:02d}', '运动项目': '跑步', '运动时长': 30 + day, '睡眠时长': 7.5, '睡眠质量': 4,
+         '心路历程': NOTES[day % len(NOTES)]}
+        for day in range(1, 11)
+    ]
+    assert client.post('/api/health/records/bulk', json=records).status_code == 200
+    return client
+
+def _stored(client):
+    return app_module.user_data.get(None).get_all_data()
+
+def _export(client, query, gzipped=False):
+    headers = {'Accept-Encoding': 'gzip'} if gzipped else {'Accept-Encoding': 'identity'}
+    response = client.get(f'/api/health/export?{query}', headers=headers)
+    assert response.status_code == 200
+    body = response.get_data()
+    assert (response.headers.get('Content-Encoding') == 'gzip') == gzipped
+    return gzip.decompress(body) if gzipped else body
+
+@pytest.mark.parametrize('gzipped', [False, True])
+def test_ndjson_round_trip(client, gzipped):
+    body = _export(client, 'format=ndjson', gzipped)
+    assert [json.loads(line) for line in body.decode('utf-8').splitlines()] == _stored(client)
+
+@pytest.mark.parametrize('gzipped', [False, True])
+def test_csv_round_trip(client, gzipped):
+    body = _export(client, 'format=csv', gzipped)
+    assert body.startswith(b'\xef\xbb\xbf')
+    frame = pd.read_csv(io.BytesIO(body), encoding='utf-8-sig', keep_default_na=False)
+    stored = _stored(client)
+    assert frame['id'].tolist() == [record['id'] for record in stored]
+    assert frame['心路历程'].tolist() == [record['心路历程'] for record in stored]
+    assert frame['运动时长'].tolist() == [record['运动时长'] for record in stored]
+    assert frame['日期'].tolist() == [record['日期'] for record in stored]
+
+def test_parquet_round_trip(client):
+    pytest.importorskip('pyarrow')
+    response = client.get('/api/health/export?format=parquet', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers.get('Content-Encoding') is None
+    frame = pd.read_parquet(io.BytesIO(response.get_data()))
+    stored = _stored(client)
+    assert frame['id'].tolist() == [record['id'] for record in stored]
+    assert frame['心路历程'].tolist() == [record['心路历程'] for record in stored]
+    assert frame['运动时长'].tolist() == [record['运动时长'] for record in stored]
+    assert frame['日期'].dt.strftime('%Y-%m-%d').tolist() == [record['日期'] for record in stored]
+
+def test_date_range_and_bad_format(client):
+    body = _export(client, 'format=ndjson&from=2025-11-03&to=2025.11.05')
+    assert [json.loads(line)['日期'] for line in body.decode('utf-8').splitlines()] == ['2025-11-03', '2025-11-04', '2025-11-05']
+    assert client.get('/api/health/export?format=xml').status_code == 400
+    assert client.get('/api/health/export?from=昨天').status_code == 400
@@ -0,0 +1,101 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from aggregates import RunningAggregates
+from forecast import RIDGE_ALPHA
+from models import FitnessData
+from storage import JsonFileStorage
+
+def _random_records(rng, days=150, start=date(2025, 1, 1)):
+    records = []
+    for offset in range(days):
+        # 中间留一段 40 天的空档
+        if 60 <= offset < 100 or rng.random() < 0.2:
+            continue
+        for _ in range(rng.choice([1, 1, 2])):
+            record = {'日期': (start + timedelta(days=offset)).isoformat(), '运动时长': rng.choice([0, rng.randint(10, 90)])}
+            if rng.random() < 0.8:
+                record['睡眠时长'] = round(rng.uniform(5, 9), 1)
+            records.append(record)
+    return records
+
+def _offline_fit(records):
+    """不用增量统计量，按整个日历用 pandas 重新计算特征并求解岭回归"""
+    df = pd.DataFrame(records)
+    df['day'] = pd.to_datetime(df['日期'])
+    daily = pd.DataFrame({
+        'duration': df.groupby('day')['运动时长'].sum(),
+        'active': df.groupby('day')['运动时长'].apply(lambda minutes: float((minutes > 0).any())),
+        'sleep_sum': df.groupby('day')['睡眠时长'].sum(),
+        'sleep_count': df.groupby('day')['睡眠时长'].count(),
+    })
+    first, last = daily.index.min(), daily.index.max()
+    calendar = pd.date_range(first - pd.Timedelta(days=27), last + pd.Timedelta(days=7))
+    values = daily.reindex(calendar, fill_value=0.0)
+    week, month = values.rolling(7, min_periods=1).sum(), values.rolling(28, min_periods=1).sum()
+    following = values[::-1].rolling(7, min_periods=1).sum()[::-1].shift(-1)
+    history = np.minimum((calendar - first).days + 1, 28)
+    frame = pd.DataFrame({
+        'duration_7d': week['duration'],
+        'weekly_duration_28d': month['duration'] / np.maximum(history, 1) * 7,
+        'active_days_7d': week['active'],
+        'sleep_7d': week['sleep_sum'] / week['sleep_count'],
+        'sleep_28d': month['sleep_sum'] / month['sleep_count'],
+        'next_duration': following['duration'],
+        'next_sleep': following['sleep_sum'] / following['sleep_count'],
+    }, index=calendar)
+    # 样本：满一周历史、之后 7 天都已过去、最近 28 天内有记录
+    recent = daily.reindex(calendar).notna().any(axis=1).astype(float).rolling(28, min_periods=1).sum() > 0
+    samples = frame[(calendar >= first + pd.Timedelta(days=6)) & (calendar <= last - pd.Timedelta(days=8)) & recent]
+    ones = np.ones(len(samples))
+    designs = {
+        'duration': (np.column_stack([ones, samples['duration_7d'], samples['weekly_duration_28d'], samples['active_days_7d']]),
+                     samples['next_duration'] - samples['duration_7d']),
+        'sleep': (np.column_stack([ones, samples['sleep_7d'], samples['sleep_28d'], samples['duration_7d'] / 60]),
+                  samples['next_sleep'] - samples['sleep_7d']),
+    }
+    coefficients = {}
+    for target, (X, y) in designs.items():
+        y = y.to_numpy()
+        valid = np.isfinite(X).all(axis=1) & np.isfinite(y)
+        X, y = X[valid], y[valid]
+        variance = X.var(axis=0)
+        coefficients[target] = np.linalg.solve(X.T @ X + np.diag(RIDGE_ALPHA * variance), X.T @ y)
+    return coefficients, frame.loc[last]
+
+def test_coefficients_match_offline_refit():
+    records = _random_records(random.Random(21))
+    forecaster = RunningAggregates.from_records(records).forecaster
+    expected, latest = _offline_fit(records)
+    for target in ('duration', 'sleep'):
+        np.testing.assert_allclose(forecaster.coefficients(target), expected[target], rtol=1e-6, atol=1e-9)
+    x = np.array([1, latest['duration_7d'], latest['weekly_duration_28d'], latest['active_days_7d']])
+    forecast = forecaster.predict()
+    assert forecast['duration']['method'] == 'ridge'
+    assert forecast['duration']['predicted'] == round(max(latest['duration_7d'] + x @ expected['duration'], 0), 1)
+
+def test_incremental_updates_match_offline_refit():
+    records = _random_records(random.Random(22))
+    aggregates = RunningAggregates.from_records(records[:40])
+    aggregates.forecaster.predict()
+    # 逐条追加，中途多次预测（增量加入样本），再补录一条较早日期的记录
+    for index, record in enumerate(records[40:]):
+        aggregates.add(record)
+        if index % 17 == 0:
+            aggregates.forecaster.predict()
+    backfill = {'日期': '2025-02-03', '运动时长': 120, '睡眠时长': 6.0}
+    aggregates.add(backfill)
+    expected, _ = _offline_fit(records + [backfill])
+    for target in ('duration', 'sleep'):
+        np.testing.assert_allclose(aggregates.forecaster.coefficients(target), expected[target], rtol=1e-6, atol=1e-9)
+
+def test_fresh_instance_forecasts_from_storage(tmp_path):
+    records = _random_records(random.Random(7))
+    path = str(tmp_path / 'fitness_data.json')
+    FitnessData(JsonFileStorage(path)).add_records(records)
+    # 新打开的实例还没有读取过记录
+    forecast = FitnessData(JsonFileStorage(path)).get_forecast('2025-03-01')
+    assert forecast == RunningAggregates.from_records(records).forecaster.predict(date(2025, 3, 1))
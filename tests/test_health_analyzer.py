@@ -0,0 +1,36 @@
+import math
+import random
+
+from health_analyzer import compute_run_baseline, compute_run_baselines
+
+def _random_records(rng):
+    records = []
+    for record_id in range(rng.randint(1, 60)):
+        record = {'id': record_id, '日期': '2025-%02d-%02d' % (rng.randint(1, 3), rng.randint(1, 28))}
+        if rng.random() < 0.05:
+            record['日期'] = rng.choice([None, '不是日期'])
+        if rng.random() < 0.9:
+            record['运动项目'] = rng.choice([None, '跑步', '游泳', '骑行'])
+        if rng.random() < 0.9:
+            record['运动时长'] = rng.choice([None, 'abc', rng.randint(0, 120), round(rng.uniform(0, 120), 1)])
+        records.append(record)
+    return records
+
+def test_batch_baselines_match_single_record_baseline():
+    rng = random.Random(20251001)
+    for _ in range(20):
+        records = _random_records(rng)
+        baselines = compute_run_baselines(records)
+        assert len(baselines) == len(records)
+        for record, baseline in zip(records, baselines):
+            expected = compute_run_baseline(record, records)
+            assert (math.isnan(baseline) and math.isnan(expected)) or math.isclose(baseline, expected, rel_tol=1e-12), record
+
+def test_same_day_records_are_not_their_own_history():
+    records = [
+        {'日期': '2025-11-01', '运动项目': '跑步', '运动时长': 20},
+        {'日期': '2025-11-02', '运动项目': '跑步', '运动时长': 30},
+        {'日期': '2025-11-02', '运动项目': '跑步', '运动时长': 50},
+        {'日期': '2025-11-30', '运动项目': '跑步', '运动时长': 10},
+    ]
+    assert list(compute_run_baselines(records).fillna(-1)) == [-1, 20.0, 20.0, 40.0]
@@ -0,0 +1,62 @@
+import io
+
+import pandas as pd
+import pytest
+
+from backend.schema import normalize_quality
+from importer import REJECT_REASONS, import_csv, validate_chunk
+from models import validate_records
+from record_store import RecordStore
+
+def _csv(days, duration=30, quality=4):
+    rows = ['日期,运动项目,运动时长(分钟),睡眠时长(小时),睡眠质量']
+    rows += [f'2025-01-{day:02d},跑步,{duration},7.5,{quality}' for day in days]
+    return io.StringIO('\n'.join(rows) + '\n')
+
+def test_import_flushes_each_chunk(tmp_path):
+    path = str(tmp_path / 'my_data.csv')
+    store = RecordStore(path)
+    store.merge(pd.read_csv(_csv([1, 2])))
+    on_disk = []
+    # 每处理完一块，文件里已经有这块的数据，而不是等到全部导入结束
+    import_csv(_csv(range(1, 11), duration=45), store, chunksize=3,
+               progress=lambda fraction, result: on_disk.append(len(RecordStore(path))))
+    assert on_disk == [3, 6, 9, 10]
+    reloaded = RecordStore(path).to_frame()
+    assert len(reloaded) == 10
+    assert (reloaded['运动时长(分钟)'] == 45).all()
+
+def test_import_keep_policy_skips_existing(tmp_path):
+    store = RecordStore(str(tmp_path / 'my_data.csv'))
+    store.merge(pd.read_csv(_csv([1])))
+    result = import_csv(_csv([1, 2], duration=45), store, policy='keep', chunksize=1)
+    assert (result.inserted, result.skipped) == (1, 1)
+    assert RecordStore(store.path).to_frame().set_index('日期')['运动时长(分钟)'].to_dict() == {'2025-01-01': 30, '2025-01-02': 45}
+
+@pytest.mark.parametrize('policy, counts, duration', [('replace', (2, 1, 0), 45), ('keep', (2, 0, 1), 30)])
+def test_duplicate_dates_in_chunk_are_counted(tmp_path, policy, counts, duration):
+    rows = ['日期,运动项目,运动时长(分钟),睡眠时长(小时),睡眠质量',
+            '2025-01-01,跑步,30,7.5,4', '2025.1.1,跑步,45,7.5,4', '2025-01-02,跑步,20,7.5,4']
+    store = RecordStore(str(tmp_path / 'my_data.csv'))
+    result = import_csv(io.StringIO('\n'.join(rows) + '\n'), store, policy=policy)
+    assert (result.inserted, result.replaced, result.skipped) == counts
+    assert result.total_rows == sum(counts) + result.rejected_rows == 3
+    assert store.to_frame().set_index('日期')['运动时长(分钟)'].to_dict()['2025-01-01'] == duration
+
+def test_quality_uses_backend_normalization(tmp_path):
+    store = RecordStore(str(tmp_path / 'my_data.csv'))
+    result = import_csv(_csv([1], quality=4.6), store)
+    assert result.rejected_rows == 0
+    import_csv(_csv([2], quality=87), store)
+    stored = store.to_frame()['睡眠质量'].tolist()
+    assert stored == normalize_quality(pd.Series([4.6, 87])).tolist() == [5, 4]
+
+def test_bulk_api_rejects_the_same_quality_rows():
+    qualities = [4, 4.6, 87, 100, 1, 0, 0.5, -3, 101, 'abc']
+    chunk = pd.DataFrame({'日期': '2025-01-01', '运动项目': '跑步', '运动时长(分钟)': 30, '睡眠时长(小时)': 7.5, '睡眠质量': qualities})
+    cleaned, rejected = validate_chunk(chunk)
+    records = [{'日期': '2025-01-01', '运动项目': '跑步', '运动时长': 30, '睡眠时长': 7.5, '睡眠质量': quality} for quality in qualities]
+    valid, errors = validate_records(records)
+    assert [records.index(record) for record in valid] == cleaned.index.tolist() == [0, 1, 2, 3, 4]
+    assert {error['error'] for error in errors} == {REJECT_REASONS['invalid_quality']}
+    assert rejected == {'invalid_quality': 5}
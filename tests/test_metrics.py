@@ -0,0 +1,69 @@
+import time
+
+import pytest
+from flask import Flask, Response
+
+from metrics import Metrics
+
+@pytest.fixture
+def recorder():
+    metrics = Metrics(buckets=(0.01, 0.1, 1.0))
+    app = Flask(__name__)
+
+    @app.route('/items/<int:item_id>')
+    def get_item(item_id):
+        with metrics.timer('lookup'):
+            pass
+        return {'id': item_id}
+
+    @app.route('/stream')
+    def stream():
+        def rows():
+            yield 'a\n'
+            time.sleep(0.05)
+            yield 'b\n'
+        return Response(rows(), mimetype='text/plain')
+
+    metrics.init_app(app, server_timing=True)
+    return metrics, app.test_client()
+
+def _line(text, prefix):
+    return next(line for line in text.splitlines() if line.startswith(prefix))
+
+def test_render_prometheus_histogram(recorder):
+    metrics, client = recorder
+    for item_id in (1, 2):
+        client.get(f'/items/{item_id}')
+    text = metrics.render()
+    labels = 'route="/items/<int:item_id>",method="GET",status="200"'
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert _line(text, 'http_request_duration_seconds_count{' + labels + '}').endswith(' 2')
+    assert _line(text, 'http_request_duration_seconds_bucket{' + labels + ',le="+Inf"}').endswith(' 2')
+    assert _line(text, 'fitness_operation_seconds_count{operation="lookup"}').endswith(' 2')
+
+def test_bucket_counts_are_cumulative():
+    metrics = Metrics(buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.05, 0.5):
+        metrics.observe_operation('parse', seconds)
+    text = metrics.render()
+    assert _line(text, 'fitness_operation_seconds_bucket{operation="parse",le="0.01"}').endswith(' 1')
+    assert _line(text, 'fitness_operation_seconds_bucket{operation="parse",le="0.1"}').endswith(' 2')
+    assert _line(text, 'fitness_operation_seconds_bucket{operation="parse",le="+Inf"}').endswith(' 3')
+    assert _line(text, 'fitness_operation_seconds_sum{operation="parse"}').endswith(' 0.555')
+
+def test_server_timing_header(recorder):
+    _, client = recorder
+    header = client.get('/items/1').headers['Server-Timing']
+    entries = [entry.split(';')[0] for entry in header.split(', ')]
+    assert entries == ['lookup', 'app']
+
+def test_streamed_response_recorded_after_body(recorder):
+    metrics, client = recorder
+    response = client.get('/stream', buffered=False)
+    # 正文还没生成时不记录
+    assert 'route="/stream"' not in metrics.render()
+    assert response.get_data(as_text=True) == 'a\nb\n'
+    response.close()
+    text = metrics.render()
+    assert _line(text, 'http_request_duration_seconds_count{route="/stream"').endswith(' 1')
+    assert float(_line(text, 'http_request_duration_seconds_sum{route="/stream"').split()[-1]) >= 0.05
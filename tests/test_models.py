@@ -0,0 +1,43 @@
+from models import FitnessData
+from storage import JsonFileStorage
+
+def _record(day='2025-11-01', minutes=30):
+    return {'日期': day, '运动项目': '跑步', '运动时长': minutes, '睡眠时长': 7, '睡眠质量': 4}
+
+def test_reads_served_from_cache(tmp_path, monkeypatch):
+    store = JsonFileStorage(str(tmp_path / 'fitness_data.json'))
+    data = FitnessData(store)
+    data.add_record(_record())
+    version = data.get_version()
+    frame = data.get_dataframe()
+    calls = []
+    load_all = store.load_all
+    monkeypatch.setattr(store, 'load_all', lambda: calls.append(1) or load_all())
+    for _ in range(3):
+        assert len(data.get_all_data()) == 1
+        assert data.get_dataframe() is frame
+        assert data.get_version() == version
+    assert calls == []
+
+def test_local_write_invalidates_cache(tmp_path):
+    data = FitnessData(JsonFileStorage(str(tmp_path / 'fitness_data.json')))
+    data.add_record(_record())
+    version = data.get_version()
+    assert len(data.get_dataframe()) == 1
+    data.add_record(_record('2025-11-02', 45))
+    assert data.get_version() > version
+    frame = data.get_dataframe()
+    assert frame['运动时长'].tolist() == [30, 45]
+    assert str(frame['日期'].iloc[1].date()) == '2025-11-02'
+
+def test_write_from_other_process_invalidates_cache(tmp_path):
+    path = str(tmp_path / 'fitness_data.json')
+    # 两个 FitnessData 模拟两个 worker 进程
+    writer, reader = FitnessData(JsonFileStorage(path)), FitnessData(JsonFileStorage(path))
+    writer.add_record(_record())
+    assert len(reader.get_all_data()) == 1
+    version = reader.get_version()
+    writer.add_record(_record('2025-11-02', 45))
+    assert reader.get_version() != version
+    assert [record['运动时长'] for record in reader.get_all_data()] == [30, 45]
+    assert len(reader.get_dataframe()) == 2
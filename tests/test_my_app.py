@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+import pytest
+
+st = pytest.importorskip('streamlit')
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'my_app.py')
+
+ROWS = [
+    {'日期': '2025-11-01', '运动项目': '跑步', '运动时长(分钟)': 30, '睡眠时长(小时)': 7, '睡眠质量': 4, '心路历程': ''},
+    {'日期': '2025-11-02', '运动项目': '游泳', '运动时长(分钟)': 45, '睡眠时长(小时)': 8, '睡眠质量': 5, '心路历程': ''},
+    {'日期': '2025-11-03', '运动项目': '跑步', '运动时长(分钟)': 20, '睡眠时长(小时)': 6.5, '睡眠质量': 3, '心路历程': ''},
+]
+
+@pytest.fixture
+def app_dir(tmp_path, monkeypatch):
+    # my_app.py 默认读写当前目录下的 my_data.csv
+    monkeypatch.chdir(tmp_path)
+    pd.DataFrame(ROWS).to_csv('my_data.csv', index=False)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    yield tmp_path
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+def _record_count(at):
+    return next(item.value for item in at.markdown if item.value.startswith('**当前记录数'))
+
+def test_rerun_reads_csv_only_after_it_changes(app_dir, monkeypatch):
+    at = AppTest.from_file(APP, default_timeout=30).run()
+    assert not at.exception
+    assert _record_count(at) == '**当前记录数: 3**'
+
+    reads = []
+    read_csv = pd.read_csv
+    monkeypatch.setattr(pd, 'read_csv', lambda path, *args, **kwargs: reads.append(path) or read_csv(path, *args, **kwargs))
+    at.run()
+    assert _record_count(at) == '**当前记录数: 3**'
+    assert not [path for path in reads if str(path).endswith('my_data.csv')]
+
+    # 其他进程改了文件（修改时间和大小变化）才重新读取
+    pd.DataFrame(ROWS + [{**ROWS[0], '日期': '2025-11-04'}]).to_csv('my_data.csv', index=False)
+    at.run()
+    assert _record_count(at) == '**当前记录数: 4**'
+    assert [path for path in reads if str(path).endswith('my_data.csv')]
@@ -0,0 +1,68 @@
+import pandas as pd
+
+from record_store import RecordStore, normalize_date, normalize_dates
+
+def _record(day, minutes=30):
+    return {'日期': day, '运动项目': '跑步', '运动时长(分钟)': minutes, '睡眠时长(小时)': 7.5, '睡眠质量': 4, '心路历程': ''}
+
+def _lines(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+def test_normalize_date_formats():
+    assert normalize_date('2025.10.26') == '2025-10-26'
+    assert normalize_date('2025/1/2') == '2025-01-02'
+    assert normalize_date(' 2025-01-02 ') == '2025-01-02'
+    assert normalize_date('昨天') == '昨天'
+    # 不存在的日期与 normalize_dates 一样视为无法识别
+    assert normalize_date('2025-13-45') == '2025-13-45'
+
+def test_normalize_date_matches_vectorized():
+    values = ['2025.10.26', '2025/1/2', ' 2025-01-02 ', '2025-01-02T08:00', '2025-13-45', '2025-02-30', '昨天']
+    vectorized = normalize_dates(pd.Series(values))
+    for value, expected in zip(values, vectorized):
+        assert normalize_date(value) == (expected if isinstance(expected, str) else value.strip())
+
+def test_upsert_replaces_same_day_in_any_format(tmp_path):
+    path = str(tmp_path / 'my_data.csv')
+    store = RecordStore(path)
+    assert store.upsert(_record('2025.11.1')) is False
+    assert store.upsert(_record('2025-11-02')) is False
+    assert store.upsert(_record('2025/11/01', 50)) is True
+    assert len(store) == 2
+    frame = RecordStore(path).to_frame()
+    assert frame['日期'].tolist() == ['2025-11-02', '2025-11-01']
+    assert frame['运动时长(分钟)'].tolist() == [30, 50]
+
+def test_upsert_appends_one_line(tmp_path):
+    path = str(tmp_path / 'my_data.csv')
+    store = RecordStore(path)
+    store.upsert(_record('2025-11-01'))
+    before = _lines(path)
+    store.upsert(_record('2025-11-01', 45))
+    after = _lines(path)
+    # 只在末尾追加，不重写已有内容
+    assert after[:len(before)] == before
+    assert len(after) == len(before) + 1
+
+def test_compaction_drops_replaced_rows(tmp_path):
+    path = str(tmp_path / 'my_data.csv')
+    store = RecordStore(path, compact_every=3)
+    store.upsert(_record('2025-11-01'))
+    store.upsert(_record('2025-11-02'))
+    for minutes in (40, 50):
+        store.upsert(_record('2025-11-01', minutes))
+    assert len(_lines(path)) == 5
+    store.upsert(_record('2025-11-01', 60))
+    assert len(_lines(path)) == 3
+    frame = RecordStore(path).to_frame()
+    assert frame['日期'].tolist() == ['2025-11-02', '2025-11-01']
+    assert frame['运动时长(分钟)'].tolist() == [30, 60]
+
+def test_external_change_reloaded(tmp_path):
+    path = str(tmp_path / 'my_data.csv')
+    store = RecordStore(path)
+    store.upsert(_record('2025-11-01'))
+    RecordStore(path).upsert(_record('2025-11-02'))
+    assert len(store) == 2
+    assert store.to_frame()['日期'].tolist() == ['2025-11-01', '2025-11-02']
@@ -0,0 +1,61 @@
+import pytest
+from flask import Flask, jsonify
+
+from response_cache import ResponseCache
+
+@pytest.fixture
+def cached_app():
+    state = {'version': 1, 'calls': 0}
+    cache = ResponseCache(lambda: state['version'], max_entries=2)
+    app = Flask(__name__)
+
+    @app.route('/stats')
+    @cache.cached
+    def stats():
+        state['calls'] += 1
+        return jsonify({'version': state['version'], 'calls': state['calls']})
+
+    @app.route('/missing')
+    @cache.cached
+    def missing():
+        state['calls'] += 1
+        return jsonify({'error': 'not found'}), 404
+
+    return cache, state, app.test_client()
+
+def test_hit_until_version_changes(cached_app):
+    cache, state, client = cached_app
+    first = client.get('/stats').get_json()
+    assert client.get('/stats').get_json() == first
+    assert state['calls'] == 1
+    # 写入后版本号变化，旧条目不再命中
+    state['version'] += 1
+    assert client.get('/stats').get_json() == {'version': 2, 'calls': 2}
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_query_args_are_part_of_key(cached_app):
+    _, state, client = cached_app
+    client.get('/stats?days=7')
+    client.get('/stats?days=28')
+    client.get('/stats?days=7')
+    assert state['calls'] == 2
+
+def test_lru_eviction(cached_app):
+    cache, state, client = cached_app
+    for days in (1, 2, 1, 3):
+        client.get(f'/stats?days={days}')
+    # days=2 最久没用，被淘汰
+    assert cache.stats()['entries'] == 2 and cache.evictions == 1
+    client.get('/stats?days=1')
+    assert state['calls'] == 3
+    client.get('/stats?days=2')
+    assert state['calls'] == 4
+
+def test_byte_limit_and_errors_not_cached(cached_app):
+    cache, state, client = cached_app
+    client.get('/missing')
+    client.get('/missing')
+    assert state['calls'] == 2 and cache.stats()['entries'] == 0
+    cache.max_bytes = 10
+    client.get('/stats')
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,80 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from aggregates import RunningAggregates
+from models import FitnessData
+from storage import JsonFileStorage
+from backend.schema import CSV_SCHEMA, coerce_frame
+from health_report import compute_rollups
+
+# 2024-12-29 是周日，2024-12-30 是周一（ISO 2025 年第 1 周）
+DAYS = [('2024-12-29', 30), ('2024-12-30', 0), ('2025.1.31', 45), ('2025-02-01', 60), ('2025-02-01', 20)]
+
+def _records():
+    return [{'日期': day, '运动项目': '跑步', '运动时长': minutes, '睡眠时长': 7, '睡眠质量': 4} for day, minutes in DAYS]
+
+def _periods(rollups):
+    return [(row['period'], row['start'], row['records']) for row in rollups]
+
+def test_week_and_month_boundaries():
+    aggregates = RunningAggregates.from_records(_records())
+    assert _periods(aggregates.rollups('week')) == [
+        ('2024-W52', '2024-12-23', 1), ('2025-W01', '2024-12-30', 1), ('2025-W05', '2025-01-27', 3),
+    ]
+    assert _periods(aggregates.rollups('month')) == [
+        ('2024-12', '2024-12-01', 2), ('2025-01', '2025-01-01', 1), ('2025-02', '2025-02-01', 2),
+    ]
+    day = aggregates.rollups('day')[-1]
+    assert (day['start'], day['records'], day['total_duration'], day['avg_duration'], day['active_days']) == \
+        ('2025-02-01', 2, 80.0, 40.0, 1)
+
+def test_range_includes_whole_periods():
+    aggregates = RunningAggregates.from_records(_records())
+    # 两端落在周期中间时包含所在的整个周期
+    rows = aggregates.rollups('week', date(2024, 12, 31), date(2025, 1, 28))
+    assert [row['start'] for row in rows] == ['2024-12-30', '2025-01-27']
+    assert [row['start'] for row in aggregates.rollups('month', date_to=date(2024, 12, 1))] == ['2024-12-01']
+    with pytest.raises(ValueError):
+        aggregates.rollups('year')
+
+def test_incremental_matches_rebuild():
+    records = _records()
+    aggregates = RunningAggregates.from_records(records[:2])
+    aggregates.rollups('week')
+    for record in records[2:]:
+        aggregates.add(record)
+    for granularity in ('day', 'week', 'month'):
+        assert aggregates.rollups(granularity) == RunningAggregates.from_records(records).rollups(granularity)
+
+@pytest.mark.parametrize('granularity', ['day', 'week', 'month'])
+def test_matches_streamlit_rollups(granularity):
+    frame = coerce_frame(pd.DataFrame([
+        {'日期': day, '运动时长(分钟)': minutes, '睡眠时长(小时)': 7, '睡眠质量': 4} for day, minutes in DAYS
+    ]), CSV_SCHEMA)
+    expected = compute_rollups(frame, granularity)
+    rows = RunningAggregates.from_records(_records()).rollups(granularity)
+    assert [row['start'] for row in rows] == [start.strftime('%Y-%m-%d') for start in expected.index]
+    assert [row['records'] for row in rows] == expected['记录数'].tolist()
+    assert [row['total_duration'] for row in rows] == expected['总运动时长'].tolist()
+    assert [row['active_days'] for row in rows] == expected['运动天数'].tolist()
+
+def test_active_days_counts_distinct_dates(tmp_path):
+    data = FitnessData(JsonFileStorage(str(tmp_path / 'fitness_data.json')))
+    data.add_records([{'日期': '2025-11-03', '运动项目': '跑步', '运动时长': 30, '睡眠时长': 7, '睡眠质量': 4} for _ in range(10)])
+    data.add_record({'日期': '2025-11-05', '运动项目': '游泳', '运动时长': 40, '睡眠时长': 7, '睡眠质量': 4})
+    recent = data.get_recent_analysis()['recent']['7d']['active_days']
+    assert recent == 2
+    assert data.get_rollups('week')[0]['active_days'] == recent
+    assert [row['active_days'] for row in data.get_rollups('day')] == [1, 1]
+    assert data.get_rollups('month')[0]['records'] == 11
+
+def test_fresh_instance_reads_rollups_from_storage(tmp_path):
+    path = str(tmp_path / 'fitness_data.json')
+    FitnessData(JsonFileStorage(path)).add_records(_records())
+    # 新打开的实例还没有读取过记录
+    data = FitnessData(JsonFileStorage(path))
+    assert _periods(data.get_rollups('month', '2025-01-15')) == [('2025-01', '2025-01-01', 1), ('2025-02', '2025-02-01', 2)]
+    with pytest.raises(ValueError):
+        data.get_rollups('week', 'garbage')
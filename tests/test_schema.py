@@ -0,0 +1,38 @@
+import pandas as pd
+
+from aggregates import RunningAggregates
+from models import FitnessData, build_frame, validate_records
+from schema import normalize_quality, normalize_quality_value
+from storage import SQLiteStorage
+
+def _record(quality):
+    return {'日期': '2025-11-01', '运动项目': '跑步', '运动时长': 30, '睡眠时长': 7, '睡眠质量': quality}
+
+def test_quality_stored_as_sent():
+    qualities = [87, '4', 3.6, 1, None, '']
+    valid, errors = validate_records([_record(q) for q in qualities])
+    assert errors == []
+    assert [record['睡眠质量'] for record in valid] == qualities
+    # 读取时才换算为 1-5 分
+    assert build_frame(valid)['睡眠质量'].tolist()[:4] == [4, 4, 4, 1]
+
+def test_invalid_quality_rejected_without_touching_records():
+    records = [_record(q) for q in (0, 'abc', 4, 500)]
+    valid, errors = validate_records(records)
+    assert valid == [_record(4)]
+    assert [error['index'] for error in errors] == [0, 1, 3]
+    assert [record['睡眠质量'] for record in records] == [0, 'abc', 4, 500]
+
+def test_running_and_typed_frame_quality_agree(tmp_path):
+    records = [_record(q) for q in (80, 87, 3, 5, 100)]
+    frame_mean = build_frame(records)['睡眠质量'].astype(float).mean()
+    assert RunningAggregates.from_records(records).snapshot()['avg_quality'] == frame_mean
+    data = FitnessData(SQLiteStorage(str(tmp_path / 'data.db')))
+    data.add_records([dict(record) for record in records])
+    assert data.get_aggregates()['avg_quality'] == frame_mean
+    assert [record['睡眠质量'] for record in data.get_all_data()] == [80, 87, 3, 5, 100]
+
+def test_quality_value_matches_vectorized():
+    values = [87, '4', 3.6, 2.5, 0, -5, 500, 6, 'abc', None]
+    expected = normalize_quality(pd.Series(values, dtype=object))
+    assert [normalize_quality_value(value) for value in values] == [None if pd.isna(value) else value for value in expected]
@@ -0,0 +1,86 @@
+import math
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from search import BM25_B, BM25_K1, PHRASE_BOOST, SearchIndex, normalize, parse_journal, tokenize
+
+NOTES = {
+    1: ('今天跑步很累，跑步后拉伸', '2025-11-01', '跑步'),
+    2: ('早上跑步，状态不错', '2025-11-02', '跑步'),
+    3: ('游泳课，学了换气。步子迈大了', '2025-11-03', '游泳'),
+    4: ('跑了步，但是没有拉伸', '2025-11-04', '跑步'),
+    5: ('Ran 5km with friends, 跑步 pace ok', '2025-11-05', '跑步'),
+}
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.sync_source('record', NOTES)
+    return index
+
+def _ids(result):
+    return [item['id'] for item in result['results']]
+
+def _bm25(docs, query):
+    """按定义逐篇计算 BM25（含整句加分），用来核对索引的结果"""
+    tokens = list(dict.fromkeys(tokenize(query, query=True)))
+    counts = {doc_id: Counter(tokenize(text)) for doc_id, text in docs.items()}
+    average = sum(sum(count.values()) for count in counts.values()) / len(docs)
+    scores = {}
+    for doc_id, count in counts.items():
+        if not all(count[token] for token in tokens):
+            continue
+        score = 0.0
+        for token in tokens:
+            df = sum(1 for other in counts.values() if other[token])
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(count.values()) / average)
+            score += idf * count[token] * (BM25_K1 + 1) / (count[token] + norm)
+        if tokens != [normalize(query)] and normalize(query) in normalize(docs[doc_id]):
+            score *= PHRASE_BOOST
+        scores[doc_id] = round(score, 3)
+    return scores
+
+def test_tokenize_cjk_bigrams():
+    assert tokenize('跑步ok') == ['跑', '步', '跑步', 'ok']
+    assert tokenize('今天跑步', query=True) == ['今天', '天跑', '跑步']
+    assert tokenize('跑', query=True) == ['跑']
+    assert tokenize('ＲＵＮ 5KM') == ['run', '5km']
+
+def test_bigram_query_needs_adjacent_characters(index):
+    # 「跑了步」「步子」里有「跑」「步」两个字，但不相邻，不算命中「跑步」
+    assert sorted(_ids(index.search('跑步'))) == [1, 2, 5]
+    assert sorted(_ids(index.search('步'))) == [1, 2, 3, 4, 5]
+    assert _ids(index.search('RAN')) == [5]
+    assert index.search('骑行') == {'total': 0, 'results': []}
+
+def test_bm25_scores_and_order(index):
+    docs = {doc_id: text for doc_id, (text, _, _) in NOTES.items()}
+    for query in ('跑步', '拉伸', '跑步 拉伸', '步'):
+        expected = _bm25(docs, query)
+        result = index.search(query)
+        assert {item['id']: item['score'] for item in result['results']} == expected
+        scores = [item['score'] for item in result['results']]
+        assert scores == sorted(scores, reverse=True)
+    # 「跑步」出现两次的笔记排在最前
+    assert _ids(index.search('跑步'))[0] == 1
+
+def test_filters_and_updates(index):
+    assert _ids(index.search('拉伸', date_from='2025.11.2')) == [4]
+    assert _ids(index.search('步', sport='游泳')) == [3]
+    assert sorted(_ids(index.search('步', date_from='2025-11-02', date_to='2025-11-03'))) == [2, 3]
+    with pytest.raises(ValueError):
+        index.search('步', date_from='昨天')
+    index.sync_source('record', {**{doc_id: note for doc_id, note in NOTES.items() if doc_id != 1}, 4: ('改成骑行了', '2025-11-04', '骑行')})
+    assert sorted(_ids(index.search('跑步'))) == [2, 5]
+    assert _ids(index.search('骑行')) == [4]
+    assert len(index) == 4
+
+def test_parse_journal_years():
+    # 没写年份时用记录里月日相同的年份，月份变小视为跨年
+    entries = parse_journal('12.30：跑步\n继续\n1.2：游泳\n2025.3.1：休息', known_dates=[date(2023, 12, 30)])
+    assert [(day.isoformat(), text) for day, text in entries] == [
+        ('2023-12-30', '跑步\n继续'), ('2024-01-02', '游泳'), ('2025-03-01', '休息'),
+    ]
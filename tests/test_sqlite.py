@@ -0,0 +1,65 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from aggregates import RunningAggregates
+from models import FitnessData
+from storage import JsonFileStorage, SQLiteStorage
+
+def _records(count, seed=1):
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    records = []
+    for offset in range(count):
+        record = {'日期': (start + timedelta(days=rng.randrange(90))).isoformat(), '运动时长': rng.choice([0, 20, 45.5, None]),
+                  '睡眠时长': rng.choice([6, 7.5, 8]), '睡眠质量': rng.randint(1, 5)}
+        if offset % 5:
+            record['运动项目'] = rng.choice(['跑步', '游泳', None])
+        records.append(record)
+    records[0]['日期'] = '2025.1.1'
+    return records
+
+@pytest.fixture
+def backends(tmp_path):
+    records = _records(200)
+    json_data = FitnessData(JsonFileStorage(str(tmp_path / 'data.json')))
+    sqlite_data = FitnessData(SQLiteStorage(str(tmp_path / 'data.db')))
+    json_data.add_records([dict(record) for record in records])
+    sqlite_data.add_records([dict(record) for record in records])
+    return json_data, sqlite_data
+
+def test_sqlite_analysis_matches_json_without_full_load(backends, monkeypatch):
+    json_data, sqlite_data = backends
+    sqlite_data = FitnessData(sqlite_data.storage)
+    monkeypatch.setattr(sqlite_data.storage, 'load_all', lambda: pytest.fail('SQLite 分析不应读取全部记录'))
+    assert sqlite_data.get_recent_analysis() == json_data.get_recent_analysis()
+    assert sqlite_data.get_recent_analysis('2025-02-01') == json_data.get_recent_analysis('2025-02-01')
+    assert sqlite_data.count() == json_data.count() == 200
+    for days in (7, 28):
+        assert sqlite_data.get_window_stats(days) == json_data.get_window_stats(days)
+
+@pytest.mark.parametrize('records', [
+    [{'运动时长': 30, '运动项目': '跑步'}, {'运动时长': 30, '运动项目': None}, {'运动时长': 30}],
+    [{'运动时长': 30, '运动项目': None}, {'运动时长': 30}],
+    [{'运动时长': 30}, {'睡眠时长': 7}],
+    [{'运动时长': None, '运动项目': '跑步', '睡眠时长': None}],
+    [{'睡眠时长': 7, '睡眠质量': 4}],
+])
+def test_sqlite_aggregates_match_running_aggregates(tmp_path, records):
+    storage = SQLiteStorage(str(tmp_path / 'data.db'))
+    storage.append_many([{'id': index, **record} for index, record in enumerate(records, 1)])
+    expected = RunningAggregates.from_records(records).snapshot()
+    actual = storage.aggregate_stats()
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        assert actual[key] == pytest.approx(value, nan_ok=True), key
+
+def test_sqlite_normalizes_existing_dates(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / 'data.db'))
+    storage.append_many([{'id': 1, '日期': '2025-01-02'}])
+    with storage._connect() as conn:
+        conn.execute("UPDATE records SET 日期 = '2025.1.2'")
+    storage = SQLiteStorage(str(tmp_path / 'data.db'))
+    assert storage.date_bounds() == (date(2025, 1, 2), date(2025, 1, 2))
+    assert storage.read_range(date(2025, 1, 2), date(2025, 1, 2)) == [{'id': 1, '日期': '2025-01-02'}]
@@ -0,0 +1,173 @@
+import os
+import stat
+import threading
+
+import pandas as pd
+import pytest
+
+import storage as storage_module
+from models import FitnessData
+from schema import RECORD_SCHEMA, coerce_frame, read_columnar, write_columnar
+from storage import AppendLogStorage, JsonFileStorage, ParquetStorage
+
+def _record(record_id):
+    return {'id': record_id, '日期': '2025-11-01', '运动项目': '跑步', '运动时长': 30, '睡眠时长': 7}
+
+def test_log_append_after_torn_tail_survives_restart(tmp_path):
+    path = str(tmp_path / 'fitness_data.log')
+    store = AppendLogStorage(path)
+    store.append(_record(1))
+    # 模拟写到一半崩溃：最后一行没有换行
+    with open(path, 'ab') as f:
+        f.write(b'{"id": 2, "\xe6\x97\xa5')
+
+    store = AppendLogStorage(path)
+    assert [record['id'] for record in store.load_all()] == [1]
+    store.append(_record(2))
+
+    restarted = AppendLogStorage(path)
+    assert restarted.load_all() == [_record(1), _record(2)]
+
+def test_log_replace_survives_restart(tmp_path):
+    path = str(tmp_path / 'fitness_data.log')
+    store = AppendLogStorage(path)
+    store.append_many([_record(1), _record(2)])
+    store.append({**_record(1), '运动时长': 45})
+
+    restarted = AppendLogStorage(path)
+    assert restarted.load_all() == [_record(2), {**_record(1), '运动时长': 45}]
+    assert restarted.next_id() == 3
+
+def test_log_compacts_after_overwrites(tmp_path):
+    path = str(tmp_path / 'fitness_data.log')
+    store = AppendLogStorage(path, compact_min_dead=3, compact_ratio=0.5)
+    store.append_many([_record(1), _record(2)])
+    for minutes in (40, 50):
+        store.append({**_record(1), '运动时长': minutes})
+    with open(path, 'rb') as f:
+        assert len(f.readlines()) == 4
+    # 第三次覆盖后失效行达到阈值，日志被压缩成只剩有效记录
+    store.append({**_record(1), '运动时长': 60})
+    with open(path, 'rb') as f:
+        assert len(f.readlines()) == 2
+    expected = [_record(2), {**_record(1), '运动时长': 60}]
+    assert store.load_all() == expected
+    assert AppendLogStorage(path).load_all() == expected
+
+def test_log_sync_reads_only_appended_tail(tmp_path, monkeypatch):
+    path = str(tmp_path / 'fitness_data.log')
+    writer = AppendLogStorage(path)
+    reader = AppendLogStorage(path)
+    writer.append_many([_record(1), _record(2)])
+
+    def replay():
+        raise AssertionError('full replay')
+
+    monkeypatch.setattr(reader, '_replay', replay)
+    assert [record['id'] for record in reader.load_all()] == [1, 2]
+    writer.append({**_record(1), '运动时长': 45})
+    assert reader.load_all() == [_record(2), {**_record(1), '运动时长': 45}]
+    assert reader.next_id() == 3
+
+    # 其他进程压缩后文件被替换，需要整体回放
+    monkeypatch.undo()
+    writer.compact()
+    writer.append(_record(3))
+    assert [record['id'] for record in reader.load_all()] == [2, 1, 3]
+
+def test_log_concurrent_readers_replay_tail_once(tmp_path):
+    path = str(tmp_path / 'fitness_data.log')
+    writer, reader = AppendLogStorage(path), AppendLogStorage(path)
+    errors = []
+
+    def read():
+        try:
+            for _ in range(30):
+                reader.load_all()
+                for _ in reader.iter_batches(batch_size=7):
+                    pass
+                len(reader)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    # 另一个“进程”不断追加并覆盖记录，读线程同时回放新增的尾部
+    for record_id in range(300):
+        writer.append(_record(record_id % 50))
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    len(reader)
+    fresh = AppendLogStorage(path)
+    assert (reader._dead, reader._size, reader._index) == (fresh._dead, fresh._size, fresh._index)
+
+def test_log_export_snapshot_ignores_later_writes(tmp_path):
+    store = AppendLogStorage(str(tmp_path / 'fitness_data.log'))
+    store.append_many([_record(record_id) for record_id in range(1, 4)])
+    batches = store.iter_batches(batch_size=1)
+    assert [record['id'] for record in next(batches)] == [1]
+    store.append({**_record(2), '运动时长': 45})
+    store.append(_record(4))
+    # 导出开始时的索引副本：之后的覆盖和新增不影响正在进行的导出
+    assert [record['id'] for batch in batches for record in batch] == [2, 3]
+
+def test_json_rewrite_keeps_file_mode(tmp_path):
+    path = str(tmp_path / 'fitness_data.json')
+    store = JsonFileStorage(path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == storage_module.DEFAULT_FILE_MODE == 0o644
+    os.chmod(path, 0o640)
+    store.append_many([_record(1)])
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+def test_json_write_parses_file_once(tmp_path, monkeypatch):
+    store = JsonFileStorage(str(tmp_path / 'fitness_data.json'))
+    data = FitnessData(store)
+    data.add_record(_record(None))
+    calls = []
+    load_all = store.load_all
+    monkeypatch.setattr(store, 'load_all', lambda: calls.append(1) or load_all())
+    data.add_record(_record(None))
+    assert len(calls) == 1
+    assert [record['id'] for record in store.load_all()] == [1, 2]
+
+def test_concurrent_writers_get_unique_ids(tmp_path):
+    path = str(tmp_path / 'fitness_data.json')
+    # 两个 FitnessData 模拟两个 worker 进程，各自多个线程同时写入
+    workers = [FitnessData(JsonFileStorage(path)) for _ in range(2)]
+
+    def write(data):
+        for _ in range(10):
+            data.add_record(_record(None))
+
+    threads = [threading.Thread(target=write, args=(workers[index % 2],)) for index in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ids = [record['id'] for record in JsonFileStorage(path).load_all()]
+    assert sorted(ids) == list(range(1, 61))
+    assert all(data.count() == 60 for data in workers)
+
+@pytest.mark.parametrize('suffix', ['.parquet', '.arrow'])
+def test_columnar_round_trip_is_lossless(tmp_path, suffix):
+    pytest.importorskip('pyarrow')
+    record = {'id': 1, '日期': '2025.11.1', '运动项目': '跑步', '运动时长': 'abc', '睡眠时长': 7.3,
+              '睡眠质量': 87, '心率': {'平均': 142, '区间': [1, 2]}, 'created_at': '2025-11-01T21:00:00'}
+    store = ParquetStorage(str(tmp_path / ('fitness_data' + suffix)))
+    store.append_many([record])
+    store.append_many([_record(2)])
+    assert store.load_all() == [record, _record(2)]
+    assert [batch for batch in store.iter_batches(1)] == [[record], [_record(2)]]
+    # 分析用的类型化列仍按 schema 转换
+    frame = read_columnar(store.path, columns=['睡眠质量', '运动时长'])
+    assert frame['睡眠质量'].iloc[0] == 4
+    assert frame['运动时长'].isna().tolist() == [True, False]
+    assert store.next_id() == 3
+
+def test_parquet_without_payload_column_still_loads(tmp_path):
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'fitness_data.parquet')
+    write_columnar(coerce_frame(pd.DataFrame([_record(1)]), RECORD_SCHEMA), path)
+    assert ParquetStorage(path).load_all() == [_record(1)]
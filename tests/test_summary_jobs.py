@@ -0,0 +1,134 @@
+import threading
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip('openai')
+
+from llm_stub import StubHandler, serve
+from summary_jobs import MAX_BATCH_CLAIMS, LLMSummarizer, SummaryJobQueue, SummaryStore
+
+@pytest.fixture
+def stub():
+    server = serve(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StubHandler.requests = 0
+    yield server
+    server.shutdown()
+    server.server_close()
+    StubHandler.fail_rate = 0.0
+
+def _queue(server, tmp_path, summarizer_class=LLMSummarizer, **kwargs):
+    summarizer = summarizer_class(base_url='http://127.0.0.1:%d/v1' % server.server_address[1], api_key='not-needed')
+    store = SummaryStore(str(tmp_path / 'summary_cache.db'))
+    return SummaryJobQueue(summarizer, store, retry_delay=0.01, **kwargs)
+
+def _records():
+    return [
+        {'id': 1, '日期': '2025-11-01', '运动项目': '跑步', '运动时长': 30, '睡眠时长': 7},
+        {'id': 2, '日期': '2025-11-02', '运动项目': '游泳', '运动时长': 45, '睡眠时长': 8},
+        {'id': 3, '日期': '2025-11-02', '运动项目': '游泳', '运动时长': 45, '睡眠时长': 8},
+    ]
+
+def _run(queue, records, owner='alice'):
+    job_id = queue.submit(records, records, owner=owner)
+    status = queue.wait(job_id, owner=owner, timeout=10, poll_interval=0.01)
+    assert status['status'] == 'done'
+    return job_id, status
+
+def test_resubmit_hits_cache(stub, tmp_path):
+    queue = _queue(stub, tmp_path)
+    records = _records()
+    _, first = _run(queue, records)
+    assert first['completed'] == 3
+    requests = StubHandler.requests
+    job_id = queue.submit(records, records, owner='alice')
+    status = queue.status(job_id, owner='alice')
+    assert status['status'] == 'done'
+    assert [item['summary'] for item in status['results']] == [item['summary'] for item in first['results']]
+    assert StubHandler.requests == requests
+
+def test_identical_records_summarized_once(stub, tmp_path):
+    queue = _queue(stub, tmp_path)
+    _, status = _run(queue, _records())
+    # 记录 2 和 3 内容相同，只生成 2 份小结、一次请求
+    assert len(queue.store) == 2
+    assert StubHandler.requests == 1
+    assert {item['id'] for item in status['results']} == {1, 2, 3}
+    assert status['results'][1]['summary'] == status['results'][2]['summary']
+
+def test_failed_batch_marks_every_record(stub, tmp_path):
+    StubHandler.fail_rate = 1.0
+    queue = _queue(stub, tmp_path, max_retries=1)
+    _, status = _run(queue, _records())
+    assert status['failed'] == 3 and status['completed'] == 0
+    assert set(status['errors']) == {'1', '2', '3'}
+    assert StubHandler.requests == 2
+
+def test_retry_after_failure_completes(stub, tmp_path):
+    class FlakySummarizer(LLMSummarizer):
+        calls = 0
+
+        def summarize(self, items):
+            type(self).calls += 1
+            if self.calls == 1:
+                StubHandler.fail_rate = 1.0
+            try:
+                return super().summarize(items)
+            finally:
+                StubHandler.fail_rate = 0.0
+
+    queue = _queue(stub, tmp_path, FlakySummarizer)
+    _, status = _run(queue, _records())
+    assert FlakySummarizer.calls == 2
+    assert status['completed'] == 3 and status['failed'] == 0 and status['errors'] == {}
+
+def test_status_only_visible_to_owner(stub, tmp_path):
+    queue = _queue(stub, tmp_path)
+    job_id, _ = _run(queue, _records(), owner='alice')
+    assert queue.status(job_id, owner='bob') is None
+    assert queue.status(job_id) is None
+    assert queue.status(job_id, owner='alice')['completed'] == 3
+
+def test_batches_of_exited_worker_are_resumed(stub, tmp_path):
+    exited = _queue(stub, tmp_path)
+    # 模拟 worker 在批次执行前退出：线程池里的批次全部丢失
+    exited._executor.submit = lambda *args: None
+    records = _records()
+    job_id = exited.submit(records, records, owner='alice')
+    assert exited.status(job_id, owner='alice')['status'] == 'running'
+
+    # 心跳还没过期时其他 worker 不会接手
+    live = _queue(stub, tmp_path)
+    assert live.status(job_id, owner='alice')['status'] == 'running'
+    assert StubHandler.requests == 0
+
+    restarted = _queue(stub, tmp_path, lease=timedelta(0))
+    status = restarted.wait(job_id, owner='alice', timeout=10, poll_interval=0.01)
+    assert status['status'] == 'done' and status['completed'] == 3
+    assert StubHandler.requests == 1
+    assert restarted.store.claim_stale_batches(job_id, 'other', timedelta(0)) == ([], [])
+
+def test_worker_does_not_reclaim_its_own_batches(stub, tmp_path):
+    queue = _exiting_queue(stub, tmp_path)
+    records = _records()
+    job_id = queue.submit(records, records, owner='alice')
+    assert queue.store.claim_stale_batches(job_id, queue.worker_id, timedelta(0)) == ([], [])
+    assert len(queue.store.claim_stale_batches(job_id, 'other', timedelta(0))[0]) == 1
+
+def _exiting_queue(stub, tmp_path):
+    """批次交给线程池之前就退出的 worker"""
+    queue = _queue(stub, tmp_path, lease=timedelta(0))
+    queue._executor.submit = lambda *args: None
+    return queue
+
+def test_batch_claimed_too_often_is_failed(stub, tmp_path):
+    records = _records()
+    job_id = _exiting_queue(stub, tmp_path).submit(records, records, owner='alice')
+    # 每次都由新的 worker 接手，接手后又退出
+    for _ in range(MAX_BATCH_CLAIMS):
+        _exiting_queue(stub, tmp_path).status(job_id, owner='alice')
+    status = _exiting_queue(stub, tmp_path).status(job_id, owner='alice')
+    assert status['status'] == 'done' and status['failed'] == 3
+    assert StubHandler.requests == 0
@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from wearable import WorkoutStore, daily_record
+
+CSV = b'time,heart_rate,speed\n2025-11-01T07:00:00Z,120,3.0\n2025-11-01T07:00:01Z,121,3.1\n2025-11-01T07:30:00Z,150,3.2\n'
+
+def test_reingest_after_partial_failure(tmp_path, monkeypatch):
+    store = WorkoutStore(str(tmp_path))
+
+    def fail(*args):
+        raise OSError('磁盘已满')
+
+    # 运动目录已经就位，写 overview 时失败，index 里没有这次运动
+    monkeypatch.setattr(store, '_update_overview', fail)
+    with pytest.raises(OSError):
+        store.ingest(CSV, 'csv')
+    monkeypatch.undo()
+
+    meta, created = store.ingest(CSV, 'csv')
+    assert created and store.get(meta['id']) == meta
+    assert sorted(name for name in os.listdir(tmp_path / meta['id'])) == ['cadence.npy', 'heart_rate.npy', 'meta.json', 'speed.npy', 't.npy']
+
+def test_daily_record_has_explicit_missing_sleep():
+    record = daily_record({'id': 'abc', 'date': '2025-11-01', 'sport': '跑步', 'duration': 1800})
+    assert record['睡眠时长'] is None
+    assert record['运动时长'] == 30.0